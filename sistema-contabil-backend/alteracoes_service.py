@@ -0,0 +1,198 @@
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from src.models.carga_inicial import CargaInicial
+from src.models.user import db
+
+# Observadores registrados por modelo: {Modelo: [(colunas, funcao), ...]}
+_observadores: Dict[type, List[Tuple[Tuple[str, ...], Callable]]] = {}
+
+# Cargas iniciais já confirmadas no banco, vistas por este processo
+_cargas_feitas = set()
+
+
+def observar(modelo, colunas: Tuple[str, ...]):
+    """
+    Registrar uma função chamada a cada flush que altere linhas do modelo.
+
+    A função recebe (conexao, alteracoes), onde cada alteração é um par
+    (antes, depois) de dicionários com as colunas pedidas. `antes` é None
+    em inserções e `depois` é None em exclusões. Em inserções a chave
+    primária gerada já vem preenchida em `depois`. A função roda dentro da
+    mesma transação da escrita, então o que ela gravar é confirmado ou
+    desfeito junto com a alteração original.
+
+    Alterações feitas com query.update()/delete() ou bulk inserts não passam
+    pelo flush e não são observadas, a menos que quem as faz chame
+    notificar_alteracoes com os valores antes/depois.
+    """
+    def decorador(funcao):
+        _observadores.setdefault(modelo, []).append((tuple(colunas), funcao))
+        return funcao
+    return decorador
+
+
+def insert_com_conflito(conexao, tabela):
+    """Construir um INSERT com suporte a ON CONFLICT para o dialeto da conexão"""
+    if conexao.dialect.name == 'postgresql':
+        return postgresql.insert(tabela)
+    if conexao.dialect.name == 'sqlite':
+        return sqlite.insert(tabela)
+    raise NotImplementedError(f'Dialeto não suportado: {conexao.dialect.name}')
+
+
+def garantir_carga_inicial(nome: str, carregar: Callable[[], object]):
+    """
+    Rodar `carregar` uma única vez por banco para popular uma tabela mantida por
+    observadores. A marca em cargas_iniciais é inserida na mesma transação da carga
+    (que deve usar db.session e fazer o commit): outro processo que tente ao mesmo
+    tempo espera a chave primária e, com a marca já gravada, não carrega de novo.
+    Deltas gravados antes da carga não a impedem, porque a decisão é pela marca e
+    não por a tabela estar vazia.
+    """
+    if nome in _cargas_feitas:
+        return
+    if db.session.get(CargaInicial, nome) is None:
+        try:
+            conexao = db.session.connection()
+            inserida = conexao.execute(
+                insert_com_conflito(conexao, CargaInicial.__table__)
+                .values(nome=nome, data_conclusao=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=['nome'])
+            ).rowcount
+        except Exception:
+            db.session.rollback()
+            raise
+        if inserida:
+            carregar()
+        else:
+            db.session.rollback()
+    _cargas_feitas.add(nome)
+
+
+def _colunas_observadas(modelo) -> Tuple[str, ...]:
+    colunas = []
+    for colunas_observador, _ in _observadores.get(modelo, []):
+        for nome in colunas_observador:
+            if nome not in colunas:
+                colunas.append(nome)
+    return tuple(colunas)
+
+
+def _valor_padrao(modelo, nome):
+    """Valor do default Python da coluna, aplicado pelo INSERT quando o atributo fica vazio"""
+    coluna = inspect(modelo).columns[nome]
+    if coluna.default is None:
+        return None
+    if coluna.default.is_scalar:
+        return coluna.default.arg
+    if coluna.default.is_callable:
+        return coluna.default.arg(None)
+    return None
+
+
+def _estado_atual(obj, colunas, novo: bool) -> Dict:
+    valores = {}
+    for nome in colunas:
+        valor = obj.__dict__.get(nome) if novo else getattr(obj, nome)
+        if valor is None and novo:
+            valor = _valor_padrao(type(obj), nome)
+        valores[nome] = valor
+    return valores
+
+
+def _estado_anterior(session, obj, colunas) -> Dict:
+    """Valores confirmados no banco antes deste flush"""
+    estado = inspect(obj)
+    valores = {}
+    desconhecidos = []
+
+    for nome in colunas:
+        historico = estado.attrs[nome].history
+        if historico.deleted:
+            valores[nome] = historico.deleted[0]
+        elif historico.unchanged:
+            valores[nome] = historico.unchanged[0]
+        elif historico.added:
+            # Atributo alterado sem o valor antigo carregado
+            desconhecidos.append(nome)
+        else:
+            valores[nome] = getattr(obj, nome)
+
+    if desconhecidos:
+        mapper = estado.mapper
+        chave_primaria = mapper.primary_key[0]
+        linha = session.connection().execute(
+            select(*[mapper.columns[nome] for nome in desconhecidos])
+            .where(chave_primaria == estado.identity[0])
+        ).first()
+        for nome in desconhecidos:
+            valores[nome] = getattr(linha, nome) if linha else None
+
+    return valores
+
+
+@event.listens_for(db.session, 'before_flush')
+def _coletar_alteracoes(session, flush_context, instances):
+    pendentes = []
+
+    for obj in session.new:
+        colunas = _colunas_observadas(type(obj))
+        if colunas:
+            pendentes.append((type(obj), obj, None, _estado_atual(obj, colunas, novo=True)))
+
+    for obj in session.dirty:
+        colunas = _colunas_observadas(type(obj))
+        if colunas and session.is_modified(obj, include_collections=False):
+            antes = _estado_anterior(session, obj, colunas)
+            depois = _estado_atual(obj, colunas, novo=False)
+            if antes != depois:
+                pendentes.append((type(obj), obj, antes, depois))
+
+    for obj in session.deleted:
+        colunas = _colunas_observadas(type(obj))
+        if colunas:
+            pendentes.append((type(obj), obj, _estado_anterior(session, obj, colunas), None))
+
+    session.info['alteracoes_pendentes'] = pendentes
+
+
+@event.listens_for(db.session, 'after_flush')
+def _notificar_observadores(session, flush_context):
+    pendentes = session.info.pop('alteracoes_pendentes', None)
+    if not pendentes:
+        return
+
+    por_modelo: Dict[type, List[Tuple[Optional[Dict], Optional[Dict]]]] = {}
+    for modelo, obj, antes, depois in pendentes:
+        if antes is None:
+            # A chave primária de linhas novas só existe depois do INSERT
+            for coluna in inspect(modelo).primary_key:
+                if coluna.key in depois:
+                    depois[coluna.key] = obj.__dict__.get(coluna.key)
+        por_modelo.setdefault(modelo, []).append((antes, depois))
+
+    conexao = session.connection()
+    for modelo, alteracoes in por_modelo.items():
+        notificar_alteracoes(conexao, modelo, alteracoes)
+
+
+def notificar_alteracoes(conexao, modelo, alteracoes: List[Tuple[Optional[Dict], Optional[Dict]]]):
+    """
+    Chamar os observadores do modelo com pares (antes, depois).
+
+    Usado pelo flush e por escritas em lote feitas direto na conexão (executemany),
+    que informam aqui os valores das linhas para manter os dados derivados em dia.
+    Os dicionários precisam conter todas as colunas observadas do modelo.
+    """
+    if not alteracoes:
+        return
+    for colunas, funcao in _observadores.get(modelo, []):
+        funcao(conexao, [
+            (
+                {nome: antes[nome] for nome in colunas} if antes is not None else None,
+                {nome: depois[nome] for nome in colunas} if depois is not None else None
+            )
+            for antes, depois in alteracoes
+        ])
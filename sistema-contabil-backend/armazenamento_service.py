@@ -0,0 +1,164 @@
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Optional, Tuple
+from sqlalchemy import and_, delete, select
+from src.models.documento import Documento
+from src.models.arquivo import Arquivo
+from src.models.user import db
+from src.services.alteracoes_service import insert_com_conflito, observar
+
+# Raiz do armazenamento de uploads (arquivos em <raiz>/ab/cd/<sha256>)
+PASTA_UPLOADS = os.getenv('UPLOAD_FOLDER', os.path.join(os.getcwd(), 'uploads', 'documentos'))
+
+# Tamanho dos blocos lidos/gravados ao salvar um upload
+TAMANHO_BLOCO = 1024 * 1024
+
+# Arquivos sem referências só são apagados depois deste prazo (uploads em andamento podem reutilizá-los)
+CARENCIA_ORFAOS = timedelta(hours=int(os.getenv('ARQUIVOS_CARENCIA_HORAS', '24')))
+
+_PADRAO_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+def sha256_do_caminho(caminho_arquivo: Optional[str]) -> Optional[str]:
+    """Hash de um caminho do armazenamento; None para caminhos antigos (pasta plana)"""
+    if not caminho_arquivo:
+        return None
+    nome = os.path.basename(caminho_arquivo)
+    return nome if _PADRAO_SHA256.match(nome) else None
+
+
+@observar(Documento, ('caminho_arquivo', 'tamanho_arquivo'))
+def _observar_documentos(conexao, alteracoes):
+    """Contar quantos documentos apontam para cada arquivo do armazenamento"""
+    deltas: Dict[str, list] = {}
+    for antes, depois in alteracoes:
+        for valores, sinal in ((antes, -1), (depois, 1)):
+            sha256 = sha256_do_caminho(valores['caminho_arquivo']) if valores else None
+            if sha256 is None:
+                continue
+            delta = deltas.setdefault(sha256, [0, valores['tamanho_arquivo'] or 0])
+            delta[0] += sinal
+
+    linhas = [
+        {'sha256': sha256, 'tamanho': tamanho, 'referencias': delta, 'data_atualizacao': datetime.utcnow()}
+        for sha256, (delta, tamanho) in deltas.items() if delta != 0
+    ]
+    if not linhas:
+        return
+
+    tabela = Arquivo.__table__
+    stmt = insert_com_conflito(conexao, tabela).values(linhas)
+    conexao.execute(stmt.on_conflict_do_update(
+        index_elements=['sha256'],
+        set_={
+            'referencias': tabela.c.referencias + stmt.excluded.referencias,
+            'data_atualizacao': stmt.excluded.data_atualizacao
+        }
+    ))
+
+
+class ArmazenamentoService:
+    """Armazenamento endereçado por conteúdo: arquivos iguais são gravados uma única vez"""
+
+    def __init__(self, raiz: str = PASTA_UPLOADS):
+        self.raiz = raiz
+        self.pasta_temporaria = os.path.join(raiz, 'tmp')
+        os.makedirs(self.pasta_temporaria, exist_ok=True)
+
+    def caminho(self, sha256: str) -> str:
+        return os.path.join(self.raiz, sha256[:2], sha256[2:4], sha256)
+
+    def salvar(self, stream: BinaryIO) -> Tuple[str, str, int]:
+        """
+        Gravar o conteúdo do stream calculando o SHA-256 durante a cópia.
+        Devolve (sha256, caminho, tamanho). Conteúdos iguais resultam no mesmo
+        caminho, então o arquivo fica gravado uma única vez.
+        """
+        temporario = os.path.join(self.pasta_temporaria, uuid.uuid4().hex)
+        hash_conteudo = hashlib.sha256()
+        tamanho = 0
+        try:
+            with open(temporario, 'wb') as destino:
+                while True:
+                    bloco = stream.read(TAMANHO_BLOCO)
+                    if not bloco:
+                        break
+                    hash_conteudo.update(bloco)
+                    destino.write(bloco)
+                    tamanho += len(bloco)
+            return self.publicar(temporario, hash_conteudo.hexdigest(), tamanho)
+        except Exception:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+    def _reservar(self, sha256: str, tamanho: int):
+        """
+        Garantir a linha do arquivo com data_atualizacao recente antes de publicá-lo,
+        numa transação própria. Se o commit do documento falhar, a linha continua
+        sem referências e o arquivo é removido por coletar_orfaos depois da carência.
+        Se a coleta estiver apagando este mesmo conteúdo, a reserva espera o
+        bloqueio da linha e o arquivo só é publicado depois da remoção.
+        """
+        tabela = Arquivo.__table__
+        with db.engine.begin() as conexao:
+            stmt = insert_com_conflito(conexao, tabela).values(
+                sha256=sha256, tamanho=tamanho, referencias=0, data_atualizacao=datetime.utcnow()
+            )
+            conexao.execute(stmt.on_conflict_do_update(
+                index_elements=['sha256'],
+                set_={'data_atualizacao': stmt.excluded.data_atualizacao}
+            ))
+
+    def publicar(self, temporario: str, sha256: str, tamanho: int,
+                 manter_temporario: bool = False) -> Tuple[str, str, int]:
+        """
+        Mover um arquivo temporário já com hash calculado para o seu lugar definitivo.
+        Com manter_temporario, o temporário continua no lugar (o conteúdo é ligado ou
+        copiado) para quem só pode apagá-lo depois do commit.
+        """
+        self._reservar(sha256, tamanho)
+        caminho = self.caminho(sha256)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        if manter_temporario:
+            copia = os.path.join(self.pasta_temporaria, uuid.uuid4().hex)
+            try:
+                os.link(temporario, copia)
+            except OSError:
+                shutil.copyfile(temporario, copia)
+            temporario = copia
+        # os.replace é atômico: leitores nunca veem um arquivo pela metade
+        os.replace(temporario, caminho)
+        return sha256, caminho, tamanho
+
+    def coletar_orfaos(self) -> int:
+        """Apagar arquivos sem documentos há mais tempo que a carência"""
+        limite = datetime.utcnow() - CARENCIA_ORFAOS
+        tabela = Arquivo.__table__
+        try:
+            # As linhas ficam bloqueadas até o commit, depois de apagados os arquivos:
+            # um upload do mesmo conteúdo (que passa por _reservar) ou um documento
+            # novo apontando para ele espera, e o FOR UPDATE reavalia as condições
+            # para linhas alteradas enquanto esperávamos.
+            removidos = db.session.execute(
+                select(tabela.c.sha256)
+                .where(and_(tabela.c.referencias <= 0, tabela.c.data_atualizacao < limite))
+                .with_for_update()
+            ).scalars().all()
+
+            for sha256 in removidos:
+                caminho = self.caminho(sha256)
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+
+            if removidos:
+                db.session.execute(delete(tabela).where(tabela.c.sha256.in_(removidos)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(removidos)
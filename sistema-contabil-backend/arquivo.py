@@ -0,0 +1,23 @@
+from datetime import datetime
+from src.models.user import db
+
+class Arquivo(db.Model):
+    __tablename__ = 'arquivos'
+
+    sha256 = db.Column(db.String(64), primary_key=True)  # conteúdo em <raiz>/ab/cd/<sha256>
+    tamanho = db.Column(db.BigInteger, nullable=False)
+    referencias = db.Column(db.Integer, nullable=False, default=0)  # documentos que apontam para o arquivo
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Arquivo {self.sha256} ({self.referencias} referências)>'
+
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'tamanho': self.tamanho,
+            'referencias': self.referencias,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
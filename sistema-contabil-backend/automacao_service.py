@@ -3,6 +3,7 @@ import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, date, timedelta
+from decimal import Decimal
 from typing import Dict, List, Optional
 import json
 import os
@@ -13,11 +14,27 @@ from src.models.mensalidade import Mensalidade
 from src.models.notificacao import Notificacao
 from src.models.user import db
 from src.services.ia_service import IAService
+from src.services.resumo_service import ResumoService
+from src.services.rollup_service import RollupService
+from src.services.cobertura_service import CoberturaService
+from src.services.armazenamento_service import ArmazenamentoService
+from src.services.upload_service import UploadService
+from src.services.conteudo_documento_service import SEM_TEXTOS
+from src.services.documento_service import fila_documentos, pool_ingestao
+
+# Documentos pendentes sem job enviados à fila de ingestão por execução
+MAX_DOCUMENTOS_ENFILEIRADOS = 500
+
 
 class AutomacaoService:
     def __init__(self):
         """Inicializar serviço de automação"""
         self.ia_service = IAService()
+        self.resumo_service = ResumoService()
+        self.rollup_service = RollupService()
+        self.cobertura_service = CoberturaService()
+        self.armazenamento_service = ArmazenamentoService()
+        self.upload_service = UploadService(self.armazenamento_service)
         self.smtp_host = os.getenv('SMTP_HOST', 'smtp.gmail.com')
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.smtp_user = os.getenv('SMTP_USER', '')
@@ -69,7 +86,7 @@ class AutomacaoService:
         try:
             data_limite = datetime.now() - timedelta(days=dias_limite)
             
-            documentos = Documento.query.filter(
+            documentos = Documento.query.options(*SEM_TEXTOS).filter(
                 Documento.status_processamento == 'pendente',
                 Documento.data_upload <= data_limite
             ).all()
@@ -334,46 +351,42 @@ class AutomacaoService:
             }
             
             if tipo_relatorio == 'obrigacoes':
-                obrigacoes_periodo = Obrigacao.query.filter(
-                    Obrigacao.data_vencimento >= inicio_periodo,
-                    Obrigacao.data_vencimento <= hoje
-                ).all()
+                # Agregado no banco a partir do rollup diário, sem carregar as obrigações
+                totais = self.rollup_service.totais('obrigacao', inicio_periodo, hoje, agrupar_por=('chave', 'status'))
                 
                 relatorio['dados'] = {
-                    'total_obrigacoes': len(obrigacoes_periodo),
-                    'pagas': len([o for o in obrigacoes_periodo if o.status == 'pago']),
-                    'pendentes': len([o for o in obrigacoes_periodo if o.status == 'pendente']),
-                    'valor_total': sum(float(o.valor) for o in obrigacoes_periodo if o.valor),
+                    'total_obrigacoes': sum(t['quantidade'] for t in totais),
+                    'pagas': sum(t['quantidade'] for t in totais if t['status'] == 'pago'),
+                    'pendentes': sum(t['quantidade'] for t in totais if t['status'] == 'pendente'),
+                    'valor_total': float(sum(t['valor'] for t in totais)),
                     'por_tipo': {}
                 }
                 
                 # Agrupar por tipo
-                for obrigacao in obrigacoes_periodo:
-                    tipo = obrigacao.tipo
-                    if tipo not in relatorio['dados']['por_tipo']:
-                        relatorio['dados']['por_tipo'][tipo] = {'quantidade': 0, 'valor': 0}
-                    relatorio['dados']['por_tipo'][tipo]['quantidade'] += 1
-                    if obrigacao.valor:
-                        relatorio['dados']['por_tipo'][tipo]['valor'] += float(obrigacao.valor)
+                por_tipo = {}
+                for total in totais:
+                    tipo = por_tipo.setdefault(total['chave'], {'quantidade': 0, 'valor': Decimal('0')})
+                    tipo['quantidade'] += total['quantidade']
+                    tipo['valor'] += total['valor']
+                relatorio['dados']['por_tipo'] = {
+                    tipo: {'quantidade': valores['quantidade'], 'valor': float(valores['valor'])}
+                    for tipo, valores in por_tipo.items()
+                }
             
             elif tipo_relatorio == 'documentos':
-                documentos_periodo = Documento.query.filter(
-                    Documento.data_upload >= datetime.combine(inicio_periodo, datetime.min.time())
-                ).all()
+                totais = self.rollup_service.totais('documento', inicio_periodo, agrupar_por=('chave', 'status'))
                 
                 relatorio['dados'] = {
-                    'total_documentos': len(documentos_periodo),
-                    'processados': len([d for d in documentos_periodo if d.status_processamento == 'processado']),
-                    'pendentes': len([d for d in documentos_periodo if d.status_processamento == 'pendente']),
+                    'total_documentos': sum(t['quantidade'] for t in totais),
+                    'processados': sum(t['quantidade'] for t in totais if t['status'] == 'processado'),
+                    'pendentes': sum(t['quantidade'] for t in totais if t['status'] == 'pendente'),
                     'por_categoria': {}
                 }
                 
                 # Agrupar por categoria
-                for documento in documentos_periodo:
-                    categoria = documento.categoria
-                    if categoria not in relatorio['dados']['por_categoria']:
-                        relatorio['dados']['por_categoria'][categoria] = 0
-                    relatorio['dados']['por_categoria'][categoria] += 1
+                for total in totais:
+                    categoria = total['chave']
+                    relatorio['dados']['por_categoria'][categoria] = relatorio['dados']['por_categoria'].get(categoria, 0) + total['quantidade']
             
             return relatorio
             
@@ -386,10 +399,15 @@ class AutomacaoService:
     
     def processar_documentos_automaticamente(self) -> Dict:
         """
-        Processar documentos pendentes automaticamente com IA
+        Enviar à fila de ingestão os documentos pendentes que não têm job pendente ou
+        em processamento (por exemplo, gravados antes da fila existir). O OCR e a
+        extração rodam no pool de ingestão, nunca em paralelo com um job do mesmo documento.
         """
         try:
-            documentos_pendentes = Documento.query.filter_by(status_processamento='pendente').limit(10).all()
+            documentos_pendentes = Documento.query.options(*SEM_TEXTOS).filter(
+                Documento.status_processamento == 'pendente',
+                fila_documentos.sem_job_ativo()
+            ).order_by(Documento.id).limit(MAX_DOCUMENTOS_ENFILEIRADOS).all()
             
             resultados = {
                 'total_processados': 0,
@@ -398,43 +416,21 @@ class AutomacaoService:
                 'detalhes': []
             }
             
-            for documento in documentos_pendentes:
-                try:
-                    # Simular leitura do documento
-                    texto_simulado = f"Documento: {documento.nome_arquivo} - Cliente: {documento.cliente.nome}"
-                    
-                    # Processar com IA
-                    resultado_ia = self.ia_service.analisar_documento(
-                        texto_simulado,
-                        documento.tipo_documento,
-                        documento.categoria
-                    )
-                    
-                    # Atualizar documento
-                    documento.resumo_ia = resultado_ia.get('resumo', '')
-                    documento.pontos_importantes = resultado_ia.get('pontos_importantes', '')
-                    documento.status_processamento = 'processado'
-                    documento.data_processamento = datetime.utcnow()
-                    
-                    resultados['sucessos'] += 1
-                    resultados['detalhes'].append({
-                        'documento_id': documento.id,
-                        'nome_arquivo': documento.nome_arquivo,
-                        'status': 'sucesso'
-                    })
-                    
-                except Exception as e:
-                    resultados['erros'] += 1
-                    resultados['detalhes'].append({
-                        'documento_id': documento.id,
-                        'nome_arquivo': documento.nome_arquivo,
-                        'status': 'erro',
-                        'erro': str(e)
-                    })
-                
+            jobs = [(documento, fila_documentos.enfileirar(documento.id)) for documento in documentos_pendentes]
+            db.session.commit()
+            if jobs:
+                pool_ingestao.acordar()
+            
+            for documento, job in jobs:
                 resultados['total_processados'] += 1
+                resultados['sucessos'] += 1
+                resultados['detalhes'].append({
+                    'documento_id': documento.id,
+                    'nome_arquivo': documento.nome_arquivo,
+                    'status': 'enfileirado',
+                    'job_id': job.id
+                })
             
-            db.session.commit()
             return resultados
             
         except Exception as e:
@@ -457,6 +453,11 @@ class AutomacaoService:
                 'lembretes': {},
                 'documentos': {},
                 'relatorios': {},
+                'resumo': {},
+                'rollup': {},
+                'cobertura': 0,
+                'arquivos_removidos': 0,
+                'uploads_expirados': 0,
                 'tempo_execucao': 0
             }
             
@@ -474,6 +475,16 @@ class AutomacaoService:
                 'documentos': self.gerar_relatorio_automatico('documentos', 'mensal')
             }
             
+            # Recalcular contadores do dashboard, o rollup do mês e a cobertura de documentos
+            # (corrige escritas em massa fora do ORM)
+            resultado_geral['resumo'] = self.resumo_service.recalcular()
+            resultado_geral['rollup'] = self.rollup_service.reconstruir(date.today().replace(day=1))
+            resultado_geral['cobertura'] = self.cobertura_service.reconstruir()
+            
+            # Apagar uploads que não pertencem mais a nenhum documento e uploads em blocos abandonados
+            resultado_geral['arquivos_removidos'] = self.armazenamento_service.coletar_orfaos()
+            resultado_geral['uploads_expirados'] = self.upload_service.limpar_expiradas()
+            
             fim = datetime.now()
             resultado_geral['tempo_execucao'] = (fim - inicio).total_seconds()
             
@@ -0,0 +1,87 @@
+from flask import Blueprint, current_app, jsonify, request
+from src.services.memo_service import ativar_memo
+from urllib.parse import urlsplit
+
+batch_bp = Blueprint('batch', __name__)
+
+# Número máximo de sub-requisições por chamada
+MAX_REQUISICOES = 20
+
+# Rotas que não podem ser chamadas dentro do batch (recursão e streams longos)
+ROTAS_BLOQUEADAS = ('/api/batch', '/api/eventos')
+
+
+def _validar_url(url):
+    if not isinstance(url, str) or not url:
+        return 'URL obrigatória'
+    partes = urlsplit(url)
+    if partes.scheme or partes.netloc:
+        return 'Use apenas caminhos relativos, ex.: /api/dashboard/resumo'
+    if not partes.path.startswith('/api/'):
+        return 'Apenas rotas /api/ são permitidas'
+    if any(partes.path == rota or partes.path.startswith(rota + '/') for rota in ROTAS_BLOQUEADAS):
+        return 'Rota não permitida em batch'
+    return None
+
+
+def _executar(url):
+    """Despachar um GET interno pelo Flask, compartilhando a sessão do banco e o memo do batch"""
+    with current_app.test_request_context(url, method='GET'):
+        resposta = current_app.full_dispatch_request()
+        if resposta.is_streamed:
+            return {'status': 400, 'corpo': {'erro': 'Rotas com streaming não são suportadas em batch'}}
+
+        corpo = resposta.get_json(silent=True)
+        if corpo is None:
+            corpo = resposta.get_data(as_text=True)
+
+        resultado = {'status': resposta.status_code, 'corpo': corpo}
+        if resposta.headers.get('ETag'):
+            resultado['etag'] = resposta.headers['ETag']
+        return resultado
+
+
+@batch_bp.route('/batch', methods=['POST'])
+def executar_batch():
+    """Executar várias leituras (GET) em uma única requisição"""
+    try:
+        data = request.json or {}
+        requisicoes = data.get('requisicoes')
+
+        if not isinstance(requisicoes, list) or not requisicoes:
+            return jsonify({'erro': 'Lista de requisições é obrigatória'}), 400
+        if len(requisicoes) > MAX_REQUISICOES:
+            return jsonify({'erro': f'Máximo de {MAX_REQUISICOES} requisições por batch'}), 400
+
+        # As sub-requisições reutilizam o contexto da aplicação desta requisição:
+        # mesma sessão do banco e mesmo memo de consultas
+        ativar_memo()
+
+        respostas = []
+        executadas = {}
+        for indice, item in enumerate(requisicoes):
+            if isinstance(item, str):
+                item = {'url': item}
+            if not isinstance(item, dict):
+                item = {}
+            url = item.get('url')
+            identificador = item.get('id', indice)
+
+            if item.get('metodo', 'GET').upper() != 'GET':
+                respostas.append({'id': identificador, 'url': url, 'status': 405,
+                                  'corpo': {'erro': 'Apenas GET é permitido em batch'}})
+                continue
+
+            erro = _validar_url(url)
+            if erro:
+                respostas.append({'id': identificador, 'url': url, 'status': 400, 'corpo': {'erro': erro}})
+                continue
+
+            # URLs repetidas no mesmo batch são calculadas uma única vez
+            if url not in executadas:
+                executadas[url] = _executar(url)
+            respostas.append(dict(executadas[url], id=identificador, url=url))
+
+        return jsonify({'respostas': respostas})
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,128 @@
+"""
+Micro-benchmark do extrator de campos fiscais.
+
+Compara as funções anteriores (extract_value_from_text + extract_date_from_text,
+com várias chamadas a re.search por texto) com o extrator de uma passada, que
+devolve todos os campos (CNPJ/CPF, chave de NF-e, linha digitável, datas,
+competência e valores) com os dígitos verificadores conferidos.
+
+Uso:
+    python benchmark_extracao.py [--textos 5000] [--repeticoes 3]
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+from typing import Callable, List
+from src.services.extracao_service import extrair_campos, extrair_campos_lote
+
+
+# Implementação anterior, mantida aqui só como referência de desempenho
+def extract_value_from_text_anterior(text):
+    match = re.search(r'R\$\s*(\d{1,3}(?:\.\d{3})*,\d{2})', text)
+    if match:
+        value_str = match.group(1).replace('.', '').replace(',', '.')
+        try:
+            return float(value_str)
+        except ValueError:
+            return None
+    match = re.search(r'\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})', text)
+    if match:
+        value_str = match.group(0).replace('.', '').replace(',', '.')
+        try:
+            return float(value_str)
+        except ValueError:
+            return None
+    return None
+
+
+def extract_date_from_text_anterior(text):
+    date_formats = [
+        r'(\d{2}/\d{2}/\d{4})',
+        r'(\d{2}-\d{2}-\d{4})',
+        r'(\d{4}-\d{2}-\d{2})'
+    ]
+    for pattern in date_formats:
+        match = re.search(pattern, text)
+        if match:
+            date_str = match.group(1)
+            try:
+                if '/' in date_str:
+                    return datetime.strptime(date_str, '%d/%m/%Y').strftime('%Y-%m-%d')
+                elif '-' in date_str and len(date_str.split('-')[0]) == 4:
+                    return datetime.strptime(date_str, '%Y-%m-%d').strftime('%Y-%m-%d')
+                elif '-' in date_str:
+                    return datetime.strptime(date_str, '%d-%m-%Y').strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+    return None
+
+
+def _digitos(aleatorio: random.Random, quantidade: int) -> str:
+    return ''.join(aleatorio.choice('0123456789') for _ in range(quantidade))
+
+
+def gerar_textos(quantidade: int, semente: int = 7) -> List[str]:
+    """Textos parecidos com a saída do OCR de notas, boletos e extratos"""
+    aleatorio = random.Random(semente)
+    palavras = ('nota', 'fiscal', 'serviço', 'tomador', 'prestador', 'município', 'descrição',
+                'quantidade', 'unitário', 'total', 'imposto', 'base', 'cálculo', 'observações')
+    textos = []
+    for _ in range(quantidade):
+        linhas = []
+        for _ in range(aleatorio.randint(20, 60)):
+            linha = ' '.join(aleatorio.choice(palavras) for _ in range(aleatorio.randint(3, 10)))
+            sorteio = aleatorio.random()
+            if sorteio < 0.08:
+                linha += f' R$ {aleatorio.randint(1, 99)}.{aleatorio.randint(0, 999):03d},{aleatorio.randint(0, 99):02d}'
+            elif sorteio < 0.12:
+                linha += f' {aleatorio.randint(1, 28):02d}/{aleatorio.randint(1, 12):02d}/2026'
+            elif sorteio < 0.14:
+                d = _digitos(aleatorio, 14)
+                linha += f' CNPJ {d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}'
+            elif sorteio < 0.15:
+                linha += ' chave ' + ' '.join(_digitos(aleatorio, 4) for _ in range(11))
+            elif sorteio < 0.16:
+                linha += f' competência {aleatorio.randint(1, 12):02d}/2026'
+            linhas.append(linha)
+        textos.append('\n'.join(linhas))
+    return textos
+
+
+def medir(descricao: str, funcao: Callable[[List[str]], object], textos: List[str], repeticoes: int) -> float:
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(textos)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    print(f'{descricao:<48} {melhor:>8.3f}s {len(textos) / melhor:>12.0f} textos/s')
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark do extrator de campos fiscais')
+    parser.add_argument('--textos', type=int, default=5000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    textos = gerar_textos(args.textos)
+    print(f'{len(textos)} textos, {sum(map(len, textos)) / len(textos):.0f} caracteres em média '
+          f'(melhor de {args.repeticoes})')
+
+    anterior = medir(
+        'anterior (valor + data)',
+        lambda lote: [(extract_value_from_text_anterior(t), extract_date_from_text_anterior(t)) for t in lote],
+        textos, args.repeticoes
+    )
+    atual = medir('extrator de uma passada (todos os campos)', lambda lote: list(extrair_campos_lote(lote)),
+                  textos, args.repeticoes)
+    medir('extrator, apenas válidos', lambda lote: list(extrair_campos_lote(lote, apenas_validos=True)),
+          textos, args.repeticoes)
+
+    total = sum(len(extrair_campos(texto)) for texto in textos)
+    print(f'\n{total} campos encontrados; extrator / anterior = {atual / anterior:.2f}x o tempo')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark da leitura de arquivos grandes de SPED e extratos OFX.
+
+Gera um SPED Fiscal sintético (0000, C100, C170, C190, E110...) e um extrato OFX
+com o tamanho pedido e compara a leitura com mmap (sped_ofx_service) com a
+leitura ingênua (arquivo inteiro em memória + splitlines). Mostra o tempo, a
+vazão e o pico de memória alocada pelo Python (tracemalloc) de cada forma.
+
+Uso:
+    python benchmark_importacao.py [--mb 200] [--transacoes 200000] [--repeticoes 1] [--pasta /tmp]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from typing import Callable
+from src.services.sped_ofx_service import CAMPOS_VALOR_SPED, CODIFICACAO_SPED, mapear, resumir_sped, transacoes_ofx
+
+
+def _valor(aleatorio: random.Random, maximo: int) -> str:
+    return f'{aleatorio.randint(0, maximo)},{aleatorio.randint(0, 99):02d}'
+
+
+def gerar_sped(caminho: str, megabytes: int, semente: int = 7):
+    """SPED Fiscal com documentos C100, itens C170 e resumos C190 até o tamanho pedido"""
+    aleatorio = random.Random(semente)
+    limite = megabytes * 1024 * 1024
+    with open(caminho, 'w', encoding=CODIFICACAO_SPED, newline='\r\n') as arquivo:
+        arquivo.write('|0000|017|0|01092026|30092026|EMPRESA EXEMPLO LTDA|11222333000181||SP|123456789|3550308|||A|1|\n')
+        arquivo.write('|0001|0|\n|0100|CONTADOR EXEMPLO|12345678909|1SP123456|||||||||||\n|C001|0|\n')
+        numero = 0
+        while arquivo.tell() < limite:
+            numero += 1
+            chave = ''.join(aleatorio.choice('0123456789') for _ in range(44))
+            arquivo.write(
+                f'|C100|0|1|PART{numero % 500}|55|00|001|{numero}|{chave}|0509{2026}|0509{2026}|'
+                f'{_valor(aleatorio, 50000)}|0|0,00|0,00|{_valor(aleatorio, 50000)}|9|0,00|0,00|0,00|'
+                f'{_valor(aleatorio, 50000)}|{_valor(aleatorio, 9000)}|0,00|0,00|{_valor(aleatorio, 900)}|'
+                f'{_valor(aleatorio, 900)}|{_valor(aleatorio, 900)}|0,00|0,00|\n'
+            )
+            for item in range(1, aleatorio.randint(2, 8)):
+                arquivo.write(
+                    f'|C170|{item}|PROD{aleatorio.randint(1, 9999)}|PRODUTO {item}|{aleatorio.randint(1, 50)},000|UN|'
+                    f'{_valor(aleatorio, 5000)}|0,00|0|000|5102|5102|{_valor(aleatorio, 5000)}|18,00|'
+                    f'{_valor(aleatorio, 900)}|0,00|0,00|0,00|0|||0,00|0,00|0,00|01|||0,00|0,00|0,00|0,00|0,00|0,00|'
+                    f'01|0,00|0,00|0,00|0,00|0,00|0,00|||\n'
+                )
+            arquivo.write(
+                f'|C190|000|5102|18,00|{_valor(aleatorio, 50000)}|{_valor(aleatorio, 50000)}|'
+                f'{_valor(aleatorio, 9000)}|0,00|0,00|0,00|{_valor(aleatorio, 900)}||\n'
+            )
+        arquivo.write('|C990|0|\n|E001|0|\n|E100|01092026|30092026|\n')
+        arquivo.write('|E110|125000,00|0,00|0,00|0,00|98000,00|0,00|0,00|0,00|0,00|27000,00|0,00|27000,00|0,00|0,00|\n')
+        arquivo.write('|E990|4|\n|9999|0|\n')
+
+
+def gerar_ofx(caminho: str, transacoes: int, semente: int = 7):
+    """Extrato OFX 1.x (SGML) com o número de transações pedido"""
+    aleatorio = random.Random(semente)
+    with open(caminho, 'w', encoding='latin-1', newline='\r\n') as arquivo:
+        arquivo.write('OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\n\n<OFX>\n<BANKMSGSRSV1>\n<STMTTRNRS>\n<STMTRS>\n'
+                      '<CURDEF>BRL\n<BANKACCTFROM>\n<BANKID>0341\n<ACCTID>12345-6\n</BANKACCTFROM>\n'
+                      '<BANKTRANLIST>\n<DTSTART>20260901\n<DTEND>20260930\n')
+        for numero in range(transacoes):
+            credito = aleatorio.random() < 0.4
+            valor = _valor(aleatorio, 20000).replace(',', '.')
+            arquivo.write(
+                f'<STMTTRN>\n<TRNTYPE>{"CREDIT" if credito else "DEBIT"}\n'
+                f'<DTPOSTED>202609{aleatorio.randint(1, 30):02d}120000[-3:BRT]\n'
+                f'<TRNAMT>{"" if credito else "-"}{valor}\n<FITID>{numero:012d}\n'
+                f'<MEMO>{"PIX RECEBIDO" if credito else "PAGAMENTO BOLETO"} {aleatorio.randint(1, 99999)}\n</STMTTRN>\n'
+            )
+        arquivo.write('</BANKTRANLIST>\n<LEDGERBAL>\n<BALAMT>1000.00\n<DTASOF>20260930\n</LEDGERBAL>\n'
+                      '</STMTRS>\n</STMTTRNRS>\n</BANKMSGSRSV1>\n</OFX>\n')
+
+
+# Leitura ingênua, como referência: o arquivo inteiro decodificado e dividido em memória
+def resumir_sped_ingenuo(caminho: str):
+    with open(caminho, encoding=CODIFICACAO_SPED) as arquivo:
+        linhas = arquivo.read().splitlines()
+    campos_valor = {registro.decode(): campos for registro, campos in CAMPOS_VALOR_SPED.items()}
+    totais = {}
+    for linha in linhas:
+        partes = linha.split('|')
+        campos = campos_valor.get(partes[1] if len(partes) > 1 else '')
+        if campos:
+            somas = totais.setdefault(partes[1], {})
+            for nome, indice in campos.items():
+                if indice < len(partes) and partes[indice]:
+                    somas[nome] = somas.get(nome, Decimal('0')) + Decimal(partes[indice].replace(',', '.'))
+    return len(linhas), totais
+
+
+def resumir_sped_mmap(caminho: str):
+    with mapear(caminho) as mapa:
+        resumo = resumir_sped(mapa)
+    return resumo.linhas, resumo.totais
+
+
+def somar_ofx_mmap(caminho: str):
+    with mapear(caminho) as mapa:
+        return sum(transacao.valor for transacao in transacoes_ofx(mapa))
+
+
+def medir(descricao: str, funcao: Callable[[str], object], caminho: str, repeticoes: int):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(caminho)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao(caminho)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    megabytes = os.path.getsize(caminho) / 1024 / 1024
+    print(f'{descricao:<36} {melhor:>8.2f}s {megabytes / melhor:>8.1f} MB/s   pico {pico / 1024 / 1024:>8.1f} MB')
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da leitura de SPED e OFX grandes')
+    parser.add_argument('--mb', type=int, default=200, help='tamanho do SPED gerado')
+    parser.add_argument('--transacoes', type=int, default=200000, help='transações do OFX gerado')
+    parser.add_argument('--repeticoes', type=int, default=1)
+    parser.add_argument('--pasta', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    caminho_sped = os.path.join(args.pasta, f'benchmark_sped_{args.mb}mb.txt')
+    caminho_ofx = os.path.join(args.pasta, f'benchmark_extrato_{args.transacoes}.ofx')
+    try:
+        inicio = time.perf_counter()
+        gerar_sped(caminho_sped, args.mb)
+        gerar_ofx(caminho_ofx, args.transacoes)
+        print(f'Arquivos gerados em {time.perf_counter() - inicio:.1f}s: '
+              f'SPED {os.path.getsize(caminho_sped) / 1024 / 1024:.0f} MB, '
+              f'OFX {os.path.getsize(caminho_ofx) / 1024 / 1024:.0f} MB ({args.transacoes} transações)\n')
+
+        linhas, totais = medir('SPED ingênuo (read + splitlines)', resumir_sped_ingenuo, caminho_sped, args.repeticoes)
+        linhas_mmap, totais_mmap = medir('SPED mmap (resumir_sped)', resumir_sped_mmap, caminho_sped, args.repeticoes)
+        if (linhas, totais) != (linhas_mmap, totais_mmap):
+            print('ATENÇÃO: totais diferentes entre as duas leituras')
+        medir('OFX mmap (transacoes_ofx)', somar_ofx_mmap, caminho_ofx, args.repeticoes)
+        print(f'\n{linhas_mmap} linhas no SPED; C100 VL_DOC = {totais_mmap["C100"]["vl_doc"]}')
+    finally:
+        for caminho in (caminho_sped, caminho_ofx):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark do pré-processamento de imagens antes do OCR.
+
+Compara tempo total (pré-processamento + Tesseract) e qualidade do texto com o
+perfil 'original' (imagem crua) e com os perfis de pré-processamento, sem usar
+o cache de OCR.
+
+Uso:
+    python benchmark_preprocessamento.py [pasta_do_corpus] [--perfis foto,digitalizado]
+
+O corpus é uma pasta de imagens; quando existe um .txt com o mesmo nome, ele é
+usado como texto esperado e a qualidade é a similaridade de caracteres com o OCR.
+Sem pasta, é gerado um corpus sintético de fotos de recibos (12 MP, coloridas,
+inclinadas e com iluminação irregular).
+"""
+import argparse
+import difflib
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from src.services.ocr_service import ocr_imagem
+from src.services.preprocessamento_service import preprocessar
+
+EXTENSOES_IMAGEM = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+LINHAS_RECIBO = [
+    'COMPROVANTE DE PAGAMENTO',
+    'Favorecido: Papelaria Central Ltda',
+    'CNPJ: 12.345.678/0001-95',
+    'Data do pagamento: {data}',
+    'Valor pago: R$ {valor}',
+    'Forma de pagamento: PIX',
+    'Autenticação bancária: {autenticacao}',
+    'Obrigado pela preferência'
+]
+
+
+def _fonte(tamanho: int):
+    for nome in ('DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'Arial.ttf'):
+        try:
+            return ImageFont.truetype(nome, tamanho)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=tamanho)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def gerar_corpus(pasta: str, quantidade: int = 6, semente: int = 42) -> List[str]:
+    """Gerar fotos sintéticas de recibos com o texto esperado ao lado"""
+    aleatorio = random.Random(semente)
+    gerador = np.random.default_rng(semente)
+    fonte = _fonte(72)
+    caminhos = []
+    for indice in range(quantidade):
+        linhas = [linha.format(
+            data=f'{aleatorio.randint(1, 28):02d}/{aleatorio.randint(1, 12):02d}/2026',
+            valor=f'{aleatorio.randint(10, 9999)},{aleatorio.randint(0, 99):02d}',
+            autenticacao=''.join(aleatorio.choice('0123456789ABCDEF') for _ in range(16))
+        ) for linha in LINHAS_RECIBO]
+
+        # Papel branco com o texto
+        papel = Image.new('L', (2200, 1400), 255)
+        desenho = ImageDraw.Draw(papel)
+        for numero, linha in enumerate(linhas):
+            desenho.text((120, 100 + numero * 150), linha, fill=20, font=fonte)
+        angulo = aleatorio.uniform(-4, 4)
+        mascara = Image.new('L', papel.size, 255).rotate(angulo, expand=True, fillcolor=0)
+        papel = papel.rotate(angulo, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+        # Foto 4000x3000: fundo de mesa, iluminação irregular e ruído do sensor
+        foto = np.empty((3000, 4000, 3), dtype=np.float32)
+        foto[:] = (120, 95, 70)
+        topo = (3000 - papel.height) // 2
+        esquerda = (4000 - papel.width) // 2
+        regiao = foto[topo:topo + papel.height, esquerda:esquerda + papel.width]
+        cobertura = (np.asarray(mascara, dtype=np.float32) / 255)[..., None]
+        regiao[:] = regiao * (1 - cobertura) + np.asarray(papel, dtype=np.float32)[..., None] * cobertura
+        luz = np.linspace(1.0, 0.55, 4000, dtype=np.float32)[None, :, None]
+        foto = foto * luz * (0.9, 0.88, 0.8) + gerador.normal(0, 8, foto.shape).astype(np.float32)
+        imagem = Image.fromarray(np.clip(foto, 0, 255).astype(np.uint8), 'RGB')
+
+        caminho = os.path.join(pasta, f'recibo_{indice:02d}.jpg')
+        imagem.save(caminho, quality=90)
+        with open(os.path.splitext(caminho)[0] + '.txt', 'w', encoding='utf-8') as arquivo:
+            arquivo.write('\n'.join(linhas))
+        caminhos.append(caminho)
+    return caminhos
+
+
+def _normalizar(texto: str) -> str:
+    return ' '.join(texto.split()).lower()
+
+
+def similaridade(esperado: str, obtido: str) -> float:
+    return difflib.SequenceMatcher(None, _normalizar(esperado), _normalizar(obtido), autojunk=False).ratio()
+
+
+def medir(caminho: str, perfil: str, esperado: Optional[str]) -> Dict:
+    with Image.open(caminho) as imagem:
+        inicio = time.perf_counter()
+        preparada = preprocessar(imagem, perfil)
+        meio = time.perf_counter()
+        resultado = ocr_imagem(preparada)
+        fim = time.perf_counter()
+    return {
+        'preprocessamento': meio - inicio,
+        'total': fim - inicio,
+        'confianca': resultado['confianca_media'],
+        'similaridade': similaridade(esperado, resultado['texto']) if esperado is not None else None
+    }
+
+
+def _media(valores: List[Optional[float]]) -> Optional[float]:
+    valores = [valor for valor in valores if valor is not None]
+    return sum(valores) / len(valores) if valores else None
+
+
+def _formatar(valor: Optional[float], formato: str) -> str:
+    return format(valor, formato) if valor is not None else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do pré-processamento antes do OCR')
+    parser.add_argument('corpus', nargs='?', help='pasta com imagens (e .txt com o texto esperado)')
+    parser.add_argument('--perfis', default='foto,digitalizado', help='perfis comparados com o original')
+    args = parser.parse_args()
+
+    if args.corpus:
+        caminhos = sorted(
+            os.path.join(args.corpus, nome) for nome in os.listdir(args.corpus)
+            if nome.lower().endswith(EXTENSOES_IMAGEM)
+        )
+    else:
+        pasta = tempfile.mkdtemp(prefix='corpus_ocr_')
+        print(f'Gerando corpus sintético em {pasta}')
+        caminhos = gerar_corpus(pasta)
+
+    perfis = ['original'] + [perfil for perfil in args.perfis.split(',') if perfil and perfil != 'original']
+    resultados: Dict[str, List[Dict]] = {perfil: [] for perfil in perfis}
+
+    print(f'{"arquivo":<24} {"perfil":<14} {"pré (s)":>8} {"total (s)":>10} {"confiança":>10} {"similaridade":>13}')
+    for caminho in caminhos:
+        texto_esperado = os.path.splitext(caminho)[0] + '.txt'
+        esperado = None
+        if os.path.exists(texto_esperado):
+            with open(texto_esperado, encoding='utf-8') as arquivo:
+                esperado = arquivo.read()
+        for perfil in perfis:
+            medida = medir(caminho, perfil, esperado)
+            resultados[perfil].append(medida)
+            print(f'{os.path.basename(caminho)[:24]:<24} {perfil:<14} '
+                  f'{medida["preprocessamento"]:>8.3f} {medida["total"]:>10.3f} '
+                  f'{_formatar(medida["confianca"], ".1f"):>10} {_formatar(medida["similaridade"], ".3f"):>13}')
+
+    print()
+    print(f'{"perfil":<14} {"tempo total (s)":>16} {"média (s)":>10} {"confiança":>10} {"similaridade":>13}')
+    for perfil, medidas in resultados.items():
+        total = sum(medida['total'] for medida in medidas)
+        print(f'{perfil:<14} {total:>16.2f} {_formatar(_media([m["total"] for m in medidas]), ".3f"):>10} '
+              f'{_formatar(_media([m["confianca"] for m in medidas]), ".1f"):>10} '
+              f'{_formatar(_media([m["similaridade"] for m in medidas]), ".3f"):>13}')
+
+
+if __name__ == '__main__':
+    main()
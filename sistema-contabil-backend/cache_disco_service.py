@@ -0,0 +1,106 @@
+import os
+import threading
+import uuid
+from typing import Callable, Dict, Iterator, Tuple
+
+# Base dos caches em disco endereçados pelo conteúdo do arquivo (OCR, miniaturas).
+# Roda também dentro dos processos de OCR, por isso não importa Flask nem o banco.
+
+# Fração do limite gravada por um processo entre duas podas do cache
+FRACAO_PODA = 0.1
+
+
+class CacheDisco:
+    """
+    Entradas em <pasta>/ab/<sha256>/<nome>. A data de modificação marca o último
+    uso e as menos usadas são apagadas quando o tamanho passa do limite. As
+    gravações são atômicas (arquivo temporário + rename), então vários processos
+    podem usar a mesma pasta.
+    """
+
+    def __init__(self, pasta: str, tamanho_maximo: int):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        self._gravados = 0
+        self._lock = threading.Lock()
+
+    def _pasta_arquivo(self, sha256: str) -> str:
+        return os.path.join(self.pasta, sha256[:2], sha256)
+
+    def _e_entrada(self, nome: str) -> bool:
+        """Arquivos da pasta que contam como entradas do cache"""
+        return not nome.endswith('.tmp')
+
+    def _gravar(self, destino: str, escrever: Callable[[str], None]):
+        """Gravar a entrada com escrever(caminho_temporario) e publicá-la; poda o cache de tempos em tempos"""
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = f'{destino}.{uuid.uuid4().hex}.tmp'
+        try:
+            escrever(temporario)
+            tamanho = os.path.getsize(temporario)
+            os.replace(temporario, destino)
+        except OSError:
+            self._remover(temporario)
+            raise
+
+        with self._lock:
+            self._gravados += tamanho
+            podar = self._gravados >= self.tamanho_maximo * FRACAO_PODA
+            if podar:
+                self._gravados = 0
+        if podar:
+            self.podar()
+
+    def _entradas(self) -> Iterator[Tuple[str, int, float]]:
+        if not os.path.isdir(self.pasta):
+            return
+        for prefixo in os.scandir(self.pasta):
+            if not prefixo.is_dir():
+                continue
+            for pasta_arquivo in os.scandir(prefixo.path):
+                if not pasta_arquivo.is_dir():
+                    continue
+                # Outro processo pode estar apagando entradas ao mesmo tempo
+                try:
+                    for entrada in os.scandir(pasta_arquivo.path):
+                        if self._e_entrada(entrada.name):
+                            estado = entrada.stat()
+                            yield entrada.path, estado.st_size, estado.st_mtime
+                except FileNotFoundError:
+                    continue
+
+    def podar(self) -> int:
+        """Apagar as entradas usadas há mais tempo até o cache ficar abaixo de 90% do limite"""
+        entradas = list(self._entradas())
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        if total <= self.tamanho_maximo:
+            return 0
+
+        removidas = 0
+        alvo = self.tamanho_maximo * 0.9
+        for caminho, tamanho, _ in sorted(entradas, key=lambda entrada: entrada[2]):
+            if total <= alvo:
+                break
+            self._remover(caminho)
+            total -= tamanho
+            removidas += 1
+        return removidas
+
+    def estatisticas(self) -> Dict:
+        entradas = list(self._entradas())
+        return {
+            'pasta': self.pasta,
+            'entradas': len(entradas),
+            'tamanho': sum(tamanho for _, tamanho, _ in entradas),
+            'tamanho_maximo': self.tamanho_maximo
+        }
+
+    def _remover(self, caminho: str):
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            return
+        try:
+            os.rmdir(os.path.dirname(caminho))
+        except OSError:
+            pass
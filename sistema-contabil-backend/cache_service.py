@@ -0,0 +1,143 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional
+from flask import Response, make_response, request
+from sqlalchemy import select
+from src.models.cliente import Cliente
+from src.models.obrigacao import Obrigacao
+from src.models.documento import Documento
+from src.models.mensalidade import Mensalidade
+from src.models.notificacao import Notificacao
+from src.models.geracao_tabela import GeracaoTabela
+from src.models.user import db
+from src.services.alteracoes_service import insert_com_conflito, observar
+from src.services.memo_service import memorizar
+
+# Número máximo de respostas guardadas em memória por processo
+MAX_RESPOSTAS = 512
+
+
+def _incrementar_geracao(conexao, tabela: str):
+    """Incrementar a geração da tabela dentro da transação da escrita"""
+    geracoes = GeracaoTabela.__table__
+    stmt = insert_com_conflito(conexao, geracoes).values(
+        tabela=tabela, geracao=1, data_atualizacao=datetime.utcnow()
+    )
+    conexao.execute(stmt.on_conflict_do_update(
+        index_elements=['tabela'],
+        set_={'geracao': geracoes.c.geracao + 1, 'data_atualizacao': stmt.excluded.data_atualizacao}
+    ))
+
+
+def _observar_tabela(modelo):
+    colunas = tuple(coluna.key for coluna in modelo.__table__.columns)
+
+    @observar(modelo, colunas)
+    def _invalidar(conexao, alteracoes):
+        _incrementar_geracao(conexao, modelo.__tablename__)
+
+
+for _modelo in (Cliente, Obrigacao, Documento, Mensalidade, Notificacao):
+    _observar_tabela(_modelo)
+
+
+class CacheRespostas:
+    """Cache LRU de corpos de resposta, indexado pelo ETag"""
+
+    def __init__(self, max_itens: int = MAX_RESPOSTAS):
+        self.max_itens = max_itens
+        self._itens: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, etag: str) -> Optional[tuple]:
+        with self._lock:
+            item = self._itens.get(etag)
+            if item is not None:
+                self._itens.move_to_end(etag)
+            return item
+
+    def guardar(self, etag: str, corpo: bytes, mimetype: str):
+        with self._lock:
+            self._itens[etag] = (corpo, mimetype)
+            self._itens.move_to_end(etag)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+cache_respostas = CacheRespostas()
+
+
+def _ler_geracoes() -> Dict[str, int]:
+    linhas = db.session.execute(select(GeracaoTabela.tabela, GeracaoTabela.geracao)).all()
+    return {linha.tabela: linha.geracao for linha in linhas}
+
+
+def obter_geracoes(tabelas: Iterable[str]) -> Dict[str, int]:
+    """Ler as gerações atuais das tabelas (uma linha por tabela; lidas juntas em uma consulta)"""
+    geracoes = memorizar('geracoes_tabela', _ler_geracoes)
+    return {tabela: geracoes.get(tabela, 0) for tabela in tabelas}
+
+
+def calcular_etag(geracoes: Dict[str, int], formato: Optional[str] = None) -> str:
+    """
+    ETag forte derivado do endpoint, dos parâmetros, do formato negociado, das
+    gerações das tabelas e do dia atual (as respostas com vencidas/hoje mudam
+    na virada do dia).
+    """
+    argumentos = sorted(request.args.items(multi=True))
+    chave = repr((request.path, argumentos, formato, sorted(geracoes.items()), date.today().isoformat()))
+    return hashlib.sha256(chave.encode('utf-8')).hexdigest()
+
+
+def _resposta_do_cache(etag: str, corpo: bytes, mimetype: str) -> Response:
+    resposta = Response(corpo, mimetype=mimetype)
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
+
+def em_cache(*tabelas: str, formato: Optional[Callable[[], str]] = None):
+    """
+    Decorador para rotas GET cujas respostas dependem apenas das tabelas informadas.
+
+    As gerações das tabelas ficam no banco, então uma escrita feita por qualquer
+    worker muda o ETag para todos. Clientes com If-None-Match válido recebem 304
+    sem que a rota seja executada; os demais recebem o corpo guardado em memória
+    quando disponível.
+
+    Rotas que negociam o formato pelo Accept informam `formato`, que devolve o
+    formato escolhido; ele entra no ETag e as respostas levam Vary: Accept.
+    """
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = calcular_etag(obter_geracoes(tabelas), formato() if formato else None)
+
+            if etag in request.if_none_match:
+                resposta = Response(status=304)
+                resposta.set_etag(etag)
+                resposta.headers['Cache-Control'] = 'no-cache'
+            else:
+                item = cache_respostas.obter(etag)
+                if item is not None:
+                    resposta = _resposta_do_cache(etag, *item)
+                else:
+                    resposta = make_response(view(*args, **kwargs))
+                    if resposta.status_code == 200 and not resposta.is_streamed:
+                        corpo = resposta.get_data()
+                        cache_respostas.guardar(etag, corpo, resposta.mimetype)
+                        resposta.set_etag(etag)
+                        resposta.headers['Cache-Control'] = 'no-cache'
+
+            if formato:
+                resposta.vary.add('Accept')
+            return resposta
+        return wrapper
+    return decorador
@@ -0,0 +1,273 @@
+import calendar
+import unicodedata
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import and_, select
+from src.models.cliente import Cliente
+from src.models.obrigacao import Obrigacao
+from src.models.feriado import Feriado
+from src.models.user import db
+from src.services.alteracoes_service import insert_com_conflito
+from src.services.obrigacao_lote_service import ObrigacaoLoteService
+
+# Feriados nacionais de data fixa (mês, dia)
+FERIADOS_FIXOS = {
+    (1, 1): 'Confraternização Universal',
+    (4, 21): 'Tiradentes',
+    (5, 1): 'Dia do Trabalho',
+    (9, 7): 'Independência do Brasil',
+    (10, 12): 'Nossa Senhora Aparecida',
+    (11, 2): 'Finados',
+    (11, 15): 'Proclamação da República',
+    (11, 20): 'Dia Nacional de Zumbi e da Consciência Negra',
+    (12, 25): 'Natal'
+}
+
+# Feriados móveis sem expediente bancário (dias a partir da Páscoa)
+FERIADOS_MOVEIS = {
+    -48: 'Carnaval (segunda-feira)',
+    -47: 'Carnaval (terça-feira)',
+    -2: 'Sexta-feira Santa',
+    60: 'Corpus Christi'
+}
+
+# Tipos de vencimento:
+#   ('dia', N, 'anterior' | 'posterior')  dia N, antecipado ou prorrogado se não for dia útil
+#   ('ultimo_dia_util',)                  último dia útil do mês
+#   ('dia_util', N)                       N-ésimo dia útil do mês
+# 'meses_apos' conta a partir do mês de competência; 'meses' restringe a competências
+# específicas (obrigações trimestrais)
+_FGTS = {'tipo': 'FGTS', 'descricao': 'FGTS Digital', 'vencimento': ('dia', 20, 'anterior'), 'meses_apos': 1}
+_DCTFWEB = {'tipo': 'DCTFWeb', 'descricao': 'Declaração DCTFWeb', 'vencimento': ('dia', 15, 'anterior'), 'meses_apos': 1}
+_INSS = {'tipo': 'INSS', 'descricao': 'DARF Previdenciário (DCTFWeb)', 'vencimento': ('dia', 20, 'anterior'), 'meses_apos': 1}
+_IRRF = {'tipo': 'IRRF', 'descricao': 'IRRF sobre folha de pagamento', 'codigo_receita': '0561',
+         'vencimento': ('dia', 20, 'anterior'), 'meses_apos': 1}
+_REINF = {'tipo': 'EFD-Reinf', 'descricao': 'Escrituração EFD-Reinf', 'vencimento': ('dia', 15, 'anterior'), 'meses_apos': 1}
+_EFD_CONTRIBUICOES = {'tipo': 'EFD-Contribuições', 'descricao': 'Escrituração EFD-Contribuições',
+                      'vencimento': ('dia_util', 10), 'meses_apos': 2}
+_TRIMESTRAL = (3, 6, 9, 12)
+
+REGRAS_POR_REGIME: Dict[str, List[Dict]] = {
+    'simples_nacional': [
+        {'tipo': 'DAS', 'descricao': 'DAS - Simples Nacional (PGDAS-D)', 'vencimento': ('dia', 20, 'posterior'), 'meses_apos': 1},
+        _FGTS, _DCTFWEB, _INSS
+    ],
+    'lucro_presumido': [
+        {'tipo': 'PIS', 'descricao': 'PIS cumulativo', 'codigo_receita': '8109',
+         'vencimento': ('dia', 25, 'anterior'), 'meses_apos': 1},
+        {'tipo': 'COFINS', 'descricao': 'COFINS cumulativa', 'codigo_receita': '2172',
+         'vencimento': ('dia', 25, 'anterior'), 'meses_apos': 1},
+        {'tipo': 'IRPJ', 'descricao': 'IRPJ Lucro Presumido (trimestral)', 'codigo_receita': '2089',
+         'vencimento': ('ultimo_dia_util',), 'meses_apos': 1, 'meses': _TRIMESTRAL},
+        {'tipo': 'CSLL', 'descricao': 'CSLL Lucro Presumido (trimestral)', 'codigo_receita': '2372',
+         'vencimento': ('ultimo_dia_util',), 'meses_apos': 1, 'meses': _TRIMESTRAL},
+        _IRRF, _FGTS, _DCTFWEB, _INSS, _REINF, _EFD_CONTRIBUICOES
+    ],
+    'lucro_real': [
+        {'tipo': 'PIS', 'descricao': 'PIS não cumulativo', 'codigo_receita': '6912',
+         'vencimento': ('dia', 25, 'anterior'), 'meses_apos': 1},
+        {'tipo': 'COFINS', 'descricao': 'COFINS não cumulativa', 'codigo_receita': '5856',
+         'vencimento': ('dia', 25, 'anterior'), 'meses_apos': 1},
+        {'tipo': 'IRPJ', 'descricao': 'IRPJ Lucro Real - estimativa mensal', 'codigo_receita': '2362',
+         'vencimento': ('ultimo_dia_util',), 'meses_apos': 1},
+        {'tipo': 'CSLL', 'descricao': 'CSLL Lucro Real - estimativa mensal', 'codigo_receita': '2484',
+         'vencimento': ('ultimo_dia_util',), 'meses_apos': 1},
+        _IRRF, _FGTS, _DCTFWEB, _INSS, _REINF, _EFD_CONTRIBUICOES
+    ]
+}
+
+
+def normalizar_regime(regime: Optional[str]) -> Optional[str]:
+    """'Simples Nacional', 'simples', 'LUCRO PRESUMIDO'... -> chave de REGRAS_POR_REGIME"""
+    if not regime:
+        return None
+    texto = unicodedata.normalize('NFKD', regime).encode('ascii', 'ignore').decode('ascii').lower()
+    if 'simples' in texto or texto.strip() == 'mei':
+        return 'simples_nacional'
+    if 'presumido' in texto:
+        return 'lucro_presumido'
+    if 'real' in texto:
+        return 'lucro_real'
+    return None
+
+
+def pascoa(ano: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)"""
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(ano, mes, dia)
+
+
+def feriados_nacionais(ano: int) -> Dict[date, str]:
+    feriados = {date(ano, mes, dia): descricao for (mes, dia), descricao in FERIADOS_FIXOS.items()}
+    domingo_pascoa = pascoa(ano)
+    for deslocamento, descricao in FERIADOS_MOVEIS.items():
+        feriados[domingo_pascoa + timedelta(days=deslocamento)] = descricao
+    return feriados
+
+
+def _somar_meses(ano: int, mes: int, meses: int):
+    indice = ano * 12 + (mes - 1) + meses
+    return indice // 12, indice % 12 + 1
+
+
+class CalendarioFiscalService:
+    """Gera as obrigações do mês a partir de regras fixas por regime tributário, sem IA"""
+
+    def __init__(self):
+        self.lote_service = ObrigacaoLoteService()
+
+    def garantir_feriados(self, anos: Iterable[int]):
+        """Gravar os feriados nacionais dos anos pedidos que ainda não estão na tabela"""
+        anos = sorted(set(anos))
+        existentes = set(db.session.execute(
+            select(Feriado.data).where(and_(
+                Feriado.nacional == True,
+                Feriado.data >= date(anos[0], 1, 1),
+                Feriado.data <= date(anos[-1], 12, 31)
+            ))
+        ).scalars())
+
+        linhas = [
+            {'data': data, 'descricao': descricao, 'nacional': True, 'data_criacao': datetime.utcnow()}
+            for ano in anos
+            for data, descricao in feriados_nacionais(ano).items()
+            if data not in existentes
+        ]
+        if not linhas:
+            return
+        try:
+            conexao = db.session.connection()
+            conexao.execute(insert_com_conflito(conexao, Feriado.__table__).values(linhas).on_conflict_do_nothing())
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def carregar_feriados(self, anos: Iterable[int]) -> Set[date]:
+        """Feriados (nacionais e locais) dos anos pedidos, com uma única consulta"""
+        anos = sorted(set(anos))
+        self.garantir_feriados(anos)
+        return set(db.session.execute(
+            select(Feriado.data).where(and_(
+                Feriado.data >= date(anos[0], 1, 1),
+                Feriado.data <= date(anos[-1], 12, 31)
+            ))
+        ).scalars())
+
+    @staticmethod
+    def dia_util(data: date, feriados: Set[date]) -> bool:
+        return data.weekday() < 5 and data not in feriados
+
+    def ajustar(self, data: date, feriados: Set[date], direcao: str) -> date:
+        passo = timedelta(days=-1 if direcao == 'anterior' else 1)
+        while not self.dia_util(data, feriados):
+            data += passo
+        return data
+
+    def calcular_vencimento(self, vencimento: tuple, ano: int, mes: int, feriados: Set[date]) -> date:
+        ultimo_dia = calendar.monthrange(ano, mes)[1]
+        if vencimento[0] == 'dia':
+            return self.ajustar(date(ano, mes, min(vencimento[1], ultimo_dia)), feriados, vencimento[2])
+        if vencimento[0] == 'ultimo_dia_util':
+            return self.ajustar(date(ano, mes, ultimo_dia), feriados, 'anterior')
+        if vencimento[0] == 'dia_util':
+            data, contagem = date(ano, mes, 1), 0
+            while True:
+                if self.dia_util(data, feriados):
+                    contagem += 1
+                    if contagem == vencimento[1]:
+                        return data
+                data += timedelta(days=1)
+        raise ValueError(f'Tipo de vencimento desconhecido: {vencimento[0]}')
+
+    def _anos_de_vencimento(self, ano: int, mes: int) -> List[int]:
+        maior_deslocamento = max(regra['meses_apos'] for regras in REGRAS_POR_REGIME.values() for regra in regras)
+        return sorted({_somar_meses(ano, mes, deslocamento)[0] for deslocamento in range(maior_deslocamento + 1)})
+
+    def obrigacoes_do_mes(self, regime: str, mes_referencia: str, feriados: Optional[Set[date]] = None) -> List[Dict]:
+        """
+        Obrigações de uma competência (YYYY-MM) para o regime informado.
+        Devolve lista vazia se o regime não tiver regras (casos tratados pela IA).
+        """
+        ano, mes = (int(parte) for parte in mes_referencia.split('-'))
+        if not 1 <= mes <= 12:
+            raise ValueError('Mês de referência inválido. Use YYYY-MM')
+        regras = REGRAS_POR_REGIME.get(normalizar_regime(regime), [])
+        if feriados is None:
+            feriados = self.carregar_feriados(self._anos_de_vencimento(ano, mes))
+
+        obrigacoes = []
+        for regra in regras:
+            if 'meses' in regra and mes not in regra['meses']:
+                continue
+            ano_vencimento, mes_vencimento = _somar_meses(ano, mes, regra['meses_apos'])
+            obrigacoes.append({
+                'tipo': regra['tipo'],
+                'descricao': f"{regra['descricao']} - competência {mes:02d}/{ano}",
+                'data_vencimento': self.calcular_vencimento(regra['vencimento'], ano_vencimento, mes_vencimento, feriados),
+                'mes_referencia': mes_referencia,
+                'codigo_receita': regra.get('codigo_receita')
+            })
+        return obrigacoes
+
+    def gerar_mes(self, mes_referencia: str, cliente_ids: Optional[List[int]] = None) -> Dict:
+        """
+        Gerar as obrigações da competência para todos os clientes ativos (ou os informados)
+        em um único lote. Obrigações já existentes (cliente, tipo, mês) são mantidas; o
+        índice único de (cliente, tipo, vencimento) evita duplicatas em gerações simultâneas.
+        """
+        ano, mes = (int(parte) for parte in mes_referencia.split('-'))
+        if not 1 <= mes <= 12:
+            raise ValueError('Mês de referência inválido. Use YYYY-MM')
+        feriados = self.carregar_feriados(self._anos_de_vencimento(ano, mes))
+
+        consulta = select(Cliente.id, Cliente.nome, Cliente.regime_tributario).where(Cliente.ativo == True)
+        if cliente_ids:
+            consulta = consulta.where(Cliente.id.in_(cliente_ids))
+        clientes = db.session.execute(consulta).all()
+
+        existentes = set(db.session.execute(
+            select(Obrigacao.cliente_id, Obrigacao.tipo).where(Obrigacao.mes_referencia == mes_referencia)
+        ).all())
+
+        modelos: Dict[str, List[Dict]] = {}
+        itens, sem_regra, ja_existentes = [], [], 0
+        for cliente in clientes:
+            regime = normalizar_regime(cliente.regime_tributario)
+            if regime is None:
+                sem_regra.append({'cliente_id': cliente.id, 'nome': cliente.nome,
+                                  'regime_tributario': cliente.regime_tributario})
+                continue
+            if regime not in modelos:
+                modelos[regime] = self.obrigacoes_do_mes(regime, mes_referencia, feriados)
+            for obrigacao in modelos[regime]:
+                if (cliente.id, obrigacao['tipo']) in existentes:
+                    ja_existentes += 1
+                    continue
+                itens.append(dict(
+                    obrigacao,
+                    cliente_id=cliente.id,
+                    data_vencimento=obrigacao['data_vencimento'].isoformat()
+                ))
+
+        resultado = (
+            self.lote_service.criar(itens, ignorar_existentes=True) if itens
+            else {'criadas': 0, 'ignoradas': 0, 'ids': [], 'erros': []}
+        )
+        return {
+            'mes_referencia': mes_referencia,
+            'clientes': len(clientes),
+            'criadas': resultado['criadas'],
+            'existentes': ja_existentes + resultado['ignoradas'],
+            'erros': resultado['erros'],
+            'sem_regra': sem_regra
+        }
@@ -0,0 +1,179 @@
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import func, insert, literal, select
+from src.models.documento import Documento
+from src.models.documento_campo import DocumentoCampo
+from src.models.user import db
+from src.services.extracao_service import Campo, valor_principal
+from src.services.nota_xml_service import NotaFiscalXML
+
+# Campos conferidos por dígito verificador são tratados como certos; os demais
+# recebem a confiança base do tipo (um valor com "R$" é mais seguro que um número solto)
+CONFIANCA_VERIFICADA = Decimal('1.000')
+CONFIANCA_POR_TIPO = {
+    'valor_moeda': Decimal('0.900'),
+    'valor': Decimal('0.500'),
+    'data': Decimal('0.800'),
+    'competencia': Decimal('0.800')
+}
+TIPOS_VERIFICADOS = ('cnpj', 'cpf', 'chave_nfe', 'linha_digitavel', 'arrecadacao')
+
+# Campo com o valor escolhido para o documento (o mesmo de extracted_value)
+CAMPO_VALOR_TOTAL = 'valor_total'
+
+# Linhas por INSERT (executemany) ao gravar os campos das notas de um XML
+TAMANHO_LOTE_CAMPOS = 1000
+
+
+def _confianca(campo: Campo) -> Decimal:
+    if campo.tipo in TIPOS_VERIFICADOS:
+        return CONFIANCA_VERIFICADA
+    if campo.tipo == 'valor' and campo.texto.upper().startswith('R$'):
+        return CONFIANCA_POR_TIPO['valor_moeda']
+    return CONFIANCA_POR_TIPO.get(campo.tipo, Decimal('0'))
+
+
+def _linha(documento_id: int, nome: str, campo: Campo) -> Dict:
+    linha = {
+        'documento_id': documento_id,
+        'campo': nome,
+        'valor_decimal': None,
+        'valor_data': None,
+        'valor_texto': None,
+        'confianca': _confianca(campo),
+        'posicao': campo.inicio
+    }
+    if campo.tipo == 'valor':
+        linha['valor_decimal'] = campo.valor
+    elif campo.tipo == 'data':
+        linha['valor_data'] = campo.valor
+    else:
+        linha['valor_texto'] = campo.valor
+    return linha
+
+
+def linhas_campos(documento_id: int, campos: List[Campo]) -> List[Dict]:
+    """Linhas de documento_campos para os campos válidos extraídos de um documento"""
+    validos = [campo for campo in campos if campo.valido]
+    linhas = [_linha(documento_id, campo.tipo, campo) for campo in validos]
+    total = valor_principal(validos)
+    if total is not None:
+        escolhido = next(campo for campo in validos if campo.tipo == 'valor' and campo.valor == total)
+        linhas.append(_linha(documento_id, CAMPO_VALOR_TOTAL, escolhido))
+    return linhas
+
+
+def linhas_notas(documento_id: int, notas: Iterable[NotaFiscalXML]) -> Iterator[Dict]:
+    """
+    Linhas de documento_campos para notas lidas de XML, geradas nota a nota. Os dados
+    vêm estruturados, com confiança 1; `posicao` guarda a ordem da nota no arquivo.
+    """
+    for ordem, nota in enumerate(notas):
+        linhas = []
+
+        def adicionar(campo, valor_decimal=None, valor_data=None, valor_texto=None):
+            if valor_decimal is None and valor_data is None and valor_texto is None:
+                return
+            linhas.append({
+                'documento_id': documento_id,
+                'campo': campo,
+                'valor_decimal': valor_decimal,
+                'valor_data': valor_data,
+                'valor_texto': valor_texto,
+                'confianca': CONFIANCA_VERIFICADA,
+                'posicao': ordem
+            })
+
+        adicionar('chave_nfse' if nota.modelo == 'NFSE' else 'chave_nfe', valor_texto=nota.chave)
+        adicionar('numero_nota', valor_texto=nota.numero)
+        adicionar('data', valor_data=nota.data_emissao)
+        adicionar('cnpj_emitente', valor_texto=nota.emitente_cnpj)
+        destinatario = nota.destinatario_documento
+        adicionar('cpf_destinatario' if destinatario and len(destinatario) == 11 else 'cnpj_destinatario',
+                  valor_texto=destinatario)
+        adicionar(CAMPO_VALOR_TOTAL, valor_decimal=nota.valor_total)
+        for imposto, valor in nota.impostos.items():
+            adicionar(f'imposto_{imposto}', valor_decimal=valor)
+        yield from linhas
+
+
+class CamposDocumentoService:
+    def _substituir(self, documento_id: int, linhas: Iterable[Dict]) -> int:
+        """Apagar os campos do documento e inserir as linhas em lotes de TAMANHO_LOTE_CAMPOS"""
+        db.session.query(DocumentoCampo).filter(
+            DocumentoCampo.documento_id == documento_id
+        ).delete(synchronize_session=False)
+        total = 0
+        lote: List[Dict] = []
+        for linha in linhas:
+            lote.append(linha)
+            if len(lote) >= TAMANHO_LOTE_CAMPOS:
+                db.session.execute(insert(DocumentoCampo.__table__), lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            db.session.execute(insert(DocumentoCampo.__table__), lote)
+            total += len(lote)
+        return total
+
+    def gravar(self, documento_id: int, campos: List[Campo]) -> int:
+        """
+        Substituir os campos do documento na sessão atual; são gravados no mesmo
+        commit do resultado do processamento.
+        """
+        return self._substituir(documento_id, linhas_campos(documento_id, campos))
+
+    def gravar_notas(self, documento_id: int, notas: Iterable[NotaFiscalXML]) -> int:
+        """
+        Substituir os campos do documento pelos dados das notas do XML, consumindo
+        `notas` à medida que são lidas (na sessão atual, sem commit)
+        """
+        return self._substituir(documento_id, linhas_notas(documento_id, notas))
+
+    def copiar(self, origem_id: int, destino_id: int) -> int:
+        """Copiar os campos de um documento de mesmo conteúdo (sem novo OCR)"""
+        db.session.query(DocumentoCampo).filter(
+            DocumentoCampo.documento_id == destino_id
+        ).delete(synchronize_session=False)
+        colunas = ['campo', 'valor_decimal', 'valor_data', 'valor_texto', 'confianca', 'posicao']
+        origem = select(
+            literal(destino_id), *[getattr(DocumentoCampo, coluna) for coluna in colunas]
+        ).where(DocumentoCampo.documento_id == origem_id)
+        resultado = db.session.execute(
+            insert(DocumentoCampo.__table__).from_select(['documento_id'] + colunas, origem)
+        )
+        return resultado.rowcount
+
+    def listar(self, documento_id: int) -> List[DocumentoCampo]:
+        return DocumentoCampo.query.filter_by(documento_id=documento_id).order_by(DocumentoCampo.posicao).all()
+
+    def totais_por_cliente(self, mes_referencia: str, campo: str = CAMPO_VALOR_TOTAL,
+                           categoria: Optional[str] = None, cliente_id: Optional[int] = None) -> List[Dict]:
+        """
+        Soma e quantidade de um campo numérico por cliente no mês (por exemplo,
+        total das notas fiscais de cada cliente), lidas só de documento_campos e
+        documentos pelos índices de (mes_referencia, cliente_id) e (campo, documento_id).
+        """
+        consulta = db.session.query(
+            Documento.cliente_id,
+            func.count(DocumentoCampo.id),
+            func.sum(DocumentoCampo.valor_decimal)
+        ).join(
+            Documento, Documento.id == DocumentoCampo.documento_id
+        ).filter(
+            Documento.mes_referencia == mes_referencia,
+            DocumentoCampo.campo == campo
+        )
+        if categoria:
+            consulta = consulta.filter(Documento.categoria == categoria)
+        if cliente_id is not None:
+            consulta = consulta.filter(Documento.cliente_id == cliente_id)
+
+        return [
+            {
+                'cliente_id': cliente,
+                'quantidade': quantidade,
+                'total': float(total) if total is not None else 0
+            }
+            for cliente, quantidade, total in consulta.group_by(Documento.cliente_id).all()
+        ]
@@ -0,0 +1,17 @@
+from datetime import datetime
+from src.models.user import db
+
+class CargaInicial(db.Model):
+    __tablename__ = 'cargas_iniciais'
+
+    nome = db.Column(db.String(50), primary_key=True)  # tabela derivada já carregada a partir das tabelas de origem
+    data_conclusao = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CargaInicial {self.nome}>'
+
+    def to_dict(self):
+        return {
+            'nome': self.nome,
+            'data_conclusao': self.data_conclusao.isoformat() if self.data_conclusao else None
+        }
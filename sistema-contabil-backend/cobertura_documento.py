@@ -0,0 +1,18 @@
+from src.models.user import db
+
+class CoberturaDocumento(db.Model):
+    __tablename__ = 'cobertura_documentos'
+
+    mes_referencia = db.Column(db.String(7), primary_key=True)  # formato YYYY-MM
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)  # documentos do cliente no mês
+
+    def __repr__(self):
+        return f'<CoberturaDocumento {self.mes_referencia} - {self.cliente_id}>'
+
+    def to_dict(self):
+        return {
+            'mes_referencia': self.mes_referencia,
+            'cliente_id': self.cliente_id,
+            'quantidade': self.quantidade
+        }
@@ -0,0 +1,115 @@
+from typing import Dict
+from sqlalchemy import and_, func, insert, select
+from src.models.cliente import Cliente
+from src.models.documento import Documento
+from src.models.cobertura_documento import CoberturaDocumento
+from src.models.user import db
+from src.services.alteracoes_service import garantir_carga_inicial, insert_com_conflito, observar
+from src.services.resumo_service import ResumoService
+
+
+@observar(Documento, ('cliente_id', 'mes_referencia'))
+def _observar_documentos(conexao, alteracoes):
+    """Manter a contagem de documentos por (cliente, mês) a cada inserção, mudança ou exclusão"""
+    deltas: Dict[tuple, int] = {}
+    for antes, depois in alteracoes:
+        for valores, sinal in ((antes, -1), (depois, 1)):
+            if valores is None or valores['cliente_id'] is None or not valores['mes_referencia']:
+                continue
+            chave = (valores['mes_referencia'], int(valores['cliente_id']))
+            deltas[chave] = deltas.get(chave, 0) + sinal
+
+    linhas = [
+        {'mes_referencia': mes, 'cliente_id': cliente_id, 'quantidade': delta}
+        for (mes, cliente_id), delta in deltas.items() if delta != 0
+    ]
+    if not linhas:
+        return
+
+    tabela = CoberturaDocumento.__table__
+    stmt = insert_com_conflito(conexao, tabela).values(linhas)
+    conexao.execute(stmt.on_conflict_do_update(
+        index_elements=['mes_referencia', 'cliente_id'],
+        set_={'quantidade': tabela.c.quantidade + stmt.excluded.quantidade}
+    ))
+    # Meses que ficaram sem documentos deixam de cobrir o cliente
+    for linha in linhas:
+        if linha['quantidade'] < 0:
+            conexao.execute(tabela.delete().where(and_(
+                tabela.c.mes_referencia == linha['mes_referencia'],
+                tabela.c.cliente_id == linha['cliente_id'],
+                tabela.c.quantidade <= 0
+            )))
+
+
+class CoberturaService:
+    def __init__(self):
+        self.resumo_service = ResumoService()
+
+    def reconstruir(self) -> int:
+        """Recriar a cobertura a partir da tabela de documentos (carga inicial e rotina diária)"""
+        tabela = CoberturaDocumento.__table__
+        try:
+            conexao = db.session.connection()
+            conexao.execute(tabela.delete())
+            resultado = conexao.execute(insert(tabela).from_select(
+                ['mes_referencia', 'cliente_id', 'quantidade'],
+                select(Documento.mes_referencia, Documento.cliente_id, func.count(Documento.id))
+                .where(and_(Documento.cliente_id.isnot(None), Documento.mes_referencia.isnot(None)))
+                .group_by(Documento.mes_referencia, Documento.cliente_id)
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return resultado.rowcount
+
+    def _garantir_carga_inicial(self):
+        """Popular a cobertura uma única vez por banco (ver garantir_carga_inicial)"""
+        garantir_carga_inicial('cobertura_documentos', self.reconstruir)
+
+    def _consulta_sem_documentos(self, mes_referencia: str):
+        """Clientes ativos sem linha de cobertura no mês (anti-join pela chave primária)"""
+        return db.session.query(Cliente).outerjoin(
+            CoberturaDocumento,
+            and_(
+                CoberturaDocumento.cliente_id == Cliente.id,
+                CoberturaDocumento.mes_referencia == mes_referencia
+            )
+        ).filter(
+            Cliente.ativo == True,
+            CoberturaDocumento.cliente_id.is_(None)
+        )
+
+    def contar_sem_documentos(self, mes_referencia: str) -> int:
+        """
+        Número de clientes ativos sem documentos no mês: total de ativos (contador do resumo)
+        menos os ativos cobertos, lidos pelo índice da cobertura do mês.
+        """
+        self._garantir_carga_inicial()
+        ativos = self.resumo_service.obter_contadores()['clientes_ativos']
+        cobertos = db.session.query(func.count(CoberturaDocumento.cliente_id)).join(
+            Cliente, Cliente.id == CoberturaDocumento.cliente_id
+        ).filter(
+            CoberturaDocumento.mes_referencia == mes_referencia,
+            Cliente.ativo == True
+        ).scalar()
+        return max(ativos - (cobertos or 0), 0)
+
+    def listar_sem_documentos(self, mes_referencia: str, pagina: int = 1, por_pagina: int = 50) -> Dict:
+        """Listar, paginados por nome, os clientes ativos que não enviaram documentos no mês"""
+        self._garantir_carga_inicial()
+        pagina = max(pagina, 1)
+        por_pagina = min(max(por_pagina, 1), 500)
+
+        clientes = self._consulta_sem_documentos(mes_referencia).order_by(
+            Cliente.nome.asc(), Cliente.id.asc()
+        ).offset((pagina - 1) * por_pagina).limit(por_pagina).all()
+
+        return {
+            'mes_referencia': mes_referencia,
+            'pagina': pagina,
+            'por_pagina': por_pagina,
+            'total': self.contar_sem_documentos(mes_referencia),
+            'clientes': [cliente.to_dict() for cliente in clientes]
+        }
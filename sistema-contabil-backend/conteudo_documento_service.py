@@ -0,0 +1,140 @@
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy.orm import defer, load_only
+from src.models.documento import Documento
+from src.models.documento_conteudo import DocumentoConteudo
+from src.models.user import db
+
+try:
+    # Opcional: zstd comprime texto de OCR melhor e mais rápido que o zlib
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSAO = os.getenv('DOCUMENTOS_COMPRESSAO', 'zstd' if zstandard is not None else 'zlib')
+NIVEL_ZLIB = 6
+NIVEL_ZSTD = 9
+
+# Opções para listas de documentos: não trazer as colunas de texto grandes
+SEM_TEXTOS = (defer(Documento.resumo_ia), defer(Documento.pontos_importantes))
+
+
+def comprimir(dados: bytes, compressao: str = COMPRESSAO) -> bytes:
+    if compressao == 'zstd':
+        return zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(dados)
+    return zlib.compress(dados, NIVEL_ZLIB)
+
+
+def descomprimir(dados: bytes, compressao: str) -> bytes:
+    if compressao == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('Conteúdo comprimido com zstd, mas o pacote zstandard não está instalado')
+        # decompressobj também lê frames sem o tamanho no cabeçalho (CompressorTexto)
+        return zstandard.ZstdDecompressor().decompressobj().decompress(dados)
+    return zlib.decompress(dados)
+
+
+class CompressorTexto:
+    """Texto comprimido à medida que as partes chegam, sem juntar o texto inteiro em memória"""
+
+    def __init__(self, compressao: str = COMPRESSAO):
+        self.compressao = compressao
+        if compressao == 'zstd':
+            self._compressor = zstandard.ZstdCompressor(level=NIVEL_ZSTD).compressobj()
+        else:
+            self._compressor = zlib.compressobj(NIVEL_ZLIB)
+        self._blocos = []
+        self.tamanho = 0
+
+    def adicionar(self, parte: str):
+        self._blocos.append(self._compressor.compress(parte.encode('utf-8')))
+        self.tamanho += len(parte)
+
+    def concluir(self) -> bytes:
+        self._blocos.append(self._compressor.flush())
+        return b''.join(self._blocos)
+
+
+class ConteudoDocumentoService:
+    def _registro(self, documento_id: int) -> DocumentoConteudo:
+        conteudo = db.session.get(DocumentoConteudo, documento_id)
+        if conteudo is None:
+            conteudo = DocumentoConteudo(documento_id=documento_id, compressao=COMPRESSAO)
+            db.session.add(conteudo)
+        elif conteudo.compressao != COMPRESSAO:
+            # Recomprime o blob que não está sendo substituído, para manter um único algoritmo por linha
+            for coluna in ('texto', 'analise'):
+                dados = getattr(conteudo, coluna)
+                if dados is not None:
+                    setattr(conteudo, coluna, comprimir(descomprimir(dados, conteudo.compressao)))
+            conteudo.compressao = COMPRESSAO
+        return conteudo
+
+    def guardar_texto(self, documento_id: int, texto: str):
+        """Guardar o texto completo na sessão atual (gravado no commit de quem chama)"""
+        conteudo = self._registro(documento_id)
+        conteudo.texto = comprimir(texto.encode('utf-8'))
+        conteudo.tamanho_texto = len(texto)
+        conteudo.data_atualizacao = datetime.utcnow()
+
+    def guardar_texto_comprimido(self, documento_id: int, compressor: CompressorTexto):
+        """Guardar na sessão atual o texto montado em partes num CompressorTexto"""
+        conteudo = self._registro(documento_id)
+        conteudo.texto = compressor.concluir()
+        conteudo.tamanho_texto = compressor.tamanho
+        conteudo.data_atualizacao = datetime.utcnow()
+
+    def guardar_analise(self, documento_id: int, analise: Dict):
+        """Guardar o JSON completo da análise da IA na sessão atual"""
+        conteudo = self._registro(documento_id)
+        conteudo.analise = comprimir(json.dumps(analise, ensure_ascii=False).encode('utf-8'))
+        conteudo.data_atualizacao = datetime.utcnow()
+
+    def copiar(self, origem_id: int, destino_id: int):
+        """Reaproveitar o texto de um documento de mesmo conteúdo (a análise da IA não é copiada)"""
+        origem = db.session.get(DocumentoConteudo, origem_id)
+        if origem is None or origem.texto is None:
+            return
+        destino = self._registro(destino_id)
+        if origem.compressao == destino.compressao:
+            destino.texto = origem.texto
+        else:
+            destino.texto = comprimir(descomprimir(origem.texto, origem.compressao), destino.compressao)
+        destino.tamanho_texto = origem.tamanho_texto
+        destino.data_atualizacao = datetime.utcnow()
+
+    def descartar_texto(self, documento_id: int):
+        conteudo = db.session.get(DocumentoConteudo, documento_id)
+        if conteudo is not None:
+            conteudo.texto = None
+            conteudo.tamanho_texto = None
+
+    def texto(self, documento_id: int) -> Optional[str]:
+        return self.textos([documento_id]).get(documento_id)
+
+    def textos(self, documento_ids: Iterable[int]) -> Dict[int, str]:
+        """Textos guardados de vários documentos, numa consulta só"""
+        documento_ids = list(documento_ids)
+        if not documento_ids:
+            return {}
+        linhas = db.session.query(
+            DocumentoConteudo.documento_id, DocumentoConteudo.compressao, DocumentoConteudo.texto
+        ).filter(
+            DocumentoConteudo.documento_id.in_(documento_ids),
+            DocumentoConteudo.texto.isnot(None)
+        ).all()
+        return {
+            documento_id: descomprimir(texto, compressao).decode('utf-8')
+            for documento_id, compressao, texto in linhas
+        }
+
+    def analise(self, documento_id: int) -> Optional[Dict]:
+        conteudo = db.session.query(DocumentoConteudo).options(
+            load_only(DocumentoConteudo.compressao, DocumentoConteudo.analise)
+        ).filter(DocumentoConteudo.documento_id == documento_id).first()
+        if conteudo is None or conteudo.analise is None:
+            return None
+        return json.loads(descomprimir(conteudo.analise, conteudo.compressao))
@@ -119,17 +119,180 @@ CREATE TABLE IF NOT EXISTS configuracoes (
     data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Contadores do resumo do dashboard (mantidos incrementalmente pela aplicação)
+CREATE TABLE IF NOT EXISTS resumo_contadores (
+    chave VARCHAR(50) PRIMARY KEY,
+    valor INTEGER NOT NULL DEFAULT 0,
+    data_referencia DATE,
+    data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Gerações por tabela, usadas para invalidar o cache de respostas (ETag) entre workers
+CREATE TABLE IF NOT EXISTS geracoes_tabela (
+    tabela VARCHAR(50) PRIMARY KEY,
+    geracao BIGINT NOT NULL DEFAULT 0,
+    data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tabelas derivadas (rollup, cobertura) já carregadas com o histórico das tabelas de origem
+CREATE TABLE IF NOT EXISTS cargas_iniciais (
+    nome VARCHAR(50) PRIMARY KEY,
+    data_conclusao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Rollup diário de obrigações, documentos e mensalidades (contagens e somas por dia/cliente/tipo/status)
+CREATE TABLE IF NOT EXISTS rollup_diario (
+    entidade VARCHAR(20) NOT NULL,
+    dia DATE NOT NULL,
+    cliente_id INTEGER NOT NULL,
+    chave VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    valor DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (entidade, dia, cliente_id, chave, status)
+);
+
+-- Cobertura de documentos por cliente e mês (clientes sem documentos no mês = ativos sem linha aqui)
+CREATE TABLE IF NOT EXISTS cobertura_documentos (
+    mes_referencia VARCHAR(7) NOT NULL,
+    cliente_id INTEGER REFERENCES clientes(id) ON DELETE CASCADE,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mes_referencia, cliente_id)
+);
+
+CREATE TABLE IF NOT EXISTS feriados (
+    data DATE PRIMARY KEY,
+    descricao VARCHAR(100) NOT NULL,
+    nacional BOOLEAN DEFAULT TRUE,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS jobs_documentos (
+    id SERIAL PRIMARY KEY,
+    documento_id INTEGER NOT NULL REFERENCES documentos(id) ON DELETE CASCADE,
+    status VARCHAR(20) DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    max_tentativas INTEGER NOT NULL DEFAULT 3,
+    disponivel_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    worker VARCHAR(100),
+    lote VARCHAR(32),
+    resultado TEXT,
+    erro TEXT,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data_inicio TIMESTAMP,
+    data_conclusao TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS arquivos (
+    sha256 VARCHAR(64) PRIMARY KEY,
+    tamanho BIGINT NOT NULL,
+    referencias INTEGER NOT NULL DEFAULT 0,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS uploads_sessoes (
+    id VARCHAR(32) PRIMARY KEY,
+    cliente_id INTEGER NOT NULL REFERENCES clientes(id) ON DELETE CASCADE,
+    nome_arquivo VARCHAR(255) NOT NULL,
+    categoria VARCHAR(50),
+    mes_referencia VARCHAR(7),
+    tamanho_total BIGINT NOT NULL,
+    recebido BIGINT NOT NULL DEFAULT 0,
+    status VARCHAR(20) DEFAULT 'aberto',
+    documento_id INTEGER REFERENCES documentos(id) ON DELETE SET NULL,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Campos extraídos dos documentos (um por linha, tipados para somas e filtros em SQL)
+CREATE TABLE IF NOT EXISTS documento_campos (
+    id SERIAL PRIMARY KEY,
+    documento_id INTEGER NOT NULL REFERENCES documentos(id) ON DELETE CASCADE,
+    campo VARCHAR(30) NOT NULL,
+    valor_decimal DECIMAL(14, 2),
+    valor_data DATE,
+    valor_texto VARCHAR(64),
+    confianca DECIMAL(4, 3) NOT NULL DEFAULT 0,
+    posicao INTEGER
+);
+
+-- Texto completo e análise da IA dos documentos, comprimidos (zlib ou zstd), lidos só no detalhe
+CREATE TABLE IF NOT EXISTS documento_conteudos (
+    documento_id INTEGER PRIMARY KEY REFERENCES documentos(id) ON DELETE CASCADE,
+    compressao VARCHAR(10) NOT NULL DEFAULT 'zlib',
+    tamanho_texto INTEGER,
+    texto BYTEA,
+    analise BYTEA,
+    data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Importações de arquivos SPED (EFD ICMS/IPI, EFD-Contribuições) e extratos OFX
+CREATE TABLE IF NOT EXISTS importacoes (
+    id SERIAL PRIMARY KEY,
+    documento_id INTEGER NOT NULL REFERENCES documentos(id) ON DELETE CASCADE,
+    cliente_id INTEGER REFERENCES clientes(id) ON DELETE CASCADE,
+    tipo VARCHAR(30) NOT NULL,
+    status VARCHAR(20) DEFAULT 'processando',
+    cnpj VARCHAR(14),
+    nome VARCHAR(255),
+    periodo_inicio DATE,
+    periodo_fim DATE,
+    linhas BIGINT NOT NULL DEFAULT 0,
+    tamanho_arquivo BIGINT,
+    erro TEXT,
+    data_inicio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data_conclusao TIMESTAMP
+);
+
+-- Quantidade de linhas e soma dos campos de valor por registro (SPED) ou tipo de transação (OFX)
+CREATE TABLE IF NOT EXISTS importacao_registros (
+    id SERIAL PRIMARY KEY,
+    importacao_id INTEGER NOT NULL REFERENCES importacoes(id) ON DELETE CASCADE,
+    registro VARCHAR(20) NOT NULL,
+    campo VARCHAR(40),
+    quantidade BIGINT NOT NULL DEFAULT 0,
+    total DECIMAL(16, 2)
+);
+
+-- Transações dos extratos OFX importados
+CREATE TABLE IF NOT EXISTS extrato_lancamentos (
+    id SERIAL PRIMARY KEY,
+    importacao_id INTEGER NOT NULL REFERENCES importacoes(id) ON DELETE CASCADE,
+    data DATE,
+    valor DECIMAL(14, 2) NOT NULL,
+    tipo VARCHAR(20) NOT NULL,
+    fitid VARCHAR(255),
+    descricao VARCHAR(255)
+);
+
 -- Índices para melhor performance
 CREATE INDEX IF NOT EXISTS idx_clientes_cnpj ON clientes(cnpj);
 CREATE INDEX IF NOT EXISTS idx_clientes_ativo ON clientes(ativo);
 CREATE INDEX IF NOT EXISTS idx_obrigacoes_cliente ON obrigacoes(cliente_id);
 CREATE INDEX IF NOT EXISTS idx_obrigacoes_vencimento ON obrigacoes(data_vencimento);
+CREATE INDEX IF NOT EXISTS idx_obrigacoes_vencimento_id ON obrigacoes(data_vencimento, id);
 CREATE INDEX IF NOT EXISTS idx_obrigacoes_status ON obrigacoes(status);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_obrigacoes_cliente_tipo_vencimento ON obrigacoes(cliente_id, tipo, data_vencimento);
 CREATE INDEX IF NOT EXISTS idx_documentos_cliente ON documentos(cliente_id);
 CREATE INDEX IF NOT EXISTS idx_documentos_status ON documentos(status_processamento);
+CREATE INDEX IF NOT EXISTS idx_documentos_caminho ON documentos(caminho_arquivo);
+CREATE INDEX IF NOT EXISTS idx_documentos_mes_cliente ON documentos(mes_referencia, cliente_id);
+CREATE INDEX IF NOT EXISTS idx_documento_campos_documento ON documento_campos(documento_id);
+CREATE INDEX IF NOT EXISTS idx_documento_campos_campo ON documento_campos(campo, documento_id, valor_decimal);
+CREATE INDEX IF NOT EXISTS idx_documento_campos_texto ON documento_campos(campo, valor_texto);
+CREATE INDEX IF NOT EXISTS idx_importacoes_documento ON importacoes(documento_id);
+CREATE INDEX IF NOT EXISTS idx_importacoes_cliente_periodo ON importacoes(cliente_id, periodo_inicio);
+CREATE INDEX IF NOT EXISTS idx_importacao_registros_importacao ON importacao_registros(importacao_id, registro);
+CREATE INDEX IF NOT EXISTS idx_extrato_lancamentos_importacao ON extrato_lancamentos(importacao_id, data, id);
 CREATE INDEX IF NOT EXISTS idx_mensalidades_cliente ON mensalidades(cliente_id);
 CREATE INDEX IF NOT EXISTS idx_mensalidades_vencimento ON mensalidades(data_vencimento);
 CREATE INDEX IF NOT EXISTS idx_notificacoes_status ON notificacoes(status);
+CREATE INDEX IF NOT EXISTS idx_jobs_documentos_fila ON jobs_documentos(status, disponivel_em);
+CREATE INDEX IF NOT EXISTS idx_jobs_documentos_lote ON jobs_documentos(lote) WHERE lote IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_jobs_documentos_documento ON jobs_documentos(documento_id, status);
+CREATE INDEX IF NOT EXISTS idx_arquivos_referencias ON arquivos(referencias) WHERE referencias <= 0;
+CREATE INDEX IF NOT EXISTS idx_rollup_diario_chave ON rollup_diario(entidade, chave);
 
 -- Triggers para atualizar data_atualizacao automaticamente
 CREATE OR REPLACE FUNCTION update_updated_at_column()
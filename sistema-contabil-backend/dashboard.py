@@ -3,82 +3,60 @@ from src.models.cliente import Cliente
 from src.models.obrigacao import Obrigacao
 from src.models.documento import Documento
 from src.models.mensalidade import Mensalidade
-from src.models.notificacao import Notificacao
-from src.models.user import db
+from src.services.resumo_service import ResumoService
+from src.services.rollup_service import RollupService
+from src.services.cobertura_service import CoberturaService
+from src.services.cache_service import em_cache
+from src.services.projecao_service import consulta_com_cliente
 from datetime import datetime, date, timedelta
 from sqlalchemy import and_, or_, func, extract
 
 dashboard_bp = Blueprint('dashboard', __name__)
+resumo_service = ResumoService()
+rollup_service = RollupService()
+cobertura_service = CoberturaService()
 
 @dashboard_bp.route('/dashboard/resumo', methods=['GET'])
+@em_cache('clientes', 'obrigacoes', 'documentos', 'mensalidades', 'notificacoes')
 def get_resumo_dashboard():
     """Obter resumo geral para o dashboard"""
     try:
-        hoje = date.today()
-        inicio_mes = hoje.replace(day=1)
-        
-        # Estatísticas de clientes
-        total_clientes = Cliente.query.filter_by(ativo=True).count()
-        
-        # Estatísticas de obrigações
-        obrigacoes_pendentes = Obrigacao.query.filter_by(status='pendente').count()
-        obrigacoes_vencidas = Obrigacao.query.filter(
-            and_(
-                Obrigacao.status == 'pendente',
-                Obrigacao.data_vencimento < hoje
-            )
-        ).count()
-        obrigacoes_vencendo_hoje = Obrigacao.query.filter(
-            and_(
-                Obrigacao.status == 'pendente',
-                Obrigacao.data_vencimento == hoje
-            )
-        ).count()
-        
-        # Documentos pendentes de processamento
-        documentos_pendentes = Documento.query.filter_by(status_processamento='pendente').count()
-        
-        # Mensalidades em atraso
-        mensalidades_atrasadas = Mensalidade.query.filter(
-            and_(
-                Mensalidade.status == 'pendente',
-                Mensalidade.data_vencimento < hoje
-            )
-        ).count()
-        
-        # Notificações não lidas
-        notificacoes_nao_lidas = Notificacao.query.filter_by(status='pendente').count()
+        # Contadores mantidos incrementalmente; uma única leitura indexada
+        contadores = resumo_service.obter_contadores()
         
         return jsonify({
             'clientes': {
-                'total': total_clientes
+                'total': contadores['clientes_ativos']
             },
             'obrigacoes': {
-                'pendentes': obrigacoes_pendentes,
-                'vencidas': obrigacoes_vencidas,
-                'vencendo_hoje': obrigacoes_vencendo_hoje
+                'pendentes': contadores['obrigacoes_pendentes'],
+                'vencidas': contadores['obrigacoes_vencidas'],
+                'vencendo_hoje': contadores['obrigacoes_vencendo_hoje']
             },
             'documentos': {
-                'pendentes_processamento': documentos_pendentes
+                'pendentes_processamento': contadores['documentos_pendentes']
             },
             'mensalidades': {
-                'atrasadas': mensalidades_atrasadas
+                'atrasadas': contadores['mensalidades_atrasadas']
             },
             'notificacoes': {
-                'nao_lidas': notificacoes_nao_lidas
+                'nao_lidas': contadores['notificacoes_nao_lidas']
             }
         })
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
 @dashboard_bp.route('/dashboard/tarefas-hoje', methods=['GET'])
+@em_cache('clientes', 'obrigacoes', 'mensalidades')
 def get_tarefas_hoje():
     """Obter tarefas do dia atual"""
     try:
         hoje = date.today()
         
-        # Obrigações vencendo hoje
-        obrigacoes_hoje = Obrigacao.query.filter(
+        # Obrigações vencendo hoje (projeção com o nome do cliente, sem consulta por linha)
+        obrigacoes_hoje = consulta_com_cliente(Obrigacao, [
+            Obrigacao.id, Obrigacao.tipo, Obrigacao.descricao, Obrigacao.data_vencimento
+        ]).filter(
             and_(
                 Obrigacao.status == 'pendente',
                 Obrigacao.data_vencimento == hoje
@@ -86,7 +64,9 @@ def get_tarefas_hoje():
         ).all()
         
         # Mensalidades vencendo hoje
-        mensalidades_hoje = Mensalidade.query.filter(
+        mensalidades_hoje = consulta_com_cliente(Mensalidade, [
+            Mensalidade.id, Mensalidade.mes_referencia, Mensalidade.data_vencimento, Mensalidade.valor
+        ]).filter(
             and_(
                 Mensalidade.status == 'pendente',
                 Mensalidade.data_vencimento == hoje
@@ -100,11 +80,11 @@ def get_tarefas_hoje():
             tarefas.append({
                 'tipo': 'obrigacao',
                 'id': obrigacao.id,
-                'titulo': f"{obrigacao.tipo} - {obrigacao.cliente.nome}",
+                'titulo': f"{obrigacao.tipo} - {obrigacao.cliente_nome}",
                 'descricao': obrigacao.descricao,
                 'prioridade': 'alta',
                 'data_vencimento': obrigacao.data_vencimento.isoformat(),
-                'cliente_nome': obrigacao.cliente.nome
+                'cliente_nome': obrigacao.cliente_nome
             })
         
         # Adicionar mensalidades
@@ -112,11 +92,11 @@ def get_tarefas_hoje():
             tarefas.append({
                 'tipo': 'mensalidade',
                 'id': mensalidade.id,
-                'titulo': f"Mensalidade - {mensalidade.cliente.nome}",
+                'titulo': f"Mensalidade - {mensalidade.cliente_nome}",
                 'descricao': f"Mensalidade referente a {mensalidade.mes_referencia}",
                 'prioridade': 'media',
                 'data_vencimento': mensalidade.data_vencimento.isoformat(),
-                'cliente_nome': mensalidade.cliente.nome,
+                'cliente_nome': mensalidade.cliente_nome,
                 'valor': float(mensalidade.valor)
             })
         
@@ -129,6 +109,7 @@ def get_tarefas_hoje():
         return jsonify({'erro': str(e)}), 500
 
 @dashboard_bp.route('/dashboard/vencimentos-proximos', methods=['GET'])
+@em_cache('clientes', 'obrigacoes', 'mensalidades')
 def get_vencimentos_proximos():
     """Obter vencimentos dos próximos dias"""
     try:
@@ -137,7 +118,9 @@ def get_vencimentos_proximos():
         data_limite = hoje + timedelta(days=dias)
         
         # Obrigações próximas
-        obrigacoes = Obrigacao.query.filter(
+        obrigacoes = consulta_com_cliente(Obrigacao, [
+            Obrigacao.id, Obrigacao.tipo, Obrigacao.data_vencimento, Obrigacao.valor
+        ]).filter(
             and_(
                 Obrigacao.status == 'pendente',
                 Obrigacao.data_vencimento > hoje,
@@ -146,7 +129,9 @@ def get_vencimentos_proximos():
         ).order_by(Obrigacao.data_vencimento.asc()).all()
         
         # Mensalidades próximas
-        mensalidades = Mensalidade.query.filter(
+        mensalidades = consulta_com_cliente(Mensalidade, [
+            Mensalidade.id, Mensalidade.data_vencimento, Mensalidade.valor
+        ]).filter(
             and_(
                 Mensalidade.status == 'pendente',
                 Mensalidade.data_vencimento > hoje,
@@ -162,10 +147,10 @@ def get_vencimentos_proximos():
             vencimentos.append({
                 'tipo': 'obrigacao',
                 'id': obrigacao.id,
-                'titulo': f"{obrigacao.tipo} - {obrigacao.cliente.nome}",
+                'titulo': f"{obrigacao.tipo} - {obrigacao.cliente_nome}",
                 'data_vencimento': obrigacao.data_vencimento.isoformat(),
                 'dias_restantes': dias_restantes,
-                'cliente_nome': obrigacao.cliente.nome,
+                'cliente_nome': obrigacao.cliente_nome,
                 'valor': float(obrigacao.valor) if obrigacao.valor else None
             })
         
@@ -175,10 +160,10 @@ def get_vencimentos_proximos():
             vencimentos.append({
                 'tipo': 'mensalidade',
                 'id': mensalidade.id,
-                'titulo': f"Mensalidade - {mensalidade.cliente.nome}",
+                'titulo': f"Mensalidade - {mensalidade.cliente_nome}",
                 'data_vencimento': mensalidade.data_vencimento.isoformat(),
                 'dias_restantes': dias_restantes,
-                'cliente_nome': mensalidade.cliente.nome,
+                'cliente_nome': mensalidade.cliente_nome,
                 'valor': float(mensalidade.valor)
             })
         
@@ -190,51 +175,42 @@ def get_vencimentos_proximos():
         return jsonify({'erro': str(e)}), 500
 
 @dashboard_bp.route('/dashboard/estatisticas-mensais', methods=['GET'])
+@em_cache('obrigacoes', 'documentos', 'mensalidades')
 def get_estatisticas_mensais():
     """Obter estatísticas do mês atual"""
     try:
         hoje = date.today()
         inicio_mes = hoje.replace(day=1)
         
-        # Obrigações do mês
-        obrigacoes_mes = Obrigacao.query.filter(
-            and_(
-                Obrigacao.data_vencimento >= inicio_mes,
-                Obrigacao.data_vencimento <= hoje
-            )
-        ).all()
+        # Obrigações do mês (somadas no rollup diário por status e dia)
+        obrigacoes_mes = rollup_service.totais('obrigacao', inicio_mes, hoje, agrupar_por=('status', 'dia'))
         
-        obrigacoes_pagas = [o for o in obrigacoes_mes if o.status == 'pago']
-        obrigacoes_pendentes = [o for o in obrigacoes_mes if o.status == 'pendente']
-        obrigacoes_vencidas = [o for o in obrigacoes_pendentes if o.data_vencimento < hoje]
+        total_obrigacoes = sum(o['quantidade'] for o in obrigacoes_mes)
+        obrigacoes_pagas = sum(o['quantidade'] for o in obrigacoes_mes if o['status'] == 'pago')
+        obrigacoes_pendentes = sum(o['quantidade'] for o in obrigacoes_mes if o['status'] == 'pendente')
+        obrigacoes_vencidas = sum(o['quantidade'] for o in obrigacoes_mes if o['status'] == 'pendente' and o['dia'] < hoje)
         
         # Documentos do mês
-        documentos_mes = Documento.query.filter(
-            Documento.data_upload >= datetime.combine(inicio_mes, datetime.min.time())
-        ).count()
-        
-        documentos_processados = Documento.query.filter(
-            and_(
-                Documento.data_upload >= datetime.combine(inicio_mes, datetime.min.time()),
-                Documento.status_processamento == 'processado'
-            )
-        ).count()
+        documentos = rollup_service.totais('documento', inicio_mes)
+        documentos_mes = sum(d['quantidade'] for d in documentos)
+        documentos_processados = sum(d['quantidade'] for d in documentos if d['status'] == 'processado')
         
-        # Mensalidades do mês
+        # Mensalidades do mês (no rollup a chave da mensalidade é o mes_referencia)
         mes_referencia = hoje.strftime('%Y-%m')
-        mensalidades_mes = Mensalidade.query.filter_by(mes_referencia=mes_referencia).all()
-        mensalidades_pagas = [m for m in mensalidades_mes if m.status == 'pago']
+        mensalidades_mes = rollup_service.totais('mensalidade', chave=mes_referencia)
+        total_mensalidades = sum(m['quantidade'] for m in mensalidades_mes)
+        mensalidades_pagas = sum(m['quantidade'] for m in mensalidades_mes if m['status'] == 'pago')
         
-        valor_total_mensalidades = sum(float(m.valor) for m in mensalidades_mes)
-        valor_recebido_mensalidades = sum(float(m.valor) for m in mensalidades_pagas)
+        valor_total_mensalidades = float(sum(m['valor'] for m in mensalidades_mes))
+        valor_recebido_mensalidades = float(sum(m['valor'] for m in mensalidades_mes if m['status'] == 'pago'))
         
         return jsonify({
             'obrigacoes': {
-                'total': len(obrigacoes_mes),
-                'pagas': len(obrigacoes_pagas),
-                'pendentes': len(obrigacoes_pendentes),
-                'vencidas': len(obrigacoes_vencidas),
-                'taxa_cumprimento': round((len(obrigacoes_pagas) / len(obrigacoes_mes) * 100) if obrigacoes_mes else 0, 2)
+                'total': total_obrigacoes,
+                'pagas': obrigacoes_pagas,
+                'pendentes': obrigacoes_pendentes,
+                'vencidas': obrigacoes_vencidas,
+                'taxa_cumprimento': round((obrigacoes_pagas / total_obrigacoes * 100) if total_obrigacoes else 0, 2)
             },
             'documentos': {
                 'total': documentos_mes,
@@ -242,8 +218,8 @@ def get_estatisticas_mensais():
                 'taxa_processamento': round((documentos_processados / documentos_mes * 100) if documentos_mes else 0, 2)
             },
             'mensalidades': {
-                'total': len(mensalidades_mes),
-                'pagas': len(mensalidades_pagas),
+                'total': total_mensalidades,
+                'pagas': mensalidades_pagas,
                 'valor_total': valor_total_mensalidades,
                 'valor_recebido': valor_recebido_mensalidades,
                 'taxa_recebimento': round((valor_recebido_mensalidades / valor_total_mensalidades * 100) if valor_total_mensalidades else 0, 2)
@@ -253,6 +229,7 @@ def get_estatisticas_mensais():
         return jsonify({'erro': str(e)}), 500
 
 @dashboard_bp.route('/dashboard/alertas', methods=['GET'])
+@em_cache('clientes', 'obrigacoes', 'documentos', 'mensalidades')
 def get_alertas():
     """Obter alertas importantes para o dashboard"""
     try:
@@ -309,14 +286,7 @@ def get_alertas():
         
         # Clientes sem documentos no mês atual
         mes_atual = hoje.strftime('%Y-%m')
-        clientes_sem_documentos = db.session.query(Cliente).filter(
-            and_(
-                Cliente.ativo == True,
-                ~Cliente.id.in_(
-                    db.session.query(Documento.cliente_id).filter_by(mes_referencia=mes_atual)
-                )
-            )
-        ).count()
+        clientes_sem_documentos = cobertura_service.contar_sem_documentos(mes_atual)
         
         if clientes_sem_documentos > 0:
             alertas.append({
@@ -330,3 +300,20 @@ def get_alertas():
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
+@dashboard_bp.route('/dashboard/clientes-sem-documentos', methods=['GET'])
+@em_cache('clientes', 'documentos')
+def get_clientes_sem_documentos():
+    """Listar clientes ativos sem documentos em um mês, com paginação"""
+    try:
+        mes_referencia = request.args.get('mes_referencia', date.today().strftime('%Y-%m'))
+        pagina = request.args.get('pagina', 1, type=int)
+        por_pagina = request.args.get('por_pagina', 50, type=int)
+        
+        try:
+            datetime.strptime(mes_referencia, '%Y-%m')
+        except ValueError:
+            return jsonify({'erro': 'Formato de mês inválido. Use YYYY-MM'}), 400
+        
+        return jsonify(cobertura_service.listar_sem_documentos(mes_referencia, pagina, por_pagina))
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
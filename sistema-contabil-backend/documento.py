@@ -1,90 +1,93 @@
 # documento.py
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, send_file
 import os
-from PIL import Image
-import pytesseract
 from datetime import datetime
-import re
 from werkzeug.utils import secure_filename # IMPORTAÇÃO CORRIGIDA
 
 # Importações de módulos internos (verifique a estrutura de pastas)
 from src.models.user import db
 from src.models.documento import Documento
-from src.services.ia_service import suggest_category
+from src.models.job_documento import JobDocumento
+from src.models.upload_sessao import UploadSessao
+from src.services.documento_service import (
+    aplicar_resultado_existente, armazenamento, campos_documento, conteudo_documento, fila_documentos,
+    importacoes, pool_ingestao, resultado_existente
+)
+from src.services.download_service import resposta_arquivo
+from src.services.lote_documentos_service import iterar_arquivos, novo_lote, progresso
+from src.services.miniatura_service import (
+    FORMATOS_MINIATURA, ErroMiniatura, cache_miniaturas, formato_miniatura, largura_miniatura
+)
+from src.services.ocr_service import cache_ocr, sha256_arquivo
+from src.services.upload_service import TAMANHO_MAXIMO_BLOCO, ErroUpload, UploadService
 
-# --- CONFIGURAÇÃO TESSERACT (Mova para um arquivo de configuração se tiver) ---
-# Você precisa ter o Tesseract OCR instalado no seu sistema.
-# Se o caminho não estiver no PATH, descomente e ajuste a linha abaixo:
-# pytesseract.pytesseract.tesseract_cmd = r'/caminho/para/seu/tesseract.exe'
-# -----------------------------------------------------------------------------
+documento_bp = Blueprint('documents', __name__)
+upload_service = UploadService(armazenamento)
 
-document_bp = Blueprint('documents', __name__)
-
-# Configuração da pasta de upload
-UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads', 'documentos')
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-    
 # Extensões de arquivos permitidas para upload
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'xml', 'txt', 'ofx'}
+
+# Tipo do documento pela extensão; XML de NF-e/NFS-e, SPED (.txt) e OFX são lidos direto, sem OCR
+TIPOS_POR_EXTENSAO = {'.pdf': 'PDF', '.xml': 'XML', '.txt': 'SPED', '.ofx': 'OFX'}
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Funções de extração de dados (pode mover para um arquivo de serviço)
-def extract_value_from_text(text):
-    # Procura por R$ e um número com vírgula decimal
-    match = re.search(r'R\$\s*(\d{1,3}(?:\.\d{3})*,\d{2})', text)
-    if match:
-        value_str = match.group(1).replace('.', '').replace(',', '.')
-        try:
-            return float(value_str)
-        except ValueError:
-            return None
-    # Procura por números decimais com ponto ou vírgula
-    match = re.search(r'\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})', text)
-    if match:
-        value_str = match.group(0).replace('.', '').replace(',', '.')
-        try:
-            return float(value_str)
-        except ValueError:
-            return None
-    return None
-
-def extract_date_from_text(text):
-    date_formats = [
-        r'(\d{2}/\d{2}/\d{4})', 
-        r'(\d{2}-\d{2}-\d{4})', 
-        r'(\d{4}-\d{2}-\d{2})'
-    ]
-    for pattern in date_formats:
-        match = re.search(pattern, text)
-        if match:
-            date_str = match.group(1)
-            try:
-                if '/' in date_str:
-                    return datetime.strptime(date_str, '%d/%m/%Y').strftime('%Y-%m-%d')
-                elif '-' in date_str and len(date_str.split('-')[0]) == 4:
-                    return datetime.strptime(date_str, '%Y-%m-%d').strftime('%Y-%m-%d')
-                elif '-' in date_str:
-                    return datetime.strptime(date_str, '%d-%m-%Y').strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-    return None
+def _registrar_documento(cliente_id, filename_safe, sha256, filepath, tamanho,
+                         categoria=None, mes_referencia=None, upload_sessao=None, lote=None):
+    """
+    Gravar o documento de um arquivo já salvo no armazenamento e enfileirar o processamento
+    (ou reaproveitar o resultado de um documento de mesmo conteúdo). Faz o commit.
+    """
+    file_ext = os.path.splitext(filename_safe)[1].lower()
+    doc_type = TIPOS_POR_EXTENSAO.get(file_ext, 'IMAGEM')
 
-def get_mes_referencia_from_date(date_str):
-    """Converte uma string de data (YYYY-MM-DD) para YYYY-MM."""
-    if date_str:
-        try:
-            dt_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            return dt_obj.strftime('%Y-%m')
-        except ValueError:
-            pass
-    return None
+    novo_documento = Documento(
+        cliente_id=cliente_id,
+        nome_arquivo=filename_safe,
+        tipo_documento=doc_type,
+        categoria=categoria or 'Sem Categoria',
+        caminho_arquivo=filepath,
+        tamanho_arquivo=tamanho,
+        mes_referencia=mes_referencia or datetime.utcnow().strftime('%Y-%m'),
+        status_processamento='pendente',
+        data_upload=datetime.utcnow()
+    )
+    db.session.add(novo_documento)
+    db.session.flush()
+    if upload_sessao is not None:
+        upload_sessao.documento_id = novo_documento.id
+
+    # Conteúdo já processado antes: reaproveitar a extração, sem OCR
+    existente = resultado_existente(filepath, novo_documento.id)
+    if existente is not None:
+        resultado = aplicar_resultado_existente(novo_documento, *existente)
+        job = fila_documentos.registrar_concluido(novo_documento.id, resultado, lote)
+        db.session.commit()
+        mensagem = "Documento idêntico já processado; resultados reaproveitados."
+    else:
+        # OCR, extração e categorização rodam no pool de ingestão (documento_service);
+        # aqui só gravamos o documento e o job na mesma transação
+        job = fila_documentos.enfileirar(novo_documento.id, lote)
+        db.session.commit()
+        pool_ingestao.acordar()
+        mensagem = "Documento recebido. O processamento continua em segundo plano."
+
+    return {
+        "message": mensagem,
+        "documento_id": novo_documento.id,
+        "job_id": job.id,
+        "status_url": f"/api/documentos/jobs/{job.id}",
+        "sha256": sha256,
+        "duplicado_de": existente[0].id if existente is not None else None,
+        "filename": novo_documento.nome_arquivo,
+        "tamanho_arquivo": novo_documento.tamanho_arquivo,
+        "status_processamento": novo_documento.status_processamento
+    }
 
 # Rota principal para upload e processamento
-@document_bp.route('/upload-documento', methods=['POST'])
+@documento_bp.route('/upload-documento', methods=['POST'])
 def upload_documento():
     cliente_id = request.form.get('cliente_id')
     if not cliente_id:
@@ -101,60 +104,349 @@ def upload_documento():
         return jsonify({"message": "Tipo de arquivo não permitido"}), 400
 
     filename_safe = secure_filename(file.filename)
-    filepath = os.path.join(UPLOAD_FOLDER, filename_safe)
-
-    try:
-        file.save(filepath)
-
-        file_ext = os.path.splitext(filename_safe)[1].lower()
-        if file_ext == '.pdf':
-            doc_type = 'PDF'
-            # A lógica para PDFs precisaria ser implementada aqui.
-            # Por enquanto, este bloco de código serve como um placeholder.
-            full_text = "Lógica de extração de PDF ainda não implementada."
-            img = None # A imagem pode vir da conversão de uma página do PDF.
-        else: # Imagem
-            doc_type = 'IMAGEM'
-            img = Image.open(filepath)
-            full_text = pytesseract.image_to_string(img, lang='por')
-
-        # Extrair informações com regex
-        extracted_value = extract_value_from_text(full_text)
-        extracted_date_str = extract_date_from_text(full_text)
-        mes_referencia = get_mes_referencia_from_date(extracted_date_str)
-
-        # Sugestão de Categoria usando sua IA
-        suggested_cat = suggest_category(full_text)
-
-        novo_documento = Documento(
-            cliente_id=int(cliente_id),
-            nome_arquivo=filename_safe,
-            tipo_documento=doc_type,
-            categoria=suggested_cat if suggested_cat else 'Sem Categoria',
-            caminho_arquivo=filepath,
-            tamanho_arquivo=os.path.getsize(filepath),
-            mes_referencia=mes_referencia if mes_referencia else datetime.utcnow().strftime('%Y-%m'),
-            resumo_ia=full_text[:500] + "..." if len(full_text) > 500 else full_text,
-            status_processamento='pendente_revisao',
-            data_upload=datetime.utcnow(),
-            data_processamento=datetime.utcnow()
+
+    try:
+        cliente_id = int(cliente_id)
+    except ValueError:
+        return jsonify({"message": "ID do cliente inválido."}), 400
+
+    try:
+        # Gravado em uploads/documentos/ab/cd/<sha256>: nomes iguais não se sobrescrevem
+        # e conteúdos iguais ocupam um único arquivo
+        sha256, filepath, tamanho = armazenamento.salvar(file.stream)
+
+        return jsonify(_registrar_documento(
+            cliente_id, filename_safe, sha256, filepath, tamanho,
+            request.form.get('categoria'), request.form.get('mes_referencia')
+        )), 202
+
+    except Exception as e:
+        # O arquivo não é apagado aqui: o mesmo conteúdo pode pertencer a outros documentos
+        # ou a um upload em andamento. A linha reservada em `arquivos` fica sem referências
+        # e ArmazenamentoService.coletar_orfaos remove o arquivo depois da carência.
+        db.session.rollback()
+        return jsonify({"message": f"Erro ao enviar documento: {str(e)}"}), 500
+
+# Upload em lote: vários arquivos e/ou ZIPs numa requisição, processados em paralelo pelo pool de ingestão
+@documento_bp.route('/documentos/lotes', methods=['POST'])
+def upload_lote_documentos():
+    cliente_id = request.form.get('cliente_id')
+    if not cliente_id:
+        return jsonify({"message": "ID do cliente é obrigatório."}), 400
+    try:
+        cliente_id = int(cliente_id)
+    except ValueError:
+        return jsonify({"message": "ID do cliente inválido."}), 400
+
+    arquivos = request.files.getlist('documentos')
+    if not arquivos:
+        return jsonify({"message": "Nenhum arquivo 'documentos' encontrado"}), 400
+
+    lote = novo_lote()
+    categoria = request.form.get('categoria')
+    mes_referencia = request.form.get('mes_referencia')
+    manifesto = []
+    try:
+        for item in iterar_arquivos(arquivos, allowed_file):
+            entrada = {"arquivo": item.nome, "origem": item.origem}
+            if item.erro:
+                manifesto.append(dict(entrada, aceito=False, erro=item.erro))
+                continue
+            try:
+                sha256, filepath, tamanho = armazenamento.salvar(item.stream)
+                registro = _registrar_documento(
+                    cliente_id, item.nome, sha256, filepath, tamanho, categoria, mes_referencia, lote=lote
+                )
+                manifesto.append(dict(
+                    entrada, aceito=True, documento_id=registro["documento_id"], job_id=registro["job_id"],
+                    sha256=sha256, duplicado_de=registro["duplicado_de"]
+                ))
+            except Exception as e:
+                # Um arquivo com problema não impede os demais
+                db.session.rollback()
+                manifesto.append(dict(entrada, aceito=False, erro=str(e)))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Erro ao enviar lote: {str(e)}", "lote": lote, "arquivos": manifesto}), 500
+
+    aceitos = sum(1 for entrada in manifesto if entrada["aceito"])
+    return jsonify({
+        "message": f"{aceitos} de {len(manifesto)} arquivo(s) recebido(s). O processamento continua em segundo plano.",
+        "lote": lote,
+        "total": len(manifesto),
+        "aceitos": aceitos,
+        "recusados": len(manifesto) - aceitos,
+        "progresso_url": f"/api/documentos/lotes/{lote}",
+        "arquivos": manifesto
+    }), 202 if aceitos else 400
+
+@documento_bp.route('/documentos/lotes/<lote>', methods=['GET'])
+def get_lote_documentos(lote):
+    try:
+        situacao = progresso(lote)
+        if situacao is None:
+            return jsonify({"message": "Lote não encontrado"}), 404
+        return jsonify(situacao)
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# Upload em blocos, retomável: iniciar -> PUT dos blocos com offset -> finalizar
+def _erro_upload(erro):
+    resposta = {"message": str(erro)}
+    if erro.recebido is not None:
+        resposta["recebido"] = erro.recebido
+    return jsonify(resposta), erro.status
+
+@documento_bp.route('/documentos/uploads', methods=['POST'])
+def iniciar_upload():
+    try:
+        data = request.json or {}
+        if not data.get('cliente_id') or not data.get('nome_arquivo') or not data.get('tamanho'):
+            return jsonify({"message": "Campos obrigatórios: cliente_id, nome_arquivo, tamanho"}), 400
+        if not allowed_file(data['nome_arquivo']):
+            return jsonify({"message": "Tipo de arquivo não permitido"}), 400
+
+        sessao = upload_service.iniciar(
+            int(data['cliente_id']), secure_filename(data['nome_arquivo']), int(data['tamanho']),
+            data.get('categoria'), data.get('mes_referencia')
         )
-        db.session.add(novo_documento)
+        resposta = sessao.to_dict()
+        resposta['tamanho_maximo_bloco'] = TAMANHO_MAXIMO_BLOCO
+        return jsonify(resposta), 201
+    except ErroUpload as e:
+        return _erro_upload(e)
+    except ValueError:
+        return jsonify({"message": "cliente_id e tamanho devem ser números"}), 400
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@documento_bp.route('/documentos/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Situação do upload; 'recebido' é o offset para retomar o envio"""
+    try:
+        sessao = db.session.get(UploadSessao, upload_id)
+        if sessao is None:
+            return jsonify({"message": "Upload não encontrado"}), 404
+        return jsonify(sessao.to_dict())
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@documento_bp.route('/documentos/uploads/<upload_id>', methods=['PUT'])
+def enviar_bloco_upload(upload_id):
+    try:
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            return jsonify({"message": "Parâmetro offset é obrigatório"}), 400
+
+        # Lido direto do stream da requisição, em partes, sem bufferizar o corpo
+        sessao = upload_service.receber_bloco(upload_id, offset, request.stream, request.content_length)
+        return jsonify(sessao.to_dict())
+    except ErroUpload as e:
+        return _erro_upload(e)
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@documento_bp.route('/documentos/uploads/<upload_id>/finalizar', methods=['POST'])
+def finalizar_upload(upload_id):
+    try:
+        sessao, sha256, filepath, tamanho = upload_service.finalizar(upload_id)
+        registro = _registrar_documento(
+            sessao.cliente_id, sessao.nome_arquivo, sha256, filepath, tamanho,
+            sessao.categoria, sessao.mes_referencia, upload_sessao=sessao
+        )
+        # Só depois do commit: se ele falhar, o parcial continua para uma nova tentativa
+        upload_service.concluir(upload_id)
+        return jsonify(registro), 202
+    except ErroUpload as e:
+        db.session.rollback()
+        return _erro_upload(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Erro ao finalizar upload: {str(e)}"}), 500
+
+@documento_bp.route('/documentos/uploads/<upload_id>', methods=['DELETE'])
+def cancelar_upload(upload_id):
+    try:
+        upload_service.cancelar(upload_id)
+        return '', 204
+    except ErroUpload as e:
+        return _erro_upload(e)
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# Situação do processamento de um documento enviado
+@documento_bp.route('/documentos/jobs/<int:job_id>', methods=['GET'])
+def get_job_documento(job_id):
+    try:
+        job = db.session.get(JobDocumento, job_id)
+        if job is None:
+            return jsonify({"message": "Job não encontrado"}), 404
+
+        resposta = job.to_dict()
+        if job.documento is not None:
+            resposta['documento'] = job.documento.to_dict()
+        return jsonify(resposta)
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# Campos extraídos (CNPJ, chaves, datas, valores) gravados no processamento
+@documento_bp.route('/documentos/<int:documento_id>/campos', methods=['GET'])
+def get_campos_documento(documento_id):
+    try:
+        if db.session.get(Documento, documento_id) is None:
+            return jsonify({"message": "Documento não encontrado"}), 404
+        return jsonify([campo.to_dict() for campo in campos_documento.listar(documento_id)])
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# Texto completo e análise da IA (só na tela de detalhe; as listas não carregam esses dados)
+@documento_bp.route('/documentos/<int:documento_id>/conteudo', methods=['GET'])
+def get_conteudo_documento(documento_id):
+    try:
+        if db.session.get(Documento, documento_id) is None:
+            return jsonify({"message": "Documento não encontrado"}), 404
+        return jsonify({
+            "documento_id": documento_id,
+            "texto": conteudo_documento.texto(documento_id),
+            "analise": conteudo_documento.analise(documento_id)
+        })
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# Download do arquivo original: a rota só autoriza; o envio fica com o servidor ou o proxy
+@documento_bp.route('/documentos/<int:documento_id>/download', methods=['GET'])
+def download_documento(documento_id):
+    """Arquivo do documento (?inline=1 para abrir no navegador; ?cliente_id= restringe ao cliente)"""
+    try:
+        documento = db.session.get(Documento, documento_id)
+        cliente_id = request.args.get('cliente_id', type=int)
+        if documento is None or (cliente_id is not None and documento.cliente_id != cliente_id):
+            return jsonify({"message": "Documento não encontrado"}), 404
+        if not documento.caminho_arquivo or not os.path.exists(documento.caminho_arquivo):
+            return jsonify({"message": "Arquivo do documento não encontrado"}), 404
+        caminho_arquivo, nome_arquivo = documento.caminho_arquivo, documento.nome_arquivo
+        # A transferência pode demorar: não mantém a transação aberta durante o envio
         db.session.commit()
+        return resposta_arquivo(caminho_arquivo, nome_arquivo, armazenamento.raiz,
+                                inline=request.args.get('inline') in ('1', 'true'))
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# Pré-visualização para a tela de revisão: a entrada do cache depende só do conteúdo do
+# arquivo, então o navegador pode guardá-la sem revalidar
+@documento_bp.route('/documentos/<int:documento_id>/previa', methods=['GET'])
+def get_previa_documento(documento_id):
+    """Miniatura de uma página (?pagina=1&largura=320&formato=webp|jpeg), gerada só na primeira requisição"""
+    try:
+        documento = db.session.get(Documento, documento_id)
+        if documento is None or not documento.caminho_arquivo or not os.path.exists(documento.caminho_arquivo):
+            return jsonify({"message": "Documento não encontrado"}), 404
+        caminho_arquivo, tipo_documento = documento.caminho_arquivo, documento.tipo_documento
+        # Encerra a transação de leitura antes de rasterizar
+        db.session.commit()
+
+        pagina = request.args.get('pagina', 1, type=int)
+        if pagina < 1:
+            return jsonify({"message": "Página inválida"}), 400
+        largura = largura_miniatura(request.args.get('largura', type=int))
+        formato_pedido = request.args.get('formato')
+        formato = formato_miniatura(formato_pedido, 'image/webp' in request.headers.get('Accept', ''))
+        sha256 = sha256_arquivo(caminho_arquivo)
 
+        caminho = cache_miniaturas.obter(caminho_arquivo, tipo_documento, sha256, pagina - 1, largura, formato)
+        resposta = send_file(
+            caminho, mimetype=FORMATOS_MINIATURA[formato], etag=f'{sha256}-{pagina}-{largura}-{formato}'
+        )
+        resposta.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+        if not formato_pedido:
+            resposta.vary.add('Accept')
+        return resposta
+    except ErroMiniatura as e:
+        return jsonify({"message": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# Importação de SPED/OFX: totais por registro (ou por tipo de transação) e lançamentos do extrato
+@documento_bp.route('/documentos/<int:documento_id>/importacao', methods=['GET'])
+def get_importacao_documento(documento_id):
+    try:
+        importacao = importacoes.obter(documento_id)
+        if importacao is None:
+            return jsonify({"message": "Importação não encontrada"}), 404
+        resposta = importacao.to_dict()
+        resposta['registros'] = [registro.to_dict() for registro in importacoes.registros(importacao.id)]
+        return jsonify(resposta)
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@documento_bp.route('/documentos/<int:documento_id>/importacao/lancamentos', methods=['GET'])
+def get_lancamentos_importacao(documento_id):
+    """Transações do extrato OFX (?limite=100&cursor=<proximo_cursor da página anterior>)"""
+    try:
+        importacao = importacoes.obter(documento_id)
+        if importacao is None:
+            return jsonify({"message": "Importação não encontrada"}), 404
+        limite = min(max(1, request.args.get('limite', 100, type=int)), 1000)
+        try:
+            itens, proximo_cursor = importacoes.lancamentos(importacao.id, request.args.get('cursor'), limite)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
         return jsonify({
-            "message": "Documento enviado e processado com sucesso!",
-            "documento_id": novo_documento.id,
-            "filename": novo_documento.nome_arquivo,
-            "extracted_value": extracted_value,
-            "extracted_date": extracted_date_str,
-            "suggested_category": suggested_cat,
-            "status_processamento": novo_documento.status_processamento,
-            "preview_text": full_text[:200] + "..." if len(full_text) > 200 else full_text
-        }), 200
-
-    except ValueError as ve:
-        if os.path.exists(filepath): os.remove(filepath)
-        return jsonify({"message": f"Erro de validação do arquivo: {str(ve)}"}), 400
-    except Exception as e:
-        if os:
\ No newline at end of file
+            "importacao_id": importacao.id,
+            "total": importacao.linhas,
+            "lancamentos": [item.to_dict() for item in itens],
+            "proximo_cursor": proximo_cursor
+        })
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@documento_bp.route('/documentos/campos/totais', methods=['GET'])
+def get_totais_campos():
+    """Soma de um campo por cliente no mês (?mes_referencia=YYYY-MM&campo=valor_total&categoria=&cliente_id=)"""
+    try:
+        mes_referencia = request.args.get('mes_referencia') or datetime.now().strftime('%Y-%m')
+        totais = campos_documento.totais_por_cliente(
+            mes_referencia,
+            campo=request.args.get('campo', 'valor_total'),
+            categoria=request.args.get('categoria'),
+            cliente_id=request.args.get('cliente_id', type=int)
+        )
+        return jsonify({"mes_referencia": mes_referencia, "totais": totais})
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# Cache de OCR em disco
+@documento_bp.route('/documentos/ocr-cache', methods=['GET'])
+def get_cache_ocr():
+    try:
+        return jsonify(cache_ocr.estatisticas())
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@documento_bp.route('/documentos/ocr-cache', methods=['DELETE'])
+def limpar_cache_ocr():
+    """Invalidar o cache inteiro, ou só um arquivo com ?sha256="""
+    try:
+        removidas = cache_ocr.invalidar(request.args.get('sha256'))
+        return jsonify({"removidas": removidas})
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@documento_bp.route('/documentos/<int:documento_id>/ocr-cache', methods=['DELETE'])
+def invalidar_cache_ocr_documento(documento_id):
+    """Forçar novo OCR do arquivo de um documento no próximo processamento"""
+    try:
+        documento = db.session.get(Documento, documento_id)
+        if documento is None:
+            return jsonify({"message": "Documento não encontrado"}), 404
+        # O texto guardado também é descartado, senão o reprocessamento o usaria no lugar do OCR
+        conteudo_documento.descartar_texto(documento_id)
+        db.session.commit()
+        if not documento.caminho_arquivo or not os.path.exists(documento.caminho_arquivo):
+            return jsonify({"removidas": 0})
+        removidas = cache_ocr.invalidar(sha256_arquivo(documento.caminho_arquivo))
+        return jsonify({"removidas": removidas})
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
@@ -0,0 +1,28 @@
+from src.models.user import db
+
+class DocumentoCampo(db.Model):
+    __tablename__ = 'documento_campos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    documento_id = db.Column(db.Integer, db.ForeignKey('documentos.id', ondelete='CASCADE'), nullable=False)
+    campo = db.Column(db.String(30), nullable=False)  # valor_total, valor, data, cnpj, cpf, chave_nfe, linha_digitavel, arrecadacao, competencia; de XML também cnpj_emitente, imposto_icms etc.
+    valor_decimal = db.Column(db.Numeric(14, 2), nullable=True)
+    valor_data = db.Column(db.Date, nullable=True)
+    valor_texto = db.Column(db.String(64), nullable=True)  # dígitos de CNPJ/CPF/chaves ou competência (YYYY-MM)
+    confianca = db.Column(db.Numeric(4, 3), nullable=False, default=0)  # 0 a 1
+    posicao = db.Column(db.Integer, nullable=True)  # início do trecho no texto do documento (em XML, a ordem da nota)
+
+    def __repr__(self):
+        return f'<DocumentoCampo {self.documento_id} {self.campo}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'documento_id': self.documento_id,
+            'campo': self.campo,
+            'valor_decimal': float(self.valor_decimal) if self.valor_decimal is not None else None,
+            'valor_data': self.valor_data.isoformat() if self.valor_data else None,
+            'valor_texto': self.valor_texto,
+            'confianca': float(self.confianca) if self.confianca is not None else None,
+            'posicao': self.posicao
+        }
@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy.orm import deferred
+from src.models.user import db
+
+class DocumentoConteudo(db.Model):
+    """Texto completo e análise da IA de um documento, comprimidos e fora da tabela de documentos"""
+    __tablename__ = 'documento_conteudos'
+
+    documento_id = db.Column(db.Integer, db.ForeignKey('documentos.id', ondelete='CASCADE'), primary_key=True)
+    compressao = db.Column(db.String(10), nullable=False, default='zlib')  # zlib ou zstd
+    tamanho_texto = db.Column(db.Integer, nullable=True)  # caracteres do texto sem compressão
+    # Os blobs só são lidos quando acessados
+    texto = deferred(db.Column(db.LargeBinary, nullable=True))  # texto completo do OCR/PDF
+    analise = deferred(db.Column(db.LargeBinary, nullable=True))  # JSON da análise da IA
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DocumentoConteudo {self.documento_id}>'
@@ -0,0 +1,279 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+from src.models.documento import Documento
+from src.models.job_documento import JobDocumento
+from src.models.user import db
+from src.services.ia_service import suggest_category
+from src.services.campos_documento_service import CamposDocumentoService
+from src.services.conteudo_documento_service import CompressorTexto, ConteudoDocumentoService
+from src.services.extracao_service import extrair_campos, primeiro, valor_principal
+from src.services.importacao_service import CATEGORIAS_IMPORTACAO, ImportacaoService
+from src.services.nota_xml_service import TotaisNotas, ler_notas
+from src.services.fila_documentos_service import FilaDocumentos, PoolIngestao
+from src.services.pdf_service import extrair_texto_pdf
+from src.services.ocr_service import PROCESSOS_OCR, cache_ocr, ocr_arquivo_imagem, pool_ocr, sha256_arquivo
+from src.services.preprocessamento_service import chave_perfil, perfil_para
+from src.services.sped_ofx_service import texto_resumo
+from src.services.armazenamento_service import ArmazenamentoService
+
+# Notas de um XML incluídas no resultado do job (as demais ficam só em documento_campos)
+MAX_NOTAS_RESULTADO = 50
+
+# Caracteres do texto guardados em resumo_ia
+TAMANHO_RESUMO = 500
+
+# Arquivos texto importados por registro/transação, sem OCR (SPED e extrato OFX)
+TIPOS_IMPORTACAO = ('SPED', 'OFX')
+
+# Número de threads de processamento por processo (0 desativa o pool neste processo).
+# As threads só esperam o pool de OCR; com menos threads que processos de OCR, parte do pool fica ociosa.
+NUM_WORKERS = int(os.getenv('DOCUMENTOS_WORKERS', str(max(2, PROCESSOS_OCR))))
+
+
+# Funções de extração de dados (uma passada do extrator de campos fiscais)
+def extract_value_from_text(text):
+    valor = valor_principal(extrair_campos(text))
+    return float(valor) if valor is not None else None
+
+def extract_date_from_text(text):
+    data = primeiro(extrair_campos(text), 'data')
+    return data.valor.isoformat() if data else None
+
+def get_mes_referencia_from_date(date_str):
+    """Converte uma string de data (YYYY-MM-DD) para YYYY-MM."""
+    if date_str:
+        try:
+            dt_obj = datetime.strptime(date_str, '%Y-%m-%d')
+            return dt_obj.strftime('%Y-%m')
+        except ValueError:
+            pass
+    return None
+
+
+def extrair_texto(caminho_arquivo: str, tipo_documento: str, categoria: Optional[str] = None) -> str:
+    """
+    Extrair o texto do arquivo (camada de texto do PDF, resumo das notas do XML,
+    resumo do SPED/OFX ou OCR com o perfil da categoria)
+    """
+    if tipo_documento == 'PDF':
+        return extrair_texto_pdf(caminho_arquivo)
+    if tipo_documento == 'XML':
+        return '\n\n'.join(nota.texto() for nota in ler_notas(caminho_arquivo))
+    if tipo_documento in TIPOS_IMPORTACAO:
+        return texto_resumo(caminho_arquivo)
+    perfil = perfil_para(tipo_documento, categoria)
+    sha256 = sha256_arquivo(caminho_arquivo)
+    resultado = cache_ocr.obter(sha256, 0, perfil=chave_perfil(perfil))
+    if resultado is None:
+        resultado = pool_ocr.executar(ocr_arquivo_imagem, [(caminho_arquivo, perfil, sha256)])[0]
+    return resultado['texto']
+
+
+def _texto_arquivo(caminho_arquivo: Optional[str], tipo_documento: str, categoria: Optional[str]) -> Optional[str]:
+    if not caminho_arquivo or not os.path.exists(caminho_arquivo):
+        return None
+    return extrair_texto(caminho_arquivo, tipo_documento, categoria)
+
+
+def texto_do_documento(documento: Documento) -> Optional[str]:
+    """
+    Texto de um documento já gravado (reprocessamento): o texto completo guardado
+    no processamento ou, sem ele, o OCR do arquivo; None se o arquivo não existir
+    """
+    texto = conteudo_documento.texto(documento.id)
+    if texto is not None:
+        return texto
+    return _texto_arquivo(documento.caminho_arquivo, documento.tipo_documento, documento.categoria)
+
+
+def analisar_arquivo(caminho_arquivo: str, tipo_documento: str, categoria: Optional[str] = None) -> Dict:
+    """OCR, extração por regex e sugestão de categoria; não acessa o banco"""
+    full_text = extrair_texto(caminho_arquivo, tipo_documento, categoria)
+    campos = extrair_campos(full_text, apenas_validos=True)
+    valor = valor_principal(campos)
+    data = primeiro(campos, 'data')
+    extracted_date_str = data.valor.isoformat() if data else None
+    return {
+        'texto': full_text,
+        'campos': campos,
+        'extracted_value': float(valor) if valor is not None else None,
+        'extracted_date': extracted_date_str,
+        'mes_referencia': get_mes_referencia_from_date(extracted_date_str),
+        'suggested_category': suggest_category(full_text)
+    }
+
+
+def analisar_xml(documento_id: int, caminho_arquivo: str) -> Dict:
+    """
+    Notas fiscais de um XML (NF-e/NFS-e), sem OCR, numa passada pelo arquivo. Cada nota
+    lida em streaming vai para a sessão atual, sem commit: os campos em lotes e o texto
+    comprimido aos poucos. Só os totais, a menor data e as primeiras MAX_NOTAS_RESULTADO
+    notas ficam em memória, e 'texto' traz só o início do texto (resumo e prévia).
+    """
+    totais = TotaisNotas()
+    primeiras = []
+    texto = CompressorTexto()
+    inicio = ''
+    data_minima = None
+
+    def acompanhar(notas):
+        nonlocal inicio, data_minima
+        for nota in notas:
+            parte = ('\n\n' if totais.quantidade else '') + nota.texto()
+            totais.adicionar(nota)
+            texto.adicionar(parte)
+            if len(inicio) <= TAMANHO_RESUMO:
+                inicio += parte[:TAMANHO_RESUMO + 1 - len(inicio)]
+            if nota.data_emissao and (data_minima is None or nota.data_emissao < data_minima):
+                data_minima = nota.data_emissao
+            if len(primeiras) < MAX_NOTAS_RESULTADO:
+                primeiras.append(nota)
+            yield nota
+
+    campos_documento.gravar_notas(documento_id, acompanhar(ler_notas(caminho_arquivo)))
+    conteudo_documento.guardar_texto_comprimido(documento_id, texto)
+    extracted_date_str = data_minima.isoformat() if data_minima else None
+    return {
+        'texto': inicio,
+        'notas': primeiras,
+        'resumo': totais.resumo(),
+        'extracted_value': float(totais.valor_total) if totais.quantidade else None,
+        'extracted_date': extracted_date_str,
+        'mes_referencia': get_mes_referencia_from_date(extracted_date_str),
+        'suggested_category': 'nota_fiscal' if totais.quantidade else None
+    }
+
+
+def analisar_importacao(documento_id: int, cliente_id: Optional[int], caminho_arquivo: str,
+                        confirmar: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    SPED ou extrato OFX: totais por registro e transações gravados em lotes pela
+    importação (com commits próprios); o documento guarda só o texto de resumo
+    """
+    importacao, texto = importacoes.importar(documento_id, cliente_id, caminho_arquivo, confirmar)
+    extracted_date_str = importacao.periodo_inicio.isoformat() if importacao.periodo_inicio else None
+    return {
+        'texto': texto,
+        'campos': [],
+        'importacao': importacao.to_dict(),
+        'extracted_value': None,
+        'extracted_date': extracted_date_str,
+        'mes_referencia': get_mes_referencia_from_date(extracted_date_str),
+        'suggested_category': CATEGORIAS_IMPORTACAO.get(importacao.tipo)
+    }
+
+
+def resultado_existente(caminho_arquivo: str, documento_id: Optional[int] = None) -> Optional[Tuple[Documento, Dict]]:
+    """
+    Documento já processado com o mesmo conteúdo (mesmo caminho no armazenamento)
+    e o resultado do seu job, para reaproveitar a extração sem novo OCR.
+    """
+    consulta = (
+        db.session.query(Documento, JobDocumento.resultado)
+        .join(JobDocumento, JobDocumento.documento_id == Documento.id)
+        .filter(Documento.caminho_arquivo == caminho_arquivo, JobDocumento.status == 'concluido')
+    )
+    if documento_id is not None:
+        consulta = consulta.filter(Documento.id != documento_id)
+    linha = consulta.order_by(JobDocumento.data_conclusao.desc()).first()
+    if linha is None or not linha.resultado:
+        return None
+    return linha.Documento, json.loads(linha.resultado)
+
+
+def aplicar_resultado_existente(documento: Documento, original: Documento, resultado: Dict) -> Dict:
+    """Copiar para o documento os dados extraídos do documento original de mesmo conteúdo"""
+    documento.categoria = original.categoria
+    documento.mes_referencia = original.mes_referencia
+    documento.resumo_ia = original.resumo_ia
+    campos_documento.copiar(original.id, documento.id)
+    conteudo_documento.copiar(original.id, documento.id)
+    documento.status_processamento = 'pendente_revisao'
+    documento.data_processamento = datetime.utcnow()
+    return dict(
+        resultado,
+        categoria=documento.categoria,
+        mes_referencia=documento.mes_referencia,
+        status_processamento=documento.status_processamento,
+        duplicado_de=original.id
+    )
+
+
+def processar_job(job: JobDocumento, confirmar: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    Processar o documento de um job. A transação de leitura é encerrada antes
+    do OCR, para não manter uma conexão aberta durante o processamento.
+    confirmar() é chamado antes de commits intermediários (importação em lotes).
+    """
+    documento_id = job.documento_id
+    documento = db.session.get(Documento, documento_id)
+    if documento is None:
+        raise ValueError(f'Documento {documento_id} não encontrado')
+
+    # Conteúdo idêntico processado enquanto este job esperava na fila
+    existente = resultado_existente(documento.caminho_arquivo, documento_id)
+    if existente is not None:
+        return aplicar_resultado_existente(documento, *existente)
+
+    caminho_arquivo, tipo_documento, categoria = documento.caminho_arquivo, documento.tipo_documento, documento.categoria
+    cliente_id = documento.cliente_id
+    db.session.commit()
+
+    if tipo_documento == 'XML':
+        analise = analisar_xml(documento_id, caminho_arquivo)
+    elif tipo_documento in TIPOS_IMPORTACAO:
+        analise = analisar_importacao(documento_id, cliente_id, caminho_arquivo, confirmar)
+    else:
+        analise = analisar_arquivo(caminho_arquivo, tipo_documento, categoria)
+    full_text = analise['texto']
+
+    documento = db.session.get(Documento, documento_id)
+    if analise['suggested_category']:
+        documento.categoria = analise['suggested_category']
+    if analise['mes_referencia']:
+        documento.mes_referencia = analise['mes_referencia']
+    documento.resumo_ia = full_text[:TAMANHO_RESUMO] + "..." if len(full_text) > TAMANHO_RESUMO else full_text
+    # Os campos e o texto das notas de XML já foram gravados por analisar_xml durante a leitura
+    if 'notas' not in analise:
+        conteudo_documento.guardar_texto(documento_id, full_text)
+        campos_documento.gravar(documento_id, analise['campos'])
+    documento.status_processamento = 'pendente_revisao'
+    documento.data_processamento = datetime.utcnow()
+
+    resultado = {
+        'extracted_value': analise['extracted_value'],
+        'extracted_date': analise['extracted_date'],
+        'suggested_category': analise['suggested_category'],
+        'categoria': documento.categoria,
+        'mes_referencia': documento.mes_referencia,
+        'status_processamento': documento.status_processamento,
+        'preview_text': full_text[:200] + "..." if len(full_text) > 200 else full_text
+    }
+    if 'notas' in analise:
+        resultado['notas'] = [nota.to_dict() for nota in analise['notas']]
+        resultado['quantidade_notas'] = analise['resumo']['quantidade']
+        resultado['impostos'] = {nome: str(valor) for nome, valor in analise['resumo']['impostos'].items()}
+    else:
+        resultado['campos'] = [campo.to_dict() for campo in analise['campos']]
+    if 'importacao' in analise:
+        resultado['importacao'] = analise['importacao']
+    return resultado
+
+
+armazenamento = ArmazenamentoService()
+campos_documento = CamposDocumentoService()
+conteudo_documento = ConteudoDocumentoService()
+importacoes = ImportacaoService()
+fila_documentos = FilaDocumentos()
+pool_ingestao = PoolIngestao(fila_documentos, processar_job)
+
+
+def iniciar_ingestao(app):
+    """Iniciar as threads que processam a fila de documentos neste processo"""
+    pool_ingestao.iniciar(app, NUM_WORKERS)
+    if NUM_WORKERS > 0:
+        # Sobe os processos de OCR em segundo plano, sem atrasar o início do servidor
+        threading.Thread(target=pool_ocr.iniciar, name='aquecimento-ocr', daemon=True).start()
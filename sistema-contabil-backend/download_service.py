@@ -0,0 +1,130 @@
+import mimetypes
+import os
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Tuple
+from urllib.parse import quote
+from flask import Response, request
+from werkzeug.http import is_resource_modified
+from src.services.armazenamento_service import sha256_do_caminho
+
+# Download dos arquivos do armazenamento. A autorização é feita na rota; a
+# transferência fica com o servidor (sendfile do gunicorn via wsgi.file_wrapper)
+# ou, com DOWNLOAD_ACCEL_PREFIXO, com o proxy da frente, que recebe só o cabeçalho
+# X-Accel-Redirect e serve o arquivo (inclusive Range) sem ocupar o worker.
+#
+# nginx:
+#     location /_armazenamento/ { internal; alias /app/uploads/documentos/; }
+# Caddy (dentro do reverse_proxy para o back-end):
+#     @accel header X-Accel-Redirect *
+#     handle_response @accel {
+#         root * /app/uploads/documentos
+#         rewrite * {rp.header.X-Accel-Redirect}
+#         uri strip_prefix /_armazenamento
+#         file_server
+#     }
+PREFIXO_ACCEL = os.getenv('DOWNLOAD_ACCEL_PREFIXO', '')  # ex.: /_armazenamento/
+
+# Bloco lido por vez quando o servidor não tem sendfile
+TAMANHO_BLOCO_DOWNLOAD = int(os.getenv('DOWNLOAD_TAMANHO_BLOCO', str(256 * 1024)))
+
+# Sempre revalida (com ETag, a resposta é um 304 vazio), para a autorização valer a cada acesso
+CACHE_CONTROL_DOWNLOAD = 'private, no-cache'
+
+
+def _etag(caminho_arquivo: str, estado: os.stat_result) -> str:
+    """O hash do conteúdo, para arquivos do armazenamento; senão data de modificação e tamanho"""
+    return sha256_do_caminho(caminho_arquivo) or f'{int(estado.st_mtime)}-{estado.st_size}'
+
+
+def _intervalo(tamanho: int, etag: str, modificado: datetime) -> Optional[Tuple[int, int]]:
+    """
+    (início, fim) pedido em Range, ou None para o arquivo inteiro (sem Range, com
+    If-Range desatualizado ou com mais de um intervalo). ValueError se não atendível.
+    """
+    faixa = request.range
+    if faixa is None or len(faixa.ranges) != 1:
+        return None
+    se_intervalo = request.if_range
+    if se_intervalo.etag is not None and se_intervalo.etag != etag:
+        return None
+    if se_intervalo.date is not None and se_intervalo.date != modificado:
+        return None
+    intervalo = faixa.range_for_length(tamanho)
+    if intervalo is None:
+        raise ValueError('Intervalo não atendível')
+    return intervalo
+
+
+def _ler_trecho(arquivo, quantidade: int) -> Iterator[bytes]:
+    try:
+        while quantidade > 0:
+            bloco = arquivo.read(min(TAMANHO_BLOCO_DOWNLOAD, quantidade))
+            if not bloco:
+                break
+            quantidade -= len(bloco)
+            yield bloco
+    finally:
+        arquivo.close()
+
+
+def _caminho_accel(caminho_arquivo: str, raiz: str) -> Optional[str]:
+    relativo = os.path.relpath(caminho_arquivo, raiz)
+    if relativo.startswith('..'):
+        # Arquivo fora do armazenamento (caminhos antigos): servido pelo back-end
+        return None
+    return quote(PREFIXO_ACCEL.rstrip('/') + '/' + relativo.replace(os.sep, '/'))
+
+
+def resposta_arquivo(caminho_arquivo: str, nome_download: str, raiz: str, inline: bool = False) -> Response:
+    """
+    Resposta de download com ETag/Last-Modified (304 para If-None-Match e
+    If-Modified-Since) e Range de um intervalo (206/416, respeitando If-Range).
+    """
+    estado = os.stat(caminho_arquivo)
+    tamanho = estado.st_size
+    etag = _etag(caminho_arquivo, estado)
+    modificado = datetime.fromtimestamp(int(estado.st_mtime), tz=timezone.utc)
+
+    resposta = Response(mimetype=mimetypes.guess_type(nome_download)[0] or 'application/octet-stream')
+    resposta.set_etag(etag)
+    resposta.last_modified = modificado
+    resposta.headers['Accept-Ranges'] = 'bytes'
+    resposta.headers['Cache-Control'] = CACHE_CONTROL_DOWNLOAD
+    resposta.headers.set('Content-Disposition', 'inline' if inline else 'attachment', filename=nome_download)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=modificado):
+        resposta.status_code = 304
+        return resposta
+
+    caminho_accel = _caminho_accel(caminho_arquivo, raiz) if PREFIXO_ACCEL else None
+    if caminho_accel is not None:
+        # O proxy descarta este corpo vazio e responde com o arquivo (Range e condicionais incluídos)
+        resposta.headers['X-Accel-Redirect'] = caminho_accel
+        return resposta
+
+    try:
+        intervalo = _intervalo(tamanho, etag, modificado)
+    except ValueError:
+        resposta.status_code = 416
+        resposta.headers['Content-Range'] = f'bytes */{tamanho}'
+        return resposta
+
+    inicio, fim = intervalo or (0, tamanho)
+    if intervalo is not None:
+        resposta.status_code = 206
+        resposta.headers['Content-Range'] = f'bytes {inicio}-{fim - 1}/{tamanho}'
+
+    arquivo = open(caminho_arquivo, 'rb')
+    arquivo.seek(inicio)
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None and fim == tamanho:
+        # Até o fim do arquivo (download inteiro ou retomada): o wrapper do servidor
+        # envia por sendfile a partir da posição atual. Trechos do meio (leitores de
+        # PDF pedem blocos pequenos) são lidos aqui, sem depender de o servidor
+        # respeitar o Content-Length
+        resposta.response = file_wrapper(arquivo, TAMANHO_BLOCO_DOWNLOAD)
+    else:
+        resposta.response = _ler_trecho(arquivo, fim - inicio)
+    resposta.direct_passthrough = True
+    resposta.content_length = fim - inicio
+    return resposta
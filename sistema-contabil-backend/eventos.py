@@ -0,0 +1,61 @@
+from flask import Blueprint, Response, jsonify, stream_with_context
+from src.models.user import db
+from src.services.eventos_service import central_eventos
+from src.services.resumo_service import ResumoService
+import json
+import queue
+
+eventos_bp = Blueprint('eventos', __name__)
+resumo_service = ResumoService()
+
+# Intervalo entre comentários de keep-alive, para proxies não encerrarem a conexão
+INTERVALO_PING = 15
+
+
+def _formatar_evento(evento):
+    return f"event: {evento.get('tipo', 'mensagem')}\ndata: {json.dumps(evento, default=str)}\n\n"
+
+
+@eventos_bp.route('/eventos', methods=['GET'])
+def stream_eventos():
+    """
+    Canal Server-Sent Events com os contadores do dashboard e novas notificações.
+    Eventos 'contadores' trazem `deltas` (somar) ou `valores` (substituir as chaves enviadas).
+    """
+    try:
+        fila = central_eventos.assinar()
+        if fila is None:
+            return jsonify({'erro': 'Limite de conexões de eventos atingido. Tente novamente.'}), 503
+
+        central_eventos.iniciar_ouvinte(db.engine)
+
+        # Estado inicial: o cliente aplica os deltas seguintes sobre estes valores
+        try:
+            contadores = resumo_service.obter_contadores()
+        except Exception:
+            central_eventos.cancelar(fila)
+            raise
+        finally:
+            # Não segurar uma conexão do banco durante todo o stream
+            db.session.remove()
+
+        def gerar():
+            try:
+                yield 'retry: 5000\n\n'
+                yield _formatar_evento({'tipo': 'contadores', 'valores': contadores})
+                while True:
+                    try:
+                        evento = fila.get(timeout=INTERVALO_PING)
+                    except queue.Empty:
+                        yield ': ping\n\n'
+                        continue
+                    yield _formatar_evento(evento)
+            finally:
+                central_eventos.cancelar(fila)
+
+        resposta = Response(stream_with_context(gerar()), mimetype='text/event-stream')
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.headers['X-Accel-Buffering'] = 'no'
+        return resposta
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
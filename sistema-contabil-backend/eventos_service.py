@@ -0,0 +1,129 @@
+import json
+import os
+import queue
+import select
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from src.models.notificacao import Notificacao
+from src.services.alteracoes_service import observar
+
+# Canal do LISTEN/NOTIFY usado para avisar todos os workers
+CANAL = 'contabilidade_eventos'
+
+# Limite de conexões SSE por processo, para não ocupar todas as threads do worker
+MAX_CONEXOES = int(os.getenv('SSE_MAX_CONEXOES', '50'))
+
+# Eventos guardados por assinante antes de descartar os mais antigos (cliente lento)
+TAMANHO_FILA = 100
+
+
+class CentralEventos:
+    """Distribui eventos para as conexões SSE abertas neste processo"""
+
+    def __init__(self):
+        self._assinantes = set()
+        self._lock = threading.Lock()
+        self._ouvinte: Optional[threading.Thread] = None
+
+    def assinar(self) -> Optional[queue.Queue]:
+        """Registrar uma nova conexão; devolve None se o limite do processo foi atingido"""
+        with self._lock:
+            if len(self._assinantes) >= MAX_CONEXOES:
+                return None
+            fila = queue.Queue(maxsize=TAMANHO_FILA)
+            self._assinantes.add(fila)
+            return fila
+
+    def cancelar(self, fila: queue.Queue):
+        with self._lock:
+            self._assinantes.discard(fila)
+
+    def distribuir(self, evento: Dict):
+        with self._lock:
+            assinantes = list(self._assinantes)
+        for fila in assinantes:
+            try:
+                fila.put_nowait(evento)
+            except queue.Full:
+                try:
+                    fila.get_nowait()
+                    fila.put_nowait(evento)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def iniciar_ouvinte(self, engine):
+        """Iniciar (uma vez por processo) a thread que escuta o NOTIFY do PostgreSQL"""
+        if engine.dialect.name != 'postgresql':
+            return
+        with self._lock:
+            if self._ouvinte is not None and self._ouvinte.is_alive():
+                return
+            self._ouvinte = threading.Thread(target=self._ouvir, args=(engine,), daemon=True)
+            self._ouvinte.start()
+
+    def _ouvir(self, engine):
+        while True:
+            conexao = None
+            try:
+                conexao = engine.raw_connection()
+                driver = getattr(conexao, 'driver_connection', None) or conexao.connection
+                driver.autocommit = True
+                cursor = driver.cursor()
+                cursor.execute(f'LISTEN {CANAL}')
+
+                while True:
+                    if select.select([driver], [], [], 30) == ([], [], []):
+                        continue
+                    driver.poll()
+                    while driver.notifies:
+                        notificacao = driver.notifies.pop(0)
+                        self.distribuir(json.loads(notificacao.payload))
+            except Exception as e:
+                print(f"Erro no ouvinte de eventos: {str(e)}")
+                time.sleep(5)
+            finally:
+                if conexao is not None:
+                    try:
+                        conexao.invalidate()
+                    except Exception:
+                        pass
+
+
+central_eventos = CentralEventos()
+
+
+def publicar(conexao, evento: Dict):
+    """
+    Publicar um evento dentro da transação da escrita.
+    No PostgreSQL usa NOTIFY, que só é entregue a todos os workers no COMMIT.
+    Nos demais bancos (SQLite em desenvolvimento) o evento é entregue apenas
+    às conexões deste processo, também no commit.
+    """
+    if conexao.dialect.name == 'postgresql':
+        conexao.execute(
+            text('SELECT pg_notify(:canal, :payload)'),
+            {'canal': CANAL, 'payload': json.dumps(evento, default=str)}
+        )
+    else:
+        conexao.info.setdefault('eventos_pendentes', []).append(evento)
+
+
+@event.listens_for(Engine, 'commit')
+def _entregar_eventos_locais(conexao):
+    for evento in conexao.info.pop('eventos_pendentes', []):
+        central_eventos.distribuir(evento)
+
+
+@event.listens_for(Engine, 'rollback')
+def _descartar_eventos_locais(conexao):
+    conexao.info.pop('eventos_pendentes', None)
+
+
+@observar(Notificacao, ('id', 'cliente_id', 'tipo', 'titulo', 'prioridade', 'canal', 'status'))
+def _observar_notificacoes(conexao, alteracoes):
+    for antes, depois in alteracoes:
+        if antes is None and depois is not None:
+            publicar(conexao, {'tipo': 'notificacao', 'notificacao': depois})
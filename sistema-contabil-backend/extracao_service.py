@@ -0,0 +1,236 @@
+import re
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+# Extração de campos fiscais do texto dos documentos: uma única passada com um
+# padrão compilado que reúne todos os tipos de campo. Não acessa o banco.
+
+MESES = {
+    'jan': 1, 'fev': 2, 'mar': 3, 'abr': 4, 'mai': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'set': 9, 'out': 10, 'nov': 11, 'dez': 12
+}
+
+# O primeiro dígito é consumido antes das alternativas: assim o re salta direto para
+# o próximo dígito do texto e o lookbehind descarta de uma vez o meio de números já
+# vistos. Entre as alternativas vence a primeira que casar, então as mais longas vêm antes.
+# O mês por extenso ("setembro de 2026") é achado pelo ano e conferido olhando para trás,
+# para não testar o padrão em cada letra do texto.
+# Valores têm até 12 dígitos inteiros, o limite de DECIMAL(14, 2) em documento_campos;
+# números maiores não são valores monetários e ficam de fora.
+_PADRAO_CAMPOS = re.compile(r'''
+    \d(?:
+        (?<![\d.,/]\d)(?:
+            (?P<linha_digitavel>\d{4}\.?\d{5}\s?\d{5}\.?\d{6}\s?\d{5}\.?\d{6}\s?\d\s?\d{14}(?!\d))
+          | (?P<arrecadacao>(?<=8)\d{10}[-\s]?\d\s?\d{11}[-\s]?\d\s?\d{11}[-\s]?\d\s?\d{11}[-\s]?\d(?!\d))
+          | (?P<chave_nfe>\d{3}[\s.]?(?:\d{4}[\s.]?){9}\d{4}(?!\d))
+          | (?P<cnpj>(?:\d\.\d{3}\.\d{3}/\d{4}-\d{2}|\d{13})(?!\d))
+          | (?P<cpf>(?:\d{2}\.\d{3}\.\d{3}-\d{2}|\d{10})(?!\d))
+          | (?P<data>(?:\d/\d{2}/\d{4}|\d-\d{2}-\d{4}|\d{3}-\d{2}-\d{2})(?!\d))
+          | (?P<competencia>(?:(?<=0)[1-9]|(?<=1)[0-2])/\d{4}(?![\d/]))
+          | (?P<valor>(?:\d{0,2}(?:\.\d{3}){1,3}|\d{0,11}),\d{2}(?![\d,]))
+        )
+      | (?<=[\s/]\d)(?P<ano>\d{3})(?![\d,])
+    )
+''', re.VERBOSE)
+
+# "R$" e sinal de menos logo antes de um valor
+_PREFIXO_VALOR = re.compile(r'(?:R\$\s{0,2})?-?$')
+# Mês por extenso logo antes de um ano
+_PREFIXO_MES = re.compile(r'''
+    (?<![^\W\d_])
+    (?:jan(?:eiro)?|fev(?:ereiro)?|mar(?:ço|co)?|abr(?:il)?|mai(?:o)?|jun(?:ho)?
+      |jul(?:ho)?|ago(?:sto)?|set(?:embro)?|out(?:ubro)?|nov(?:embro)?|dez(?:embro)?)
+    \.?(?:\s*/\s*|\s+de\s+)$
+''', re.VERBOSE | re.IGNORECASE)
+
+_NAO_DIGITOS = re.compile(r'\D')
+
+
+class Campo(NamedTuple):
+    """Candidato encontrado no texto, com o valor já convertido e a posição"""
+    tipo: str
+    valor: Union[str, Decimal, date]
+    texto: str
+    inicio: int
+    fim: int
+    valido: bool
+
+    def to_dict(self) -> Dict:
+        return {
+            'tipo': self.tipo,
+            'valor': self.valor.isoformat() if isinstance(self.valor, date) else str(self.valor),
+            'texto': self.texto,
+            'inicio': self.inicio,
+            'fim': self.fim,
+            'valido': self.valido
+        }
+
+
+# Dígitos verificadores
+def _modulo11(digitos: str, pesos: Iterable[int]) -> int:
+    return sum(int(d) * p for d, p in zip(digitos, pesos)) % 11
+
+
+def cnpj_valido(digitos: str) -> bool:
+    if len(digitos) != 14 or digitos == digitos[0] * 14:
+        return False
+    pesos = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    for posicao in (12, 13):
+        resto = _modulo11(digitos[:posicao], pesos[13 - posicao:])
+        if int(digitos[posicao]) != (0 if resto < 2 else 11 - resto):
+            return False
+    return True
+
+
+def cpf_valido(digitos: str) -> bool:
+    if len(digitos) != 11 or digitos == digitos[0] * 11:
+        return False
+    for posicao in (9, 10):
+        resto = _modulo11(digitos[:posicao], range(posicao + 1, 1, -1))
+        if int(digitos[posicao]) != (0 if resto < 2 else 11 - resto):
+            return False
+    return True
+
+
+def _pesos_2_a_9(quantidade: int) -> List[int]:
+    """Pesos 2, 3, ..., 9, 2, 3, ... aplicados da direita para a esquerda"""
+    return [2 + (indice % 8) for indice in range(quantidade)][::-1]
+
+
+def chave_nfe_valida(digitos: str) -> bool:
+    if len(digitos) != 44:
+        return False
+    resto = _modulo11(digitos[:43], _pesos_2_a_9(43))
+    return int(digitos[43]) == (0 if resto < 2 else 11 - resto)
+
+
+def _modulo10(digitos: str) -> int:
+    soma = 0
+    for indice, digito in enumerate(reversed(digitos)):
+        produto = int(digito) * (2 if indice % 2 == 0 else 1)
+        soma += produto // 10 + produto % 10
+    return (10 - soma % 10) % 10
+
+
+def linha_digitavel_valida(digitos: str) -> bool:
+    """Boleto bancário (47 dígitos): DV de cada campo (módulo 10) e DV geral do código de barras (módulo 11)"""
+    if len(digitos) != 47:
+        return False
+    for inicio, fim in ((0, 9), (10, 20), (21, 31)):
+        if _modulo10(digitos[inicio:fim]) != int(digitos[fim]):
+            return False
+    codigo_barras = digitos[0:4] + digitos[33:47] + digitos[4:9] + digitos[10:20] + digitos[21:31]
+    resto = _modulo11(codigo_barras, _pesos_2_a_9(43))
+    dv = 11 - resto
+    return int(digitos[32]) == (1 if dv in (0, 10, 11) else dv)
+
+
+def arrecadacao_valida(digitos: str) -> bool:
+    """Guia de arrecadação/concessionária (48 dígitos, começa com 8): DV de cada bloco"""
+    if len(digitos) != 48 or digitos[0] != '8':
+        return False
+    usa_modulo10 = digitos[2] in '67'
+    for bloco in range(4):
+        dados, dv = digitos[bloco * 12:bloco * 12 + 11], int(digitos[bloco * 12 + 11])
+        if usa_modulo10:
+            esperado = _modulo10(dados)
+        else:
+            resto = _modulo11(dados, _pesos_2_a_9(11))
+            esperado = 0 if resto < 2 else 11 - resto
+        if esperado != dv:
+            return False
+    return True
+
+
+# Conversão de cada tipo: devolve (valor, valido)
+def _converter_digitos(validar):
+    def converter(texto: str):
+        digitos = _NAO_DIGITOS.sub('', texto)
+        return digitos, validar(digitos)
+    return converter
+
+
+def _converter_data(texto: str):
+    if '/' in texto:
+        dia, mes, ano = texto.split('/')
+    elif len(texto.split('-')[0]) == 4:
+        ano, mes, dia = texto.split('-')
+    else:
+        dia, mes, ano = texto.split('-')
+    try:
+        return date(int(ano), int(mes), int(dia)), True
+    except ValueError:
+        return texto, False
+
+
+def _converter_competencia(texto: str):
+    mes, ano = texto.split('/')
+    return f'{ano}-{mes}', True
+
+
+def _converter_competencia_extenso(texto: str):
+    return f'{texto[-4:]}-{MESES[texto[:3].lower()]:02d}', True
+
+
+def _converter_valor(texto: str):
+    numero = texto.replace('R$', '').replace(' ', '').replace('.', '').replace(',', '.')
+    return Decimal(numero.strip()), True
+
+
+CONVERSORES = {
+    'linha_digitavel': _converter_digitos(linha_digitavel_valida),
+    'arrecadacao': _converter_digitos(arrecadacao_valida),
+    'chave_nfe': _converter_digitos(chave_nfe_valida),
+    'cnpj': _converter_digitos(cnpj_valido),
+    'cpf': _converter_digitos(cpf_valido),
+    'data': _converter_data,
+    'competencia': _converter_competencia,
+    'competencia_extenso': _converter_competencia_extenso,
+    'valor': _converter_valor
+}
+
+
+def iterar_campos(texto: str) -> Iterator[Campo]:
+    """Percorrer o texto uma vez, devolvendo os candidatos na ordem em que aparecem"""
+    for encontrado in _PADRAO_CAMPOS.finditer(texto):
+        tipo = encontrado.lastgroup
+        inicio, fim = encontrado.span()
+        if tipo == 'valor':
+            inicio = _PREFIXO_VALOR.search(texto, max(0, inicio - 5), inicio).start()
+        elif tipo == 'ano':
+            mes = _PREFIXO_MES.search(texto, max(0, inicio - 16), inicio)
+            if mes is None:
+                continue
+            inicio, tipo = mes.start(), 'competencia_extenso'
+        trecho = texto[inicio:fim]
+        valor, valido = CONVERSORES[tipo](trecho)
+        if tipo == 'competencia_extenso':
+            tipo = 'competencia'
+        yield Campo(tipo, valor, trecho, inicio, fim, valido)
+
+
+def extrair_campos(texto: str, apenas_validos: bool = False) -> List[Campo]:
+    if not texto:
+        return []
+    if apenas_validos:
+        return [campo for campo in iterar_campos(texto) if campo.valido]
+    return list(iterar_campos(texto))
+
+
+def extrair_campos_lote(textos: Iterable[str], apenas_validos: bool = False) -> Iterator[List[Campo]]:
+    """Extrair os campos de muitos textos (gerador, para não manter todos os resultados em memória)"""
+    for texto in textos:
+        yield extrair_campos(texto, apenas_validos)
+
+
+def primeiro(campos: List[Campo], tipo: str) -> Optional[Campo]:
+    return next((campo for campo in campos if campo.tipo == tipo and campo.valido), None)
+
+
+def valor_principal(campos: List[Campo]) -> Optional[Decimal]:
+    """Primeiro valor em reais (R$); sem nenhum, o primeiro número decimal"""
+    valores = [campo for campo in campos if campo.tipo == 'valor']
+    com_moeda = next((campo for campo in valores if campo.texto.upper().startswith('R$')), None)
+    escolhido = com_moeda or (valores[0] if valores else None)
+    return escolhido.valor if escolhido else None
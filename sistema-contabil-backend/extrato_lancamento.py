@@ -0,0 +1,26 @@
+from src.models.user import db
+
+class ExtratoLancamento(db.Model):
+    """Transação de um extrato bancário importado (OFX)"""
+    __tablename__ = 'extrato_lancamentos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    importacao_id = db.Column(db.Integer, db.ForeignKey('importacoes.id', ondelete='CASCADE'), nullable=False)
+    data = db.Column(db.Date, nullable=True)
+    valor = db.Column(db.Numeric(14, 2), nullable=False)  # negativo = débito
+    tipo = db.Column(db.String(20), nullable=False)  # TRNTYPE do OFX
+    fitid = db.Column(db.String(255), nullable=True)  # identificador da transação no banco
+    descricao = db.Column(db.String(255), nullable=True)
+
+    def __repr__(self):
+        return f'<ExtratoLancamento {self.importacao_id} {self.data} {self.valor}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'data': self.data.isoformat() if self.data else None,
+            'valor': float(self.valor) if self.valor is not None else None,
+            'tipo': self.tipo,
+            'fitid': self.fitid,
+            'descricao': self.descricao
+        }
@@ -0,0 +1,21 @@
+from datetime import datetime
+from src.models.user import db
+
+class Feriado(db.Model):
+    __tablename__ = 'feriados'
+
+    data = db.Column(db.Date, primary_key=True)
+    descricao = db.Column(db.String(100), nullable=False)
+    nacional = db.Column(db.Boolean, default=True)  # False para feriados locais cadastrados pelo escritório
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Feriado {self.data} - {self.descricao}>'
+
+    def to_dict(self):
+        return {
+            'data': self.data.isoformat() if self.data else None,
+            'descricao': self.descricao,
+            'nacional': self.nacional,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
+        }
@@ -0,0 +1,297 @@
+import os
+import socket
+import threading
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+from sqlalchemy import and_, exists, or_, select, update
+from src.models.documento import Documento
+from src.models.job_documento import JobDocumento
+from src.models.user import db
+
+# Intervalo entre consultas à fila quando não há jobs (segundos)
+INTERVALO_FILA = float(os.getenv('DOCUMENTOS_INTERVALO_FILA', '2'))
+
+# Jobs em 'processando' há mais tempo que isto são considerados abandonados (worker caiu)
+TEMPO_MAXIMO_JOB = int(os.getenv('DOCUMENTOS_TEMPO_MAXIMO_JOB', '600'))
+
+# Espera antes de uma nova tentativa: ESPERA_BASE * 2^(tentativas - 1) segundos
+ESPERA_BASE = 30
+
+# Jobs que ainda vão gravar no documento
+STATUS_ATIVOS = ('pendente', 'processando')
+
+
+class Reserva(NamedTuple):
+    """Job reservado por um worker; tentativas distingue reservas sucessivas do mesmo worker"""
+    job_id: int
+    worker: str
+    tentativas: int
+
+
+class JobPerdido(RuntimeError):
+    """O job passou de TEMPO_MAXIMO_JOB e foi reservado de novo; o resultado deste worker é descartado"""
+
+
+class FilaDocumentos:
+    """Fila durável de processamento de documentos sobre a tabela jobs_documentos"""
+
+    def enfileirar(self, documento_id: int, lote: Optional[str] = None) -> JobDocumento:
+        """Criar o job na sessão atual; ele é gravado no mesmo commit do documento"""
+        job = JobDocumento(documento_id=documento_id, status='pendente', disponivel_em=datetime.utcnow(), lote=lote)
+        db.session.add(job)
+        return job
+
+    def registrar_concluido(self, documento_id: int, resultado: Dict, lote: Optional[str] = None) -> JobDocumento:
+        """Criar um job já concluído (documento duplicado cujo resultado foi reaproveitado)"""
+        agora = datetime.utcnow()
+        job = JobDocumento(
+            documento_id=documento_id, status='concluido', disponivel_em=agora, lote=lote,
+            resultado=json.dumps(resultado, default=str), data_inicio=agora, data_conclusao=agora
+        )
+        db.session.add(job)
+        return job
+
+    def sem_job_ativo(self):
+        """Condição para consultas de Documento: sem job pendente ou em processamento"""
+        return ~exists().where(and_(
+            JobDocumento.documento_id == Documento.id,
+            JobDocumento.status.in_(STATUS_ATIVOS)
+        ))
+
+    def jobs_ativos(self, documento_ids: Iterable[int]) -> Dict[int, int]:
+        """Job pendente ou em processamento de cada documento (documento_id -> job_id)"""
+        documento_ids = list(documento_ids)
+        if not documento_ids:
+            return {}
+        return dict(db.session.execute(
+            select(JobDocumento.documento_id, JobDocumento.id)
+            .where(JobDocumento.documento_id.in_(documento_ids), JobDocumento.status.in_(STATUS_ATIVOS))
+        ).all())
+
+    def _condicao_disponivel(self, agora: datetime):
+        return or_(
+            and_(JobDocumento.status == 'pendente', JobDocumento.disponivel_em <= agora),
+            and_(
+                JobDocumento.status == 'processando',
+                JobDocumento.data_inicio < agora - timedelta(seconds=TEMPO_MAXIMO_JOB),
+                JobDocumento.tentativas < JobDocumento.max_tentativas
+            )
+        )
+
+    def reservar(self, worker: str) -> Optional[int]:
+        """
+        Reservar o próximo job disponível para este worker.
+        No PostgreSQL usa FOR UPDATE SKIP LOCKED; a troca de status condicionada
+        garante que dois workers nunca fiquem com o mesmo job.
+        """
+        try:
+            agora = datetime.utcnow()
+            job_id = db.session.execute(
+                select(JobDocumento.id)
+                .where(self._condicao_disponivel(agora))
+                .order_by(JobDocumento.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar()
+            if job_id is None:
+                db.session.rollback()
+                return None
+
+            reservado = db.session.execute(
+                update(JobDocumento)
+                .where(and_(JobDocumento.id == job_id, self._condicao_disponivel(agora)))
+                .values(
+                    status='processando',
+                    worker=worker,
+                    data_inicio=agora,
+                    tentativas=JobDocumento.tentativas + 1
+                )
+            ).rowcount
+            db.session.commit()
+            return job_id if reservado == 1 else None
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def expirar_abandonados(self) -> int:
+        """Marcar como erro os jobs abandonados que já esgotaram as tentativas, e os seus documentos"""
+        try:
+            agora = datetime.utcnow()
+            jobs = JobDocumento.query.filter(
+                JobDocumento.status == 'processando',
+                JobDocumento.data_inicio < agora - timedelta(seconds=TEMPO_MAXIMO_JOB),
+                JobDocumento.tentativas >= JobDocumento.max_tentativas
+            ).with_for_update(skip_locked=True).all()
+            for job in jobs:
+                job.status = 'erro'
+                job.erro = 'Tempo máximo de processamento excedido'
+                job.data_conclusao = agora
+                if job.documento is not None:
+                    job.documento.status_processamento = 'erro'
+            db.session.commit()
+            return len(jobs)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def obter_reserva(self, job_id: int, worker: str) -> Optional[Reserva]:
+        """Reserva do job recém-reservado por este worker (None se outro já o tomou)"""
+        job = db.session.get(JobDocumento, job_id)
+        if job is None or job.status != 'processando' or job.worker != worker:
+            return None
+        return Reserva(job_id, worker, job.tentativas)
+
+    def renovar(self, reserva: Reserva):
+        """
+        Confirmar, na transação atual, que o job ainda é desta reserva e renovar
+        data_inicio. Vem antes de todo commit de quem processa o job: o UPDATE
+        trava o job até o commit, então ele não pode ser reservado de novo no
+        meio, e JobPerdido impede que um worker atrasado grave por cima do novo.
+        """
+        renovado = db.session.execute(
+            update(JobDocumento)
+            .where(and_(
+                JobDocumento.id == reserva.job_id,
+                JobDocumento.status == 'processando',
+                JobDocumento.worker == reserva.worker,
+                JobDocumento.tentativas == reserva.tentativas
+            ))
+            .values(data_inicio=datetime.utcnow())
+        ).rowcount
+        if renovado != 1:
+            raise JobPerdido(f'Job {reserva.job_id} reservado por outro worker')
+
+    def concluir(self, reserva: Reserva, resultado: Dict) -> bool:
+        """
+        Marcar o job como concluído no mesmo commit das alterações feitas no documento.
+        Se o job já não é desta reserva as alterações são descartadas e devolve False.
+        """
+        try:
+            self.renovar(reserva)
+        except JobPerdido:
+            db.session.rollback()
+            return False
+        job = db.session.get(JobDocumento, reserva.job_id)
+        job.status = 'concluido'
+        job.resultado = json.dumps(resultado, default=str)
+        job.erro = None
+        job.data_conclusao = datetime.utcnow()
+        db.session.commit()
+        return True
+
+    def falhar(self, reserva: Reserva, erro: str) -> bool:
+        """
+        Registrar a falha do job. Devolve True se o job voltou para a fila
+        (nova tentativa mais tarde) e False se as tentativas se esgotaram ou
+        se o job já não é desta reserva (nada é gravado).
+        """
+        db.session.rollback()
+        try:
+            self.renovar(reserva)
+        except JobPerdido:
+            db.session.rollback()
+            return False
+        job = db.session.get(JobDocumento, reserva.job_id)
+
+        agora = datetime.utcnow()
+        job.erro = erro
+        if job.tentativas < job.max_tentativas:
+            job.status = 'pendente'
+            job.disponivel_em = agora + timedelta(seconds=ESPERA_BASE * 2 ** (job.tentativas - 1))
+            nova_tentativa = True
+        else:
+            job.status = 'erro'
+            job.data_conclusao = agora
+            if job.documento is not None:
+                job.documento.status_processamento = 'erro'
+            nova_tentativa = False
+        db.session.commit()
+        return nova_tentativa
+
+
+class PoolIngestao:
+    """
+    Threads locais que consomem a fila de documentos. Cada processo (worker do
+    gunicorn) tem o seu pool; a reserva no banco distribui os jobs entre eles.
+    """
+
+    def __init__(self, fila: FilaDocumentos, processar: Callable[[JobDocumento, Callable[[], None]], Dict]):
+        self.fila = fila
+        self.processar = processar
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def iniciar(self, app, num_workers: int):
+        with self._lock:
+            if self._threads or num_workers <= 0:
+                return
+            self._parar.clear()
+            prefixo = f'{socket.gethostname()}:{os.getpid()}'
+            for indice in range(num_workers):
+                thread = threading.Thread(
+                    target=self._executar, args=(app, f'{prefixo}:{indice}'),
+                    name=f'ingestao-documentos-{indice}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def parar(self):
+        with self._lock:
+            self._parar.set()
+            self._acordar.set()
+            for thread in self._threads:
+                thread.join(timeout=5)
+            self._threads = []
+
+    def acordar(self):
+        """Avisar que há job novo, sem esperar o próximo intervalo de consulta"""
+        self._acordar.set()
+
+    def _executar(self, app, worker: str):
+        while not self._parar.is_set():
+            with app.app_context():
+                try:
+                    job_id = self.fila.reservar(worker)
+                    if job_id is None:
+                        self.fila.expirar_abandonados()
+                except Exception as e:
+                    print(f"[{datetime.now()}] Erro ao consultar fila de documentos: {str(e)}")
+                    job_id = None
+
+                if job_id is not None:
+                    self._processar_job(job_id, worker)
+                    continue
+
+            self._acordar.wait(INTERVALO_FILA)
+            self._acordar.clear()
+
+    def _processar_job(self, job_id: int, worker: str):
+        """
+        Processar o job e gravar o resultado só se a reserva ainda for deste worker.
+        O processamento recebe a função que renova a reserva antes de commits intermediários.
+        """
+        reserva = None
+        try:
+            reserva = self.fila.obter_reserva(job_id, worker)
+            if reserva is None:
+                db.session.rollback()
+                return
+            resultado = self.processar(db.session.get(JobDocumento, job_id), lambda: self.fila.renovar(reserva))
+            if not self.fila.concluir(reserva, resultado):
+                print(f"[{datetime.now()}] Job de documento {job_id} reservado por outro worker; resultado descartado")
+        except JobPerdido as e:
+            db.session.rollback()
+            print(f"[{datetime.now()}] {str(e)}; processamento interrompido")
+        except Exception as e:
+            print(f"[{datetime.now()}] Erro ao processar job de documento {job_id}: {str(e)}")
+            if reserva is None:
+                db.session.rollback()
+                return
+            try:
+                self.fila.falhar(reserva, str(e))
+            except Exception as erro_registro:
+                db.session.rollback()
+                print(f"[{datetime.now()}] Erro ao registrar falha do job {job_id}: {str(erro_registro)}")
@@ -0,0 +1,19 @@
+from datetime import datetime
+from src.models.user import db
+
+class GeracaoTabela(db.Model):
+    __tablename__ = 'geracoes_tabela'
+
+    tabela = db.Column(db.String(50), primary_key=True)
+    geracao = db.Column(db.BigInteger, nullable=False, default=0)  # incrementada a cada escrita na tabela
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GeracaoTabela {self.tabela}={self.geracao}>'
+
+    def to_dict(self):
+        return {
+            'tabela': self.tabela,
+            'geracao': self.geracao,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
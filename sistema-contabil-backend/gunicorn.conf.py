@@ -0,0 +1,25 @@
+# Configuração do Gunicorn
+# Workers com threads (gthread): conexões longas como o SSE de /api/eventos ocupam
+# uma thread, não o worker inteiro, e as demais requisições continuam sendo atendidas.
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:3001')
+# Um worker por CPU: as threads atendem as requisições concorrentes e cada worker tem
+# o seu pool de OCR, então mais workers que CPUs só multiplicariam os processos de OCR
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count())))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+# Metade das threads pode ficar presa em conexões SSE; as demais atendem as requisições
+os.environ.setdefault('SSE_MAX_CONEXOES', str(max(1, threads // 2)))
+# Uma conexão do banco por thread: nenhuma requisição espera o pool. O PostgreSQL
+# precisa aceitar workers * threads conexões (max_connections)
+os.environ.setdefault('DB_POOL_TAMANHO', str(threads))
+os.environ.setdefault('DB_POOL_EXTRA', '0')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+# As CPUs são divididas entre os pools de OCR dos workers (pelo menos um processo em
+# cada), para que o total de processos de OCR seja o número de CPUs. Com GUNICORN_WORKERS
+# acima das CPUs o total passa a ser o número de workers.
+os.environ.setdefault('OCR_PROCESSOS', str(max(1, multiprocessing.cpu_count() // workers)))
@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
 from src.services.ia_service import IAService
+from src.services.calendario_fiscal_service import CalendarioFiscalService
+from src.services.documento_service import conteudo_documento, fila_documentos, pool_ingestao, texto_do_documento
 from src.models.documento import Documento
 from src.models.cliente import Cliente
 from src.models.user import db
@@ -8,6 +10,7 @@ import os
 
 ia_bp = Blueprint('ia', __name__)
 ia_service = IAService()
+calendario_service = CalendarioFiscalService()
 
 @ia_bp.route('/ia/processar-documento/<int:documento_id>', methods=['POST'])
 def processar_documento(documento_id):
@@ -15,7 +18,10 @@ def processar_documento(documento_id):
     try:
         documento = Documento.query.get_or_404(documento_id)
         
-        # Simular leitura do arquivo (em produção, usar bibliotecas como PyPDF2, python-docx, etc.)
+        # Texto do arquivo (páginas já reconhecidas vêm do cache de OCR)
+        texto_documento = texto_do_documento(documento)
+        
+        # Simular leitura do arquivo quando ele não está disponível
         texto_simulado = f"""
         Documento: {documento.nome_arquivo}
         Cliente: {documento.cliente.nome}
@@ -28,7 +34,7 @@ def processar_documento(documento_id):
         
         # Processar com IA
         resultado = ia_service.analisar_documento(
-            texto_simulado,
+            texto_documento or texto_simulado,
             documento.tipo_documento,
             documento.categoria
         )
@@ -36,6 +42,7 @@ def processar_documento(documento_id):
         # Atualizar documento com resultados
         documento.resumo_ia = resultado.get('resumo', '')
         documento.pontos_importantes = resultado.get('pontos_importantes', '')
+        conteudo_documento.guardar_analise(documento.id, resultado)
         documento.status_processamento = 'processado'
         documento.data_processamento = datetime.utcnow()
         
@@ -65,12 +72,21 @@ def sugerir_obrigacoes(cliente_id):
             'regime_tributario': cliente.regime_tributario
         }
         
-        sugestoes = ia_service.gerar_sugestoes_obrigacoes(cliente_info, mes_referencia)
+        # Regimes cobertos pelo calendário fiscal não precisam de IA
+        origem = 'calendario'
+        sugestoes = calendario_service.obrigacoes_do_mes(cliente.regime_tributario, mes_referencia)
+        for sugestao in sugestoes:
+            sugestao['data_vencimento'] = sugestao['data_vencimento'].isoformat()
+        
+        if not sugestoes:
+            origem = 'ia'
+            sugestoes = ia_service.gerar_sugestoes_obrigacoes(cliente_info, mes_referencia)
         
         return jsonify({
             'sucesso': True,
             'cliente': cliente.to_dict(),
             'mes_referencia': mes_referencia,
+            'origem': origem,
             'sugestoes': sugestoes
         })
         
@@ -155,6 +171,7 @@ def processar_lote_documentos():
             return jsonify({'erro': 'Lista de IDs de documentos é obrigatória'}), 400
         
         resultados = []
+        enfileirados = 0
         
         for doc_id in documento_ids:
             try:
@@ -167,6 +184,31 @@ def processar_lote_documentos():
                     })
                     continue
                 
+                # Documento na fila de ingestão: o job grava o resultado
+                job_id = fila_documentos.jobs_ativos([documento.id]).get(documento.id)
+                if job_id is not None:
+                    resultados.append({
+                        'documento_id': doc_id,
+                        'sucesso': False,
+                        'erro': 'Documento em processamento na fila de ingestão',
+                        'job_id': job_id
+                    })
+                    continue
+                
+                # Sem extração (nunca processado ou com erro): reprocessar pela fila
+                if documento.status_processamento in ('pendente', 'erro'):
+                    documento.status_processamento = 'pendente'
+                    job = fila_documentos.enfileirar(documento.id)
+                    db.session.flush()
+                    enfileirados += 1
+                    resultados.append({
+                        'documento_id': doc_id,
+                        'sucesso': True,
+                        'enfileirado': True,
+                        'job_id': job.id
+                    })
+                    continue
+                
                 # Simular processamento
                 texto_simulado = f"Documento: {documento.nome_arquivo} - Cliente: {documento.cliente.nome}"
                 
@@ -179,6 +221,7 @@ def processar_lote_documentos():
                 # Atualizar documento
                 documento.resumo_ia = resultado_ia.get('resumo', '')
                 documento.pontos_importantes = resultado_ia.get('pontos_importantes', '')
+                conteudo_documento.guardar_analise(documento.id, resultado_ia)
                 documento.status_processamento = 'processado'
                 documento.data_processamento = datetime.utcnow()
                 
@@ -196,6 +239,8 @@ def processar_lote_documentos():
                 })
         
         db.session.commit()
+        if enfileirados:
+            pool_ingestao.acordar()
         
         return jsonify({
             'sucesso': True,
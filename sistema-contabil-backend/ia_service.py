@@ -350,3 +350,26 @@ class IAService:
                 'acoes_recomendadas': []
             }
 
+
+
+# Palavras-chave por categoria de documento (as mesmas categorias usadas no frontend)
+PALAVRAS_CATEGORIA = [
+    ('nota_fiscal', ('nota fiscal', 'nf-e', 'nfs-e', 'danfe', 'chave de acesso')),
+    ('folha_pagamento', ('folha de pagamento', 'holerite', 'contracheque', 'recibo de pagamento de salário')),
+    ('extrato_bancario', ('extrato', 'saldo anterior', 'saldo disponível')),
+    ('comprovante_pagamento', ('comprovante de pagamento', 'comprovante de transferência', 'pix', 'autenticação bancária')),
+    ('declaracao', ('declaração', 'dctf', 'defis', 'ecf', 'dirf')),
+    ('balancete', ('balancete',)),
+    ('dre', ('demonstração do resultado', 'dre'))
+]
+
+
+def suggest_category(text: str) -> Optional[str]:
+    """Sugerir a categoria do documento pelo texto extraído (regras locais, sem chamada à API)"""
+    if not text:
+        return None
+    texto = text.lower()
+    for categoria, palavras in PALAVRAS_CATEGORIA:
+        if any(re.search(r'\b' + re.escape(palavra) + r'\b', texto) for palavra in palavras):
+            return categoria
+    return None
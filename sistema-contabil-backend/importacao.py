@@ -0,0 +1,42 @@
+from datetime import datetime
+from src.models.user import db
+
+class Importacao(db.Model):
+    """Importação de um arquivo SPED ou extrato OFX enviado como documento"""
+    __tablename__ = 'importacoes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    documento_id = db.Column(db.Integer, db.ForeignKey('documentos.id', ondelete='CASCADE'), nullable=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), nullable=True)
+    tipo = db.Column(db.String(30), nullable=False)  # SPED_FISCAL, SPED_CONTRIBUICOES, OFX
+    status = db.Column(db.String(20), default='processando')  # processando, concluido, erro
+    cnpj = db.Column(db.String(14), nullable=True)
+    nome = db.Column(db.String(255), nullable=True)  # contribuinte (SPED) ou banco/conta (OFX)
+    periodo_inicio = db.Column(db.Date, nullable=True)
+    periodo_fim = db.Column(db.Date, nullable=True)
+    linhas = db.Column(db.BigInteger, nullable=False, default=0)  # linhas do SPED ou transações do OFX
+    tamanho_arquivo = db.Column(db.BigInteger, nullable=True)
+    erro = db.Column(db.Text, nullable=True)
+    data_inicio = db.Column(db.DateTime, default=datetime.utcnow)
+    data_conclusao = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Importacao {self.id} {self.tipo} - {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'documento_id': self.documento_id,
+            'cliente_id': self.cliente_id,
+            'tipo': self.tipo,
+            'status': self.status,
+            'cnpj': self.cnpj,
+            'nome': self.nome,
+            'periodo_inicio': self.periodo_inicio.isoformat() if self.periodo_inicio else None,
+            'periodo_fim': self.periodo_fim.isoformat() if self.periodo_fim else None,
+            'linhas': self.linhas,
+            'tamanho_arquivo': self.tamanho_arquivo,
+            'erro': self.erro,
+            'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
+            'data_conclusao': self.data_conclusao.isoformat() if self.data_conclusao else None
+        }
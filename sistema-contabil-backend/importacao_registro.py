@@ -0,0 +1,23 @@
+from src.models.user import db
+
+class ImportacaoRegistro(db.Model):
+    """Resumo de uma importação: quantidade e soma de um campo por registro do SPED (ou tipo de transação do OFX)"""
+    __tablename__ = 'importacao_registros'
+
+    id = db.Column(db.Integer, primary_key=True)
+    importacao_id = db.Column(db.Integer, db.ForeignKey('importacoes.id', ondelete='CASCADE'), nullable=False)
+    registro = db.Column(db.String(20), nullable=False)  # C100, E110... ou CREDIT, DEBIT...
+    campo = db.Column(db.String(40), nullable=True)  # vl_doc, vl_icms_recolher...; None = só a contagem
+    quantidade = db.Column(db.BigInteger, nullable=False, default=0)
+    total = db.Column(db.Numeric(16, 2), nullable=True)
+
+    def __repr__(self):
+        return f'<ImportacaoRegistro {self.importacao_id} {self.registro} {self.campo}>'
+
+    def to_dict(self):
+        return {
+            'registro': self.registro,
+            'campo': self.campo,
+            'quantidade': self.quantidade,
+            'total': float(self.total) if self.total is not None else None
+        }
@@ -0,0 +1,205 @@
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert, tuple_
+from src.models.extrato_lancamento import ExtratoLancamento
+from src.models.importacao import Importacao
+from src.models.importacao_registro import ImportacaoRegistro
+from src.models.user import db
+from src.services.projecao_service import codificar_cursor, decodificar_cursor
+from src.services.sped_ofx_service import (
+    OFX, cabecalho_ofx, formatar_resumo_ofx, formatar_resumo_sped, mapear, resumir_sped, tipo_importacao,
+    transacoes_ofx
+)
+
+# Linhas gravadas por INSERT (executemany) e por commit na importação de extratos
+TAMANHO_LOTE_IMPORTACAO = int(os.getenv('IMPORTACAO_TAMANHO_LOTE', '5000'))
+
+# Categoria do documento por tipo de importação
+CATEGORIAS_IMPORTACAO = {'SPED_FISCAL': 'declaracao', 'SPED_CONTRIBUICOES': 'declaracao', OFX: 'extrato_bancario'}
+
+
+def _commit(confirmar: Optional[Callable[[], None]]):
+    """Commit precedido da confirmação de quem chamou (o job de ingestão ainda é deste worker)"""
+    if confirmar is not None:
+        confirmar()
+    db.session.commit()
+
+
+def _inserir_em_lotes(tabela, linhas: Iterable[Dict], commit: bool = False,
+                      confirmar: Optional[Callable[[], None]] = None) -> int:
+    """INSERT em lotes de TAMANHO_LOTE_IMPORTACAO linhas; com commit, cada lote é confirmado"""
+    total = 0
+    lote: List[Dict] = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+            db.session.execute(insert(tabela), lote)
+            if commit:
+                _commit(confirmar)
+            total += len(lote)
+            lote = []
+    if lote:
+        db.session.execute(insert(tabela), lote)
+        total += len(lote)
+    return total
+
+
+class ImportacaoService:
+    def _remover(self, documento_id: int):
+        """Apagar a importação anterior do documento (reprocessamento)"""
+        ids = [linha.id for linha in db.session.query(Importacao.id).filter(Importacao.documento_id == documento_id)]
+        if not ids:
+            return
+        for modelo in (ExtratoLancamento, ImportacaoRegistro):
+            db.session.query(modelo).filter(modelo.importacao_id.in_(ids)).delete(synchronize_session=False)
+        db.session.query(Importacao).filter(Importacao.id.in_(ids)).delete(synchronize_session=False)
+
+    def _importar_sped(self, importacao: Importacao, mapa) -> str:
+        resumo = resumir_sped(mapa)
+        cabecalho = resumo.cabecalho
+        importacao.cnpj = cabecalho.cnpj
+        importacao.nome = cabecalho.nome[:255] if cabecalho.nome else None
+        importacao.periodo_inicio, importacao.periodo_fim = cabecalho.periodo_inicio, cabecalho.periodo_fim
+        importacao.linhas = resumo.linhas
+
+        linhas = []
+        for registro, quantidade in sorted(resumo.quantidades.items()):
+            somas = resumo.totais.get(registro)
+            if not somas:
+                linhas.append({'registro': registro, 'campo': None, 'quantidade': quantidade, 'total': None})
+                continue
+            linhas += [
+                {'registro': registro, 'campo': campo, 'quantidade': quantidade, 'total': total}
+                for campo, total in somas.items()
+            ]
+        _inserir_em_lotes(ImportacaoRegistro.__table__, [dict(linha, importacao_id=importacao.id) for linha in linhas])
+        return formatar_resumo_sped(resumo)
+
+    def _importar_ofx(self, importacao: Importacao, mapa, confirmar: Optional[Callable[[], None]] = None) -> str:
+        cabecalho = cabecalho_ofx(mapa)
+        importacao.nome = ' '.join(filter(None, (cabecalho.banco, cabecalho.conta))) or None
+        importacao.periodo_inicio, importacao.periodo_fim = cabecalho.periodo_inicio, cabecalho.periodo_fim
+        importacao_id = importacao.id
+
+        # Totais por TRNTYPE e por sinal, acumulados enquanto as transações são gravadas
+        por_tipo: Dict[Tuple[str, str], List] = {}
+
+        def lancamentos():
+            for transacao in transacoes_ofx(mapa):
+                sinal = 'CREDITO' if transacao.valor >= 0 else 'DEBITO'
+                for chave in ((transacao.tipo[:20], 'valor'), (sinal, 'valor')):
+                    soma = por_tipo.setdefault(chave, [0, Decimal('0')])
+                    soma[0] += 1
+                    soma[1] += transacao.valor
+                yield {
+                    'importacao_id': importacao_id,
+                    'data': transacao.data,
+                    'valor': transacao.valor,
+                    'tipo': transacao.tipo[:20],
+                    'fitid': transacao.fitid[:255] if transacao.fitid else None,
+                    'descricao': transacao.descricao
+                }
+
+        # Extratos podem ter centenas de milhares de transações: cada lote é confirmado
+        # para não manter a transação (e a sessão) crescendo durante a importação
+        quantidade = _inserir_em_lotes(ExtratoLancamento.__table__, lancamentos(), commit=True, confirmar=confirmar)
+        importacao = db.session.get(Importacao, importacao_id)
+        importacao.linhas = quantidade
+        _inserir_em_lotes(ImportacaoRegistro.__table__, [
+            {'importacao_id': importacao_id, 'registro': registro, 'campo': campo, 'quantidade': soma[0], 'total': soma[1]}
+            for (registro, campo), soma in sorted(por_tipo.items())
+        ])
+        creditos = por_tipo.get(('CREDITO', 'valor'), [0, Decimal('0')])[1]
+        debitos = por_tipo.get(('DEBITO', 'valor'), [0, Decimal('0')])[1]
+        return formatar_resumo_ofx(cabecalho, quantidade, creditos, debitos)
+
+    def importar(self, documento_id: int, cliente_id: Optional[int], caminho_arquivo: str,
+                 confirmar: Optional[Callable[[], None]] = None) -> Tuple[Importacao, str]:
+        """
+        Importar um SPED ou OFX numa passada pelo arquivo mapeado em memória,
+        gravando os totais por registro (e as transações do extrato) em lotes.
+        Faz seus próprios commits, cada um precedido de confirmar() (que levanta
+        exceção se o job de ingestão foi reservado por outro worker, para que a
+        remoção e os lotes de dois workers não se misturem); devolve a importação
+        e o texto de resumo.
+        """
+        tipo = tipo_importacao(caminho_arquivo)
+        self._remover(documento_id)
+        importacao = Importacao(
+            documento_id=documento_id,
+            cliente_id=cliente_id,
+            tipo=tipo,
+            status='processando',
+            tamanho_arquivo=os.path.getsize(caminho_arquivo)
+        )
+        db.session.add(importacao)
+        _commit(confirmar)
+        importacao_id = importacao.id
+
+        try:
+            with mapear(caminho_arquivo) as mapa:
+                if tipo == OFX:
+                    texto = self._importar_ofx(importacao, mapa, confirmar)
+                else:
+                    texto = self._importar_sped(importacao, mapa)
+            importacao = db.session.get(Importacao, importacao_id)
+            importacao.status = 'concluido'
+            importacao.data_conclusao = datetime.utcnow()
+            _commit(confirmar)
+        except Exception as e:
+            db.session.rollback()
+            # Sem a importação (removida por outro worker) ou sem o job, não há o que registrar
+            importacao = db.session.get(Importacao, importacao_id)
+            if importacao is not None:
+                importacao.status = 'erro'
+                importacao.erro = str(e)
+                importacao.data_conclusao = datetime.utcnow()
+                try:
+                    _commit(confirmar)
+                except Exception:
+                    db.session.rollback()
+            raise
+        return importacao, texto
+
+    def obter(self, documento_id: int) -> Optional[Importacao]:
+        return Importacao.query.filter_by(documento_id=documento_id).order_by(Importacao.id.desc()).first()
+
+    def registros(self, importacao_id: int) -> List[ImportacaoRegistro]:
+        return ImportacaoRegistro.query.filter_by(importacao_id=importacao_id).order_by(
+            ImportacaoRegistro.registro, ImportacaoRegistro.campo
+        ).all()
+
+    def lancamentos(self, importacao_id: int, cursor: Optional[str] = None,
+                    limite: int = 100) -> Tuple[List[ExtratoLancamento], Optional[str]]:
+        """
+        Transações do extrato em ordem de (data, id), paginadas por chave pelo índice
+        (importacao_id, data, id): cada página continua depois da última linha entregue,
+        sem OFFSET. Transações sem data (DTPOSTED inválido) vêm no fim, como no índice:
+        primeiro é percorrida a faixa com data e, esgotada ela, a faixa data IS NULL por
+        id, cada uma com uma condição que o índice atende diretamente.
+        Devolve (itens, proximo_cursor); levanta ValueError para cursor inválido.
+        """
+        consulta = ExtratoLancamento.query.filter_by(importacao_id=importacao_id)
+        cursor_data, cursor_id = decodificar_cursor(cursor) if cursor else (None, None)
+
+        # Uma linha a mais indica se existe próxima página
+        itens = []
+        if cursor_id is None or cursor_data is not None:
+            com_data = consulta.filter(ExtratoLancamento.data.isnot(None))
+            if cursor_id is not None:
+                com_data = com_data.filter(
+                    tuple_(ExtratoLancamento.data, ExtratoLancamento.id) > tuple_(cursor_data, cursor_id)
+                )
+            itens = com_data.order_by(ExtratoLancamento.data, ExtratoLancamento.id).limit(limite + 1).all()
+        if len(itens) <= limite:
+            sem_data = consulta.filter(ExtratoLancamento.data.is_(None))
+            if cursor_id is not None and cursor_data is None:
+                sem_data = sem_data.filter(ExtratoLancamento.id > cursor_id)
+            itens += sem_data.order_by(ExtratoLancamento.id).limit(limite + 1 - len(itens)).all()
+        proximo_cursor = None
+        if len(itens) > limite:
+            itens = itens[:limite]
+            proximo_cursor = codificar_cursor(itens[-1].data, itens[-1].id)
+        return itens, proximo_cursor
@@ -0,0 +1,41 @@
+from datetime import datetime
+from src.models.user import db
+import json
+
+class JobDocumento(db.Model):
+    __tablename__ = 'jobs_documentos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    documento_id = db.Column(db.Integer, db.ForeignKey('documentos.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), default='pendente')  # pendente, processando, concluido, erro
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    max_tentativas = db.Column(db.Integer, nullable=False, default=3)
+    disponivel_em = db.Column(db.DateTime, default=datetime.utcnow)  # adiado entre tentativas
+    worker = db.Column(db.String(100), nullable=True)  # quem reservou o job
+    lote = db.Column(db.String(32), nullable=True)  # upload em lote de onde o documento veio
+    resultado = db.Column(db.Text, nullable=True)  # JSON com os dados extraídos
+    erro = db.Column(db.Text, nullable=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_inicio = db.Column(db.DateTime, nullable=True)
+    data_conclusao = db.Column(db.DateTime, nullable=True)
+
+    # Relacionamento com documento
+    documento = db.relationship('Documento', foreign_keys=[documento_id])
+
+    def __repr__(self):
+        return f'<JobDocumento {self.id} - {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'documento_id': self.documento_id,
+            'status': self.status,
+            'tentativas': self.tentativas,
+            'max_tentativas': self.max_tentativas,
+            'lote': self.lote,
+            'resultado': json.loads(self.resultado) if self.resultado else None,
+            'erro': self.erro,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
+            'data_conclusao': self.data_conclusao.isoformat() if self.data_conclusao else None
+        }
@@ -0,0 +1,135 @@
+import os
+import uuid
+import zipfile
+from collections import Counter
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional
+from werkzeug.utils import secure_filename
+from src.models.documento import Documento
+from src.models.job_documento import JobDocumento
+from src.models.user import db
+from src.services.alteracoes_service import observar
+from src.services.eventos_service import publicar
+
+# Limites de um lote (arquivos enviados + entradas de ZIP)
+MAX_ARQUIVOS_LOTE = int(os.getenv('LOTE_MAX_ARQUIVOS', '500'))
+# Tamanho descompactado máximo de uma entrada e de um ZIP inteiro (proteção contra ZIP bomb)
+TAMANHO_MAXIMO_ENTRADA = int(os.getenv('LOTE_TAMANHO_MAXIMO_ENTRADA', str(100 * 1024 * 1024)))
+TAMANHO_MAXIMO_ZIP = int(os.getenv('LOTE_TAMANHO_MAXIMO_ZIP', str(2 * 1024 * 1024 * 1024)))
+
+STATUS_FINAIS = ('concluido', 'erro')
+
+
+class ArquivoLote(NamedTuple):
+    """Arquivo de um lote: enviado diretamente ou entrada de um ZIP"""
+    nome: str
+    origem: Optional[str]  # nome do ZIP de onde a entrada veio
+    stream: Optional[BinaryIO]
+    erro: Optional[str]
+
+
+def novo_lote() -> str:
+    return uuid.uuid4().hex
+
+
+def _entradas_zip(arquivo_zip: BinaryIO, nome_zip: str,
+                  permitido: Callable[[str], bool]) -> Iterator[ArquivoLote]:
+    """
+    Percorrer as entradas do ZIP lendo cada uma direto do arquivo enviado, sem
+    extrair o pacote para uma pasta temporária.
+    """
+    try:
+        pacote = zipfile.ZipFile(arquivo_zip)
+    except zipfile.BadZipFile:
+        yield ArquivoLote(nome_zip, None, None, 'ZIP inválido')
+        return
+
+    with pacote:
+        entradas = [info for info in pacote.infolist() if not info.is_dir()]
+        if sum(info.file_size for info in entradas) > TAMANHO_MAXIMO_ZIP:
+            yield ArquivoLote(nome_zip, None, None, 'ZIP excede o tamanho descompactado máximo')
+            return
+        for info in entradas:
+            nome = secure_filename(os.path.basename(info.filename))
+            # Metadados do macOS e arquivos ocultos
+            if not nome or info.filename.startswith('__MACOSX/') or os.path.basename(info.filename).startswith('.'):
+                continue
+            if not permitido(nome):
+                yield ArquivoLote(nome, nome_zip, None, 'Tipo de arquivo não permitido')
+                continue
+            if info.file_size > TAMANHO_MAXIMO_ENTRADA:
+                yield ArquivoLote(nome, nome_zip, None, 'Arquivo excede o tamanho máximo')
+                continue
+            with pacote.open(info) as entrada:
+                yield ArquivoLote(nome, nome_zip, entrada, None)
+
+
+def iterar_arquivos(arquivos: List, permitido: Callable[[str], bool]) -> Iterator[ArquivoLote]:
+    """
+    Arquivos de um upload em lote (FileStorage do Flask), com os ZIPs abertos
+    entrada por entrada. O stream de cada item só é válido até o próximo.
+    """
+    quantidade = 0
+    for arquivo in arquivos:
+        nome = secure_filename(arquivo.filename or '')
+        if nome.lower().endswith('.zip'):
+            itens = _entradas_zip(arquivo.stream, nome, permitido)
+        elif not nome:
+            itens = iter([ArquivoLote(arquivo.filename or '', None, None, 'Nome de arquivo inválido')])
+        elif not permitido(nome):
+            itens = iter([ArquivoLote(nome, None, None, 'Tipo de arquivo não permitido')])
+        else:
+            itens = iter([ArquivoLote(nome, None, arquivo.stream, None)])
+
+        for item in itens:
+            quantidade += 1
+            if quantidade > MAX_ARQUIVOS_LOTE and item.erro is None:
+                item = item._replace(stream=None, erro=f'Limite de {MAX_ARQUIVOS_LOTE} arquivos por lote atingido')
+            yield item
+
+
+def progresso(lote: str) -> Optional[Dict]:
+    """Situação dos jobs de um lote: contagem por status e um item por documento"""
+    linhas = db.session.query(
+        JobDocumento.id, JobDocumento.documento_id, JobDocumento.status, JobDocumento.erro, Documento.nome_arquivo
+    ).join(
+        Documento, Documento.id == JobDocumento.documento_id
+    ).filter(JobDocumento.lote == lote).order_by(JobDocumento.id).all()
+    if not linhas:
+        return None
+
+    por_status = dict(Counter(linha.status for linha in linhas))
+    finalizados = sum(por_status.get(status, 0) for status in STATUS_FINAIS)
+    return {
+        'lote': lote,
+        'total': len(linhas),
+        'finalizados': finalizados,
+        'percentual': round(100 * finalizados / len(linhas), 1),
+        'por_status': por_status,
+        'jobs': [
+            {
+                'job_id': job_id,
+                'documento_id': documento_id,
+                'nome_arquivo': nome_arquivo,
+                'status': status,
+                'erro': erro
+            }
+            for job_id, documento_id, status, erro, nome_arquivo in linhas
+        ]
+    }
+
+
+@observar(JobDocumento, ('id', 'documento_id', 'lote', 'status'))
+def _observar_jobs_lote(conexao, alteracoes):
+    """Avisar pelo canal de eventos quando um documento de um lote termina"""
+    for antes, depois in alteracoes:
+        if depois is None or not depois['lote'] or depois['status'] not in STATUS_FINAIS:
+            continue
+        if antes is not None and antes['status'] == depois['status']:
+            continue
+        publicar(conexao, {
+            'tipo': 'lote_documentos',
+            'lote': depois['lote'],
+            'job_id': depois['id'],
+            'documento_id': depois['documento_id'],
+            'status': depois['status']
+        })
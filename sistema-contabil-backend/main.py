@@ -12,6 +12,20 @@ from src.models.obrigacao import Obrigacao
 from src.models.documento import Documento
 from src.models.mensalidade import Mensalidade
 from src.models.notificacao import Notificacao
+from src.models.resumo_contador import ResumoContador
+from src.models.geracao_tabela import GeracaoTabela
+from src.models.carga_inicial import CargaInicial
+from src.models.rollup_diario import RollupDiario
+from src.models.cobertura_documento import CoberturaDocumento
+from src.models.feriado import Feriado
+from src.models.job_documento import JobDocumento
+from src.models.arquivo import Arquivo
+from src.models.upload_sessao import UploadSessao
+from src.models.documento_campo import DocumentoCampo
+from src.models.documento_conteudo import DocumentoConteudo
+from src.models.importacao import Importacao
+from src.models.importacao_registro import ImportacaoRegistro
+from src.models.extrato_lancamento import ExtratoLancamento
 from src.routes.user import user_bp
 from src.routes.cliente import cliente_bp
 from src.routes.obrigacao import obrigacao_bp
@@ -19,12 +33,19 @@ from src.routes.documento import documento_bp
 from src.routes.dashboard import dashboard_bp
 from src.routes.ia import ia_bp
 from src.routes.automacao import automacao_bp
+from src.routes.eventos import eventos_bp
+from src.routes.batch import batch_bp
+from src.services.monitoramento_service import instalar_contador_consultas
+from src.services.documento_service import iniciar_ingestao
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
 # Configura\u00e7\u00e3o CORS
-CORS(app, origins="*")
+CORS(app, origins="*", expose_headers=['X-Query-Count'])
+
+# N\u00famero de consultas SQL por requisi\u00e7\u00e3o no cabe\u00e7alho X-Query-Count
+instalar_contador_consultas(app)
 
 # Registro dos blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
@@ -34,12 +55,19 @@ app.register_blueprint(documento_bp, url_prefix='/api')
 app.register_blueprint(dashboard_bp, url_prefix='/api')
 app.register_blueprint(ia_bp, url_prefix='/api')
 app.register_blueprint(automacao_bp, url_prefix='/api')
+app.register_blueprint(eventos_bp, url_prefix='/api')
+app.register_blueprint(batch_bp, url_prefix='/api')
 
 # Configura\u00e7\u00e3o do banco de dados usando vari\u00e1vel de ambiente
 # O Flask vai ler o valor de DATABASE_URL do docker-compose.yml
 database_url = os.environ.get('DATABASE_URL')
 if database_url:
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    # Tamanho do pool de conexões por processo (o gunicorn.conf.py o iguala ao número de threads)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': int(os.getenv('DB_POOL_TAMANHO', '5')),
+        'max_overflow': int(os.getenv('DB_POOL_EXTRA', '10'))
+    }
 else:
     # Fallback para SQLite em desenvolvimento local
     app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
@@ -49,6 +77,9 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
+# Threads que processam a fila de documentos (OCR, extra\u00e7\u00e3o e categoriza\u00e7\u00e3o)
+iniciar_ingestao(app)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -0,0 +1,19 @@
+from typing import Callable, Hashable
+from flask import g, has_app_context
+
+
+def ativar_memo():
+    """Ativar o memo de consultas para o restante da requisição atual (usado pelo /batch)"""
+    g.memo_consultas = {}
+
+
+def memorizar(chave: Hashable, funcao: Callable):
+    """
+    Executar `funcao` uma única vez por requisição com memo ativo e reaproveitar o resultado.
+    Fora de uma requisição com memo ativo a função é sempre executada.
+    """
+    if not has_app_context() or 'memo_consultas' not in g:
+        return funcao()
+    if chave not in g.memo_consultas:
+        g.memo_consultas[chave] = funcao()
+    return g.memo_consultas[chave]
@@ -0,0 +1,164 @@
+import os
+import threading
+from typing import Dict, Optional
+from PIL import Image, ImageOps, features
+import pypdfium2 as pdfium
+from src.services.cache_disco_service import CacheDisco
+from src.services.pdf_service import lock_pdfium
+
+# Miniaturas das páginas dos documentos (imagens e PDFs) para a tela de revisão,
+# geradas na primeira requisição e guardadas em disco. Não acessa o banco.
+
+PASTA_CACHE_MINIATURAS = os.getenv('MINIATURAS_CACHE_DIR', os.path.join(os.getcwd(), 'uploads', 'cache_miniaturas'))
+TAMANHO_MAXIMO_CACHE_MINIATURAS = int(os.getenv('MINIATURAS_CACHE_TAMANHO_MB', '256')) * 1024 * 1024
+
+# Larguras geradas; a pedida é arredondada para cima, para o cache não ter uma entrada por pixel
+LARGURAS_MINIATURA = (160, 320, 640, 1280)
+LARGURA_PADRAO = 320
+# Altura máxima em relação à largura (páginas muito compridas, como extratos e cupons)
+PROPORCAO_MAXIMA = 3
+
+QUALIDADE_MINIATURA = int(os.getenv('MINIATURAS_QUALIDADE', '80'))
+FORMATOS_MINIATURA = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+WEBP_DISPONIVEL = features.check('webp')
+
+# Muda quando a forma de gerar as miniaturas muda, para não servir entradas antigas
+VERSAO_MINIATURA = 1
+
+# Tempo máximo que uma requisição espera a miniatura sendo gerada por outra (segundos)
+TEMPO_ESPERA_GERACAO = 60
+
+
+class ErroMiniatura(ValueError):
+    """Página ou arquivo sem miniatura, com o status HTTP correspondente"""
+
+    def __init__(self, mensagem: str, status: int = 400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def largura_miniatura(largura: Optional[int]) -> int:
+    """Menor largura gerada que atende à pedida"""
+    if not largura:
+        return LARGURA_PADRAO
+    return next((opcao for opcao in LARGURAS_MINIATURA if opcao >= largura), LARGURAS_MINIATURA[-1])
+
+
+def formato_miniatura(formato: Optional[str], aceita_webp: bool) -> str:
+    """Formato pedido, ou WebP quando o cliente aceita e o Pillow tem suporte"""
+    if formato:
+        formato = 'jpeg' if formato.lower() == 'jpg' else formato.lower()
+        if formato not in FORMATOS_MINIATURA or (formato == 'webp' and not WEBP_DISPONIVEL):
+            raise ErroMiniatura('Formato de miniatura não suportado')
+        return formato
+    return 'webp' if aceita_webp and WEBP_DISPONIVEL else 'jpeg'
+
+
+def renderizar_pagina(caminho_arquivo: str, tipo_documento: str, pagina: int, largura: int) -> Image.Image:
+    """Página (a partir de 0) reduzida para a largura dada"""
+    limite = (largura, largura * PROPORCAO_MAXIMA)
+    if tipo_documento == 'PDF':
+        with lock_pdfium:
+            pdf = pdfium.PdfDocument(caminho_arquivo)
+            try:
+                if not 0 <= pagina < len(pdf):
+                    raise ErroMiniatura('Página inexistente', 404)
+                pagina_pdf = pdf[pagina]
+                # Rasteriza já na escala da miniatura, sem passar pela página inteira em alta resolução
+                largura_pagina, altura_pagina = pagina_pdf.get_size()
+                escala = min(limite[0] / largura_pagina, limite[1] / altura_pagina)
+                imagem = pagina_pdf.render(scale=escala).to_pil()
+                pagina_pdf.close()
+            finally:
+                pdf.close()
+        return imagem
+
+    if tipo_documento != 'IMAGEM':
+        raise ErroMiniatura('Documento sem pré-visualização', 415)
+    with Image.open(caminho_arquivo) as imagem:
+        if not 0 <= pagina < getattr(imagem, 'n_frames', 1):
+            raise ErroMiniatura('Página inexistente', 404)
+        imagem.seek(pagina)
+        # JPEG: o decodificador já entrega a imagem reduzida (1/2, 1/4, 1/8)
+        imagem.draft('RGB', limite)
+        miniatura = ImageOps.exif_transpose(imagem)
+    miniatura.thumbnail(limite, Image.LANCZOS)
+    if miniatura.mode not in ('RGB', 'L'):
+        miniatura = miniatura.convert('RGB')
+    return miniatura
+
+
+class _Geracao:
+    """Miniatura sendo gerada por uma requisição; as demais esperam o resultado"""
+
+    def __init__(self):
+        self.pronta = threading.Event()
+        self.erro: Optional[Exception] = None
+
+
+class CacheMiniaturas(CacheDisco):
+    """
+    Miniaturas em disco, por (sha256 do arquivo, página, largura, formato), em
+    <pasta>/ab/<sha256>/<pagina>-<largura>-v<versao>.<formato>. Como o conteúdo do
+    arquivo define a entrada, ela nunca muda. A data de modificação marca o último
+    uso e as menos usadas são apagadas quando o tamanho passa do limite.
+
+    Requisições simultâneas pela mesma miniatura no processo geram a imagem uma
+    vez só; entre processos a gravação é atômica (arquivo temporário + rename).
+    """
+
+    def __init__(self, pasta: str = PASTA_CACHE_MINIATURAS, tamanho_maximo: int = TAMANHO_MAXIMO_CACHE_MINIATURAS):
+        super().__init__(pasta, tamanho_maximo)
+        self._em_andamento: Dict[str, _Geracao] = {}
+
+    def caminho(self, sha256: str, pagina: int, largura: int, formato: str) -> str:
+        return os.path.join(self._pasta_arquivo(sha256), f'{pagina}-{largura}-v{VERSAO_MINIATURA}.{formato}')
+
+    def _usar(self, caminho: str) -> bool:
+        try:
+            os.utime(caminho)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def obter(self, caminho_arquivo: str, tipo_documento: str, sha256: str,
+              pagina: int, largura: int, formato: str) -> str:
+        """Caminho da miniatura, gerada agora se ainda não estiver no cache"""
+        destino = self.caminho(sha256, pagina, largura, formato)
+        if self._usar(destino):
+            return destino
+
+        with self._lock:
+            geracao = self._em_andamento.get(destino)
+            gerar = geracao is None
+            if gerar:
+                geracao = self._em_andamento[destino] = _Geracao()
+
+        if not gerar:
+            if not geracao.pronta.wait(TEMPO_ESPERA_GERACAO):
+                raise ErroMiniatura('Tempo esgotado gerando a miniatura', 503)
+            if geracao.erro is not None:
+                raise geracao.erro
+            return destino
+
+        try:
+            # Outra requisição pode ter terminado entre a primeira verificação e o lock
+            if not self._usar(destino):
+                imagem = renderizar_pagina(caminho_arquivo, tipo_documento, pagina, largura)
+                self._gravar_imagem(destino, imagem, formato)
+        except Exception as e:
+            geracao.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[destino]
+            geracao.pronta.set()
+        return destino
+
+    def _gravar_imagem(self, destino: str, imagem: Image.Image, formato: str):
+        self._gravar(destino, lambda temporario: imagem.save(
+            temporario, format=formato.upper(), quality=QUALIDADE_MINIATURA, optimize=True
+        ))
+
+
+cache_miniaturas = CacheMiniaturas()
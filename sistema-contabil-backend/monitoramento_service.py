@@ -0,0 +1,22 @@
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _contar_consulta(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.total_consultas = g.get('total_consultas', 0) + 1
+
+
+def total_consultas() -> int:
+    """Número de comandos SQL executados na requisição atual"""
+    return g.get('total_consultas', 0) if has_request_context() else 0
+
+
+def instalar_contador_consultas(app):
+    """Expor o número de consultas de cada requisição no cabeçalho X-Query-Count"""
+    @app.after_request
+    def _adicionar_cabecalho(resposta):
+        resposta.headers['X-Query-Count'] = str(total_consultas())
+        return resposta
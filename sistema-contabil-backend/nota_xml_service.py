@@ -0,0 +1,236 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Union
+from src.services.extracao_service import chave_nfe_valida
+
+try:
+    # Opcional: protege contra entidades maliciosas (billion laughs) em XML enviado por clientes
+    from defusedxml.ElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+
+# Leitura em streaming de XML de NF-e/NFC-e (modelo 55/65, layout 4.00) e NFS-e
+# (ABRASF e padrão nacional): só a nota sendo lida fica em memória, então arquivos
+# de lote com milhares de notas são lidos com memória constante. Não acessa o banco.
+
+# Elemento raiz de cada nota, pelo nome local (sem namespace)
+RAIZES_NOTA = ('infNFe', 'InfNfse', 'infNFSe')
+
+# Impostos lidos do total da NF-e (ICMSTot) e das NFS-e
+IMPOSTOS_NFE = {
+    'vICMS': 'icms', 'vST': 'icms_st', 'vIPI': 'ipi', 'vPIS': 'pis', 'vCOFINS': 'cofins', 'vFCP': 'fcp'
+}
+IMPOSTOS_NFSE = {
+    'ValorIss': 'iss', 'ValorPis': 'pis', 'ValorCofins': 'cofins', 'ValorInss': 'inss',
+    'ValorIr': 'irrf', 'ValorCsll': 'csll', 'vISSQN': 'iss'
+}
+
+
+class NotaFiscalXML(NamedTuple):
+    modelo: str  # NFE, NFCE ou NFSE
+    chave: Optional[str]  # chave de acesso (NF-e) ou código de verificação/identificador (NFS-e)
+    chave_valida: bool
+    numero: Optional[str]
+    data_emissao: Optional[date]
+    emitente_cnpj: Optional[str]
+    emitente_nome: Optional[str]
+    destinatario_documento: Optional[str]  # CNPJ ou CPF
+    valor_total: Optional[Decimal]
+    impostos: Dict[str, Decimal]
+
+    def to_dict(self) -> Dict:
+        return {
+            'modelo': self.modelo,
+            'chave': self.chave,
+            'chave_valida': self.chave_valida,
+            'numero': self.numero,
+            'data_emissao': self.data_emissao.isoformat() if self.data_emissao else None,
+            'emitente_cnpj': self.emitente_cnpj,
+            'emitente_nome': self.emitente_nome,
+            'destinatario_documento': self.destinatario_documento,
+            'valor_total': str(self.valor_total) if self.valor_total is not None else None,
+            'impostos': {nome: str(valor) for nome, valor in self.impostos.items()}
+        }
+
+    def texto(self) -> str:
+        """Resumo legível da nota (texto do documento para busca e para a IA)"""
+        linhas = [
+            f'{self.modelo} {self.numero or ""} chave {self.chave or "-"}',
+            f'Emitente: {self.emitente_nome or ""} CNPJ {self.emitente_cnpj or "-"}',
+            f'Destinatário/tomador: {self.destinatario_documento or "-"}',
+            f'Emissão: {self.data_emissao.strftime("%d/%m/%Y") if self.data_emissao else "-"}',
+            f'Valor total: R$ {_formatar_reais(self.valor_total)}'
+        ]
+        linhas += [f'{nome.upper()}: R$ {_formatar_reais(valor)}' for nome, valor in self.impostos.items()]
+        return '\n'.join(linhas)
+
+
+def _formatar_reais(valor: Optional[Decimal]) -> str:
+    if valor is None:
+        return '-'
+    return f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _filho(elemento, *caminho: str):
+    """Descer pelos filhos diretos com os nomes locais dados"""
+    for nome in caminho:
+        if elemento is None:
+            return None
+        elemento = next((filho for filho in elemento if _local(filho.tag) == nome), None)
+    return elemento
+
+
+def _descendente(elemento, *nomes: str):
+    """Primeiro descendente com um dos nomes locais dados"""
+    if elemento is None:
+        return None
+    return next((item for item in elemento.iter() if _local(item.tag) in nomes), None)
+
+
+def _texto(elemento) -> Optional[str]:
+    if elemento is None or elemento.text is None:
+        return None
+    return elemento.text.strip() or None
+
+
+def _decimal(elemento) -> Optional[Decimal]:
+    texto = _texto(elemento)
+    if texto is None:
+        return None
+    try:
+        return Decimal(texto)
+    except InvalidOperation:
+        return None
+
+
+def _data(elemento) -> Optional[date]:
+    texto = _texto(elemento)
+    try:
+        return date.fromisoformat(texto[:10]) if texto else None
+    except ValueError:
+        return None
+
+
+def _impostos(elemento, nomes: Dict[str, str]) -> Dict[str, Decimal]:
+    impostos = {}
+    if elemento is None:
+        return impostos
+    for item in elemento.iter():
+        nome = nomes.get(_local(item.tag))
+        if nome and nome not in impostos:
+            valor = _decimal(item)
+            if valor:
+                impostos[nome] = valor
+    return impostos
+
+
+def _nfe(inf) -> NotaFiscalXML:
+    chave = (inf.get('Id') or '')[3:] or None
+    ide = _filho(inf, 'ide')
+    emit = _filho(inf, 'emit')
+    dest = _filho(inf, 'dest')
+    total = _filho(inf, 'total', 'ICMSTot')
+    return NotaFiscalXML(
+        modelo='NFCE' if _texto(_filho(ide, 'mod')) == '65' else 'NFE',
+        chave=chave,
+        chave_valida=bool(chave) and chave_nfe_valida(chave),
+        numero=_texto(_filho(ide, 'nNF')),
+        data_emissao=_data(_filho(ide, 'dhEmi')) or _data(_filho(ide, 'dEmi')),
+        emitente_cnpj=_texto(_filho(emit, 'CNPJ')) or _texto(_filho(emit, 'CPF')),
+        emitente_nome=_texto(_filho(emit, 'xNome')),
+        destinatario_documento=_texto(_filho(dest, 'CNPJ')) or _texto(_filho(dest, 'CPF')),
+        valor_total=_decimal(_filho(total, 'vNF')),
+        impostos=_impostos(total, IMPOSTOS_NFE)
+    )
+
+
+def _nfse_abrasf(inf) -> NotaFiscalXML:
+    prestador = _descendente(inf, 'PrestadorServico', 'Prestador')
+    tomador = _descendente(inf, 'TomadorServico', 'Tomador')
+    valores = _descendente(inf, 'Valores')
+    valor = _decimal(_descendente(valores, 'ValorServicos')) or _decimal(_descendente(inf, 'ValorLiquidoNfse'))
+    return NotaFiscalXML(
+        modelo='NFSE',
+        chave=_texto(_filho(inf, 'CodigoVerificacao')),
+        chave_valida=False,
+        numero=_texto(_filho(inf, 'Numero')),
+        data_emissao=_data(_filho(inf, 'DataEmissao')) or _data(_descendente(inf, 'DataEmissao')),
+        emitente_cnpj=_texto(_descendente(prestador, 'Cnpj')),
+        emitente_nome=_texto(_descendente(prestador, 'RazaoSocial')),
+        destinatario_documento=_texto(_descendente(tomador, 'Cnpj', 'Cpf')),
+        valor_total=valor,
+        impostos=_impostos(inf, IMPOSTOS_NFSE)
+    )
+
+
+def _nfse_nacional(inf) -> NotaFiscalXML:
+    emit = _filho(inf, 'emit')
+    toma = _descendente(inf, 'toma')
+    return NotaFiscalXML(
+        modelo='NFSE',
+        chave=(inf.get('Id') or '')[3:] or None,
+        chave_valida=False,
+        numero=_texto(_filho(inf, 'nNFSe')),
+        data_emissao=_data(_descendente(inf, 'dhEmi')) or _data(_filho(inf, 'dhProc')),
+        emitente_cnpj=_texto(_filho(emit, 'CNPJ')) or _texto(_filho(emit, 'CPF')),
+        emitente_nome=_texto(_filho(emit, 'xNome')),
+        destinatario_documento=_texto(_filho(toma, 'CNPJ')) or _texto(_filho(toma, 'CPF')),
+        valor_total=_decimal(_descendente(inf, 'vServ')) or _decimal(_descendente(inf, 'vLiq')),
+        impostos=_impostos(inf, IMPOSTOS_NFSE)
+    )
+
+
+LEITORES = {'infNFe': _nfe, 'InfNfse': _nfse_abrasf, 'infNFSe': _nfse_nacional}
+
+
+def ler_notas(origem: Union[str, BinaryIO]) -> Iterator[NotaFiscalXML]:
+    """
+    Percorrer as notas de um XML (caminho ou arquivo aberto) à medida que são lidas.
+    Cada elemento é descartado assim que termina (itens da NF-e, assinatura,
+    protocolo e a própria nota depois de convertida), então a memória usada não
+    cresce com o tamanho do arquivo.
+    """
+    pilha = []
+    nota = None
+    for evento, elemento in iterparse(origem, events=('start', 'end')):
+        if evento == 'start':
+            if nota is None and _local(elemento.tag) in RAIZES_NOTA:
+                nota = elemento
+            pilha.append(elemento)
+            continue
+
+        pilha.pop()
+        if elemento is nota:
+            yield LEITORES[_local(elemento.tag)](elemento)
+            nota = None
+        elif nota is not None and _local(elemento.tag) != 'det':
+            # Dentro da nota, só os itens (det) são descartados antes do fim
+            continue
+
+        elemento.clear()
+        pai = pilha[-1] if pilha else None
+        if pai is not None and len(pai) and pai[-1] is elemento:
+            del pai[-1]
+
+
+class TotaisNotas:
+    """Totais de notas (valor e impostos) acumulados à medida que as notas são lidas"""
+
+    def __init__(self):
+        self.quantidade = 0
+        self.valor_total = Decimal('0')
+        self.impostos: Dict[str, Decimal] = {}
+
+    def adicionar(self, nota: NotaFiscalXML):
+        self.quantidade += 1
+        self.valor_total += nota.valor_total or Decimal('0')
+        for nome, valor in nota.impostos.items():
+            self.impostos[nome] = self.impostos.get(nome, Decimal('0')) + valor
+
+    def resumo(self) -> Dict:
+        return {'quantidade': self.quantidade, 'valor_total': self.valor_total, 'impostos': self.impostos}
+
@@ -1,13 +1,36 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from src.models.obrigacao import Obrigacao
 from src.models.cliente import Cliente
 from src.models.user import db
-from datetime import datetime, date
-from sqlalchemy import and_, or_
+from src.services.resumo_service import ResumoService
+from src.services.obrigacao_lote_service import MAX_LOTE, ErroLinha, ObrigacaoLoteService
+from src.services.calendario_fiscal_service import CalendarioFiscalService
+from src.services.cache_service import em_cache
+from src.services.projecao_service import (
+    codificar_cursor, consulta_com_cliente, decodificar_cursor, gerar_ndjson, serializar_linha
+)
+from datetime import datetime, date, timedelta
+from sqlalchemy import and_, or_, tuple_
 
 obrigacao_bp = Blueprint('obrigacao', __name__)
+resumo_service = ResumoService()
+lote_service = ObrigacaoLoteService()
+calendario_service = CalendarioFiscalService()
+
+# Paginação por chave (data_vencimento, id)
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+def _formato_lista():
+    """Formato negociado da listagem: ?formato=ndjson ou Accept: application/x-ndjson"""
+    if request.args.get('formato') == 'ndjson':
+        return 'ndjson'
+    if request.accept_mimetypes.best == 'application/x-ndjson':
+        return 'ndjson'
+    return 'json'
 
 @obrigacao_bp.route('/obrigacoes', methods=['GET'])
+@em_cache('clientes', 'obrigacoes', formato=_formato_lista)
 def get_obrigacoes():
     """Listar obrigações com filtros opcionais"""
     try:
@@ -17,7 +40,8 @@ def get_obrigacoes():
         data_inicio = request.args.get('data_inicio')
         data_fim = request.args.get('data_fim')
         
-        query = Obrigacao.query
+        # Colunas da obrigação + nome do cliente em um único SELECT
+        query = consulta_com_cliente(Obrigacao)
         
         if cliente_id:
             query = query.filter(Obrigacao.cliente_id == cliente_id)
@@ -30,15 +54,45 @@ def get_obrigacoes():
         if data_fim:
             query = query.filter(Obrigacao.data_vencimento <= datetime.strptime(data_fim, '%Y-%m-%d').date())
         
-        obrigacoes = query.order_by(Obrigacao.data_vencimento.asc()).all()
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_vencimento, cursor_id = decodificar_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'erro': str(e)}), 400
+            query = query.filter(
+                tuple_(Obrigacao.data_vencimento, Obrigacao.id) > tuple_(cursor_vencimento, cursor_id)
+            )
         
-        resultado = []
-        for obrigacao in obrigacoes:
-            obrigacao_dict = obrigacao.to_dict()
-            obrigacao_dict['cliente_nome'] = obrigacao.cliente.nome
-            resultado.append(obrigacao_dict)
+        # Ordem total e estável: o id desempata vencimentos iguais
+        query = query.order_by(Obrigacao.data_vencimento.asc(), Obrigacao.id.asc())
         
-        return jsonify(resultado)
+        if _formato_lista() == 'ndjson':
+            resposta = Response(stream_with_context(gerar_ndjson(query)), mimetype='application/x-ndjson')
+            resposta.headers['X-Accel-Buffering'] = 'no'
+            return resposta
+        
+        if 'limite' not in request.args and not cursor:
+            # Sem paginação: lista completa, como antes
+            return jsonify([serializar_linha(linha) for linha in query.all()])
+        
+        limite = request.args.get('limite', LIMITE_PADRAO, type=int)
+        if limite is None or limite < 1:
+            return jsonify({'erro': 'Parâmetro limite inválido'}), 400
+        limite = min(limite, LIMITE_MAXIMO)
+        
+        # Uma linha a mais indica se existe próxima página
+        linhas = query.limit(limite + 1).all()
+        proximo_cursor = None
+        if len(linhas) > limite:
+            linhas = linhas[:limite]
+            ultima = linhas[-1]
+            proximo_cursor = codificar_cursor(ultima.data_vencimento, ultima.id)
+        
+        return jsonify({
+            'obrigacoes': [serializar_linha(linha) for linha in linhas],
+            'proximo_cursor': proximo_cursor
+        })
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -79,14 +133,88 @@ def create_obrigacao():
         db.session.rollback()
         return jsonify({'erro': str(e)}), 500
 
+@obrigacao_bp.route('/obrigacoes/bulk', methods=['POST'])
+def bulk_obrigacoes():
+    """
+    Criar, atualizar (upsert) ou mudar o status de várias obrigações em uma transação.
+    Linhas inválidas são relatadas em 'erros' (pelo índice) sem abortar as demais.
+    """
+    try:
+        data = request.json or {}
+        operacao = data.get('operacao', 'criar')
+        
+        if operacao in ('criar', 'upsert'):
+            itens = data.get('obrigacoes')
+            if not isinstance(itens, list) or not itens:
+                return jsonify({'erro': 'Lista de obrigações é obrigatória'}), 400
+            if len(itens) > MAX_LOTE:
+                return jsonify({'erro': f'Máximo de {MAX_LOTE} obrigações por lote'}), 400
+            if operacao == 'criar':
+                return jsonify(lote_service.criar(itens)), 201
+            return jsonify(lote_service.upsert(itens))
+        
+        if operacao == 'status':
+            ids = data.get('ids')
+            if not isinstance(ids, list) or not ids or not data.get('status'):
+                return jsonify({'erro': 'Campos obrigatórios: ids, status'}), 400
+            if len(ids) > MAX_LOTE:
+                return jsonify({'erro': f'Máximo de {MAX_LOTE} obrigações por lote'}), 400
+            return jsonify(lote_service.alterar_status(ids, data['status'], data.get('data_pagamento')))
+        
+        return jsonify({'erro': 'Operação inválida. Use criar, upsert ou status'}), 400
+    except ErroLinha as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@obrigacao_bp.route('/obrigacoes/calendario', methods=['GET'])
+def get_calendario_fiscal():
+    """Prévia das obrigações de uma competência para um regime tributário"""
+    try:
+        regime = request.args.get('regime_tributario')
+        mes_referencia = request.args.get('mes_referencia', date.today().strftime('%Y-%m'))
+        if not regime:
+            return jsonify({'erro': 'Parâmetro regime_tributario é obrigatório'}), 400
+        
+        obrigacoes = calendario_service.obrigacoes_do_mes(regime, mes_referencia)
+        for obrigacao in obrigacoes:
+            obrigacao['data_vencimento'] = obrigacao['data_vencimento'].isoformat()
+        
+        return jsonify({
+            'regime_tributario': regime,
+            'mes_referencia': mes_referencia,
+            'obrigacoes': obrigacoes
+        })
+    except ValueError:
+        return jsonify({'erro': 'Mês de referência inválido. Use YYYY-MM'}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@obrigacao_bp.route('/obrigacoes/gerar-mes', methods=['POST'])
+def gerar_obrigacoes_mes():
+    """Gerar pelo calendário fiscal as obrigações da competência para os clientes ativos"""
+    try:
+        data = request.json or {}
+        mes_referencia = data.get('mes_referencia', date.today().strftime('%Y-%m'))
+        cliente_ids = data.get('cliente_ids')
+        if cliente_ids is not None and not isinstance(cliente_ids, list):
+            return jsonify({'erro': 'cliente_ids deve ser uma lista'}), 400
+        
+        return jsonify(calendario_service.gerar_mes(mes_referencia, cliente_ids)), 201
+    except ValueError:
+        return jsonify({'erro': 'Mês de referência inválido. Use YYYY-MM'}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
 @obrigacao_bp.route('/obrigacoes/<int:obrigacao_id>', methods=['GET'])
+@em_cache('clientes', 'obrigacoes')
 def get_obrigacao(obrigacao_id):
     """Obter obrigação por ID"""
     try:
-        obrigacao = Obrigacao.query.get_or_404(obrigacao_id)
-        obrigacao_dict = obrigacao.to_dict()
-        obrigacao_dict['cliente_nome'] = obrigacao.cliente.nome
-        return jsonify(obrigacao_dict)
+        linha = consulta_com_cliente(Obrigacao).filter(Obrigacao.id == obrigacao_id).first()
+        if linha is None:
+            return jsonify({'erro': 'Obrigação não encontrada'}), 404
+        return jsonify(serializar_linha(linha))
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -138,13 +266,15 @@ def delete_obrigacao(obrigacao_id):
         return jsonify({'erro': str(e)}), 500
 
 @obrigacao_bp.route('/obrigacoes/vencimentos', methods=['GET'])
+@em_cache('clientes', 'obrigacoes')
 def get_vencimentos_proximos():
     """Obter obrigações com vencimento próximo"""
     try:
         dias = int(request.args.get('dias', 7))  # próximos 7 dias por padrão
-        data_limite = date.today() + datetime.timedelta(days=dias)
+        hoje = date.today()
+        data_limite = hoje + timedelta(days=dias)
         
-        obrigacoes = Obrigacao.query.filter(
+        linhas = consulta_com_cliente(Obrigacao).filter(
             and_(
                 Obrigacao.data_vencimento <= data_limite,
                 Obrigacao.status == 'pendente'
@@ -152,10 +282,9 @@ def get_vencimentos_proximos():
         ).order_by(Obrigacao.data_vencimento.asc()).all()
         
         resultado = []
-        for obrigacao in obrigacoes:
-            obrigacao_dict = obrigacao.to_dict()
-            obrigacao_dict['cliente_nome'] = obrigacao.cliente.nome
-            obrigacao_dict['dias_restantes'] = (obrigacao.data_vencimento - date.today()).days
+        for linha in linhas:
+            obrigacao_dict = serializar_linha(linha)
+            obrigacao_dict['dias_restantes'] = (linha.data_vencimento - hoje).days
             resultado.append(obrigacao_dict)
         
         return jsonify(resultado)
@@ -163,44 +292,17 @@ def get_vencimentos_proximos():
         return jsonify({'erro': str(e)}), 500
 
 @obrigacao_bp.route('/obrigacoes/dashboard', methods=['GET'])
+@em_cache('obrigacoes')
 def get_dashboard_obrigacoes():
     """Obter estatísticas de obrigações para o dashboard"""
     try:
-        hoje = date.today()
-        
-        # Obrigações pendentes
-        pendentes = Obrigacao.query.filter_by(status='pendente').count()
-        
-        # Obrigações vencidas
-        vencidas = Obrigacao.query.filter(
-            and_(
-                Obrigacao.status == 'pendente',
-                Obrigacao.data_vencimento < hoje
-            )
-        ).count()
-        
-        # Obrigações vencendo hoje
-        vencendo_hoje = Obrigacao.query.filter(
-            and_(
-                Obrigacao.status == 'pendente',
-                Obrigacao.data_vencimento == hoje
-            )
-        ).count()
-        
-        # Obrigações dos próximos 7 dias
-        proximos_7_dias = Obrigacao.query.filter(
-            and_(
-                Obrigacao.status == 'pendente',
-                Obrigacao.data_vencimento > hoje,
-                Obrigacao.data_vencimento <= hoje + datetime.timedelta(days=7)
-            )
-        ).count()
+        contadores = resumo_service.obter_contadores()
         
         return jsonify({
-            'pendentes': pendentes,
-            'vencidas': vencidas,
-            'vencendo_hoje': vencendo_hoje,
-            'proximos_7_dias': proximos_7_dias
+            'pendentes': contadores['obrigacoes_pendentes'],
+            'vencidas': contadores['obrigacoes_vencidas'],
+            'vencendo_hoje': contadores['obrigacoes_vencendo_hoje'],
+            'proximos_7_dias': contadores['obrigacoes_proximos_7_dias']
         })
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,346 @@
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, insert, select, tuple_, update
+from src.models.obrigacao import Obrigacao
+from src.models.cliente import Cliente
+from src.models.user import db
+from src.services.alteracoes_service import insert_com_conflito, notificar_alteracoes
+
+# Número máximo de linhas por chamada do /obrigacoes/bulk
+MAX_LOTE = 5000
+
+CAMPOS_OBRIGATORIOS = ('cliente_id', 'tipo', 'descricao', 'data_vencimento', 'mes_referencia')
+CAMPOS_OPCIONAIS = ('valor', 'status', 'codigo_receita', 'observacoes', 'data_pagamento')
+
+# Chave natural usada no upsert quando o item não informa o id
+CHAVE_NATURAL = ('cliente_id', 'tipo', 'mes_referencia')
+
+# Índice único de obrigacoes usado para ignorar obrigações já geradas
+CHAVE_VENCIMENTO = ('cliente_id', 'tipo', 'data_vencimento')
+
+# Valores aceitos em status e tamanho máximo dos campos texto (colunas de obrigacoes);
+# uma linha fora disso faria o INSERT do lote inteiro falhar
+STATUS_OBRIGACAO = ('pendente', 'pago')
+TAMANHOS_TEXTO = {'tipo': 50, 'descricao': 200, 'mes_referencia': 7, 'status': 20, 'codigo_receita': 10, 'observacoes': None}
+
+# DECIMAL(10, 2)
+VALOR_MAXIMO = Decimal('100000000')
+
+
+class ErroLinha(ValueError):
+    """Erro de validação de uma linha do lote; as demais linhas continuam"""
+
+
+def _data(valor, campo: str) -> Optional[date]:
+    if valor in (None, ''):
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ErroLinha(f'Formato de data inválido em {campo}. Use YYYY-MM-DD')
+
+
+def _valor(valor) -> Optional[Decimal]:
+    if valor in (None, ''):
+        return None
+    try:
+        numero = Decimal(str(valor))
+    except InvalidOperation:
+        raise ErroLinha('Valor inválido')
+    if not numero.is_finite() or abs(numero) >= VALOR_MAXIMO:
+        raise ErroLinha('Valor fora do limite')
+    return numero
+
+
+def _texto(valor, campo: str) -> Optional[str]:
+    if valor is None:
+        return None
+    if not isinstance(valor, str):
+        raise ErroLinha(f'{campo} deve ser texto')
+    tamanho = TAMANHOS_TEXTO[campo]
+    if tamanho is not None and len(valor) > tamanho:
+        raise ErroLinha(f'{campo} excede {tamanho} caracteres')
+    return valor
+
+
+def _inteiro(valor, campo: str) -> int:
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ErroLinha(f'{campo} inválido')
+
+
+def _converter(item: Dict, parcial: bool = False) -> Dict:
+    """Validar um item do lote e converter para os tipos das colunas"""
+    if not isinstance(item, dict):
+        raise ErroLinha('Item deve ser um objeto')
+
+    if not parcial:
+        faltando = [campo for campo in CAMPOS_OBRIGATORIOS if not item.get(campo)]
+        if faltando:
+            raise ErroLinha(f"Campos obrigatórios: {', '.join(faltando)}")
+
+    valores = {}
+    for campo in CAMPOS_OBRIGATORIOS + CAMPOS_OPCIONAIS:
+        if campo not in item:
+            continue
+        if campo == 'cliente_id':
+            valores[campo] = _inteiro(item[campo], campo)
+        elif campo in ('data_vencimento', 'data_pagamento'):
+            valores[campo] = _data(item[campo], campo)
+        elif campo == 'valor':
+            valores[campo] = _valor(item[campo])
+        else:
+            valores[campo] = _texto(item[campo], campo)
+
+    # Na inclusão o status vazio vira 'pendente'; na alteração ele sobrescreveria a coluna
+    status_informado = valores.get('status') or (parcial and 'status' in valores)
+    if status_informado and valores['status'] not in STATUS_OBRIGACAO:
+        raise ErroLinha(f"status inválido. Use: {', '.join(STATUS_OBRIGACAO)}")
+    return valores
+
+
+def _linha(registro) -> Dict:
+    return dict(registro._mapping)
+
+
+class ObrigacaoLoteService:
+    """
+    Escritas em lote de obrigações direto na conexão (executemany), em uma única transação.
+
+    Os observadores de alterações (contadores do resumo, rollup diário, gerações do
+    cache e eventos) são chamados uma vez por lote com os valores antes/depois de
+    todas as linhas, então os dados derivados continuam consistentes.
+    """
+
+    def __init__(self):
+        self.tabela = Obrigacao.__table__
+
+    def _clientes_existentes(self, conexao, cliente_ids) -> set:
+        if not cliente_ids:
+            return set()
+        return set(conexao.execute(
+            select(Cliente.id).where(Cliente.id.in_(list(cliente_ids)))
+        ).scalars())
+
+    def _validar(self, conexao, itens: List, parcial: bool = False) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+        """Converter os itens e validar todos os clientes com uma única consulta"""
+        validos, erros = [], []
+        for indice, item in enumerate(itens):
+            try:
+                validos.append((indice, _converter(item, parcial)))
+            except ErroLinha as e:
+                erros.append({'indice': indice, 'erro': str(e)})
+
+        existentes = self._clientes_existentes(
+            conexao, {valores['cliente_id'] for _, valores in validos if 'cliente_id' in valores}
+        )
+        aceitos = []
+        for indice, valores in validos:
+            if 'cliente_id' in valores and valores['cliente_id'] not in existentes:
+                erros.append({'indice': indice, 'erro': 'Cliente não encontrado'})
+            else:
+                aceitos.append((indice, valores))
+        return aceitos, erros
+
+    def _inserir(self, conexao, linhas: List[Dict], ignorar_existentes: bool = False) -> List[Dict]:
+        """
+        INSERT em lote (executemany com RETURNING); devolve as linhas gravadas. Com
+        ignorar_existentes, linhas que já existem em (cliente, tipo, vencimento) são
+        puladas pelo ON CONFLICT DO NOTHING e não aparecem no retorno.
+        """
+        if not linhas:
+            return []
+        agora = datetime.utcnow()
+        linhas = [
+            {
+                **{campo: linha.get(campo) for campo in CAMPOS_OBRIGATORIOS + CAMPOS_OPCIONAIS},
+                'status': linha.get('status') or 'pendente',
+                'data_criacao': agora,
+                'data_atualizacao': agora
+            }
+            for linha in linhas
+        ]
+        if ignorar_existentes:
+            comando = (
+                insert_com_conflito(conexao, self.tabela)
+                .on_conflict_do_nothing(index_elements=list(CHAVE_VENCIMENTO))
+                .returning(*self.tabela.c)
+            )
+        else:
+            comando = insert(self.tabela).returning(*self.tabela.c, sort_by_parameter_order=True)
+        resultado = conexao.execute(comando, linhas)
+        return [_linha(registro) for registro in resultado]
+
+    def _atualizar(self, conexao, pares: List[Tuple[Dict, Dict]]):
+        """UPDATE em lote (executemany) de linhas completas, uma por id"""
+        if not pares:
+            return
+        colunas = CAMPOS_OBRIGATORIOS + CAMPOS_OPCIONAIS + ('data_atualizacao',)
+        conexao.execute(
+            update(self.tabela)
+            .where(self.tabela.c.id == bindparam('b_id'))
+            .values({coluna: bindparam(f'b_{coluna}') for coluna in colunas}),
+            [
+                {'b_id': depois['id'], **{f'b_{coluna}': depois[coluna] for coluna in colunas}}
+                for _, depois in pares
+            ]
+        )
+
+    def _executar(self, operacao):
+        try:
+            conexao = db.session.connection()
+            resultado, alteracoes = operacao(conexao)
+            notificar_alteracoes(conexao, Obrigacao, alteracoes)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        resultado['erros'].sort(key=lambda erro: erro['indice'])
+        return resultado
+
+    def criar(self, itens: List[Dict], ignorar_existentes: bool = False) -> Dict:
+        """
+        Inserir as obrigações válidas; itens inválidos são relatados em 'erros'. Com
+        ignorar_existentes, as que já existem (cliente, tipo, vencimento) são contadas
+        em 'ignoradas' em vez de falhar o lote.
+        """
+        def operacao(conexao):
+            aceitos, erros = self._validar(conexao, itens)
+            gravadas = self._inserir(conexao, [valores for _, valores in aceitos], ignorar_existentes)
+            resultado = {
+                'criadas': len(gravadas),
+                'ignoradas': len(aceitos) - len(gravadas),
+                'ids': [linha['id'] for linha in gravadas],
+                'erros': erros
+            }
+            return resultado, [(None, linha) for linha in gravadas]
+
+        return self._executar(operacao)
+
+    def upsert(self, itens: List[Dict]) -> Dict:
+        """
+        Criar ou atualizar obrigações. Itens com 'id' atualizam aquela linha; os demais
+        são casados pela chave natural (cliente_id, tipo, mes_referencia). Campos não
+        informados mantêm o valor atual.
+        """
+        def operacao(conexao):
+            validos, erros = [], []
+            for indice, item in enumerate(itens):
+                if isinstance(item, dict) and item.get('id') is not None:
+                    try:
+                        validos.append((indice, _inteiro(item['id'], 'id'), item))
+                    except ErroLinha as e:
+                        erros.append({'indice': indice, 'erro': str(e)})
+                else:
+                    validos.append((indice, None, item))
+
+            # Itens com id podem ser parciais; os demais precisam de todos os campos
+            com_id = [(indice, item) for indice, identificador, item in validos if identificador is not None]
+            sem_id = [(indice, item) for indice, identificador, item in validos if identificador is None]
+            ids_por_indice = {indice: identificador for indice, identificador, _ in validos}
+
+            aceitos_id, erros_id = self._validar(conexao, [item for _, item in com_id], parcial=True)
+            aceitos_novos, erros_novos = self._validar(conexao, [item for _, item in sem_id])
+            for origem, errados in ((com_id, erros_id), (sem_id, erros_novos)):
+                erros.extend({'indice': origem[erro['indice']][0], 'erro': erro['erro']} for erro in errados)
+            aceitos_id = [(com_id[posicao][0], valores) for posicao, valores in aceitos_id]
+            aceitos_novos = [(sem_id[posicao][0], valores) for posicao, valores in aceitos_novos]
+
+            # Linhas atuais: uma consulta por id e outra pela chave natural
+            atuais_por_id = {}
+            if aceitos_id:
+                atuais_por_id = {
+                    linha['id']: linha for linha in map(_linha, conexao.execute(
+                        select(self.tabela).where(self.tabela.c.id.in_([ids_por_indice[i] for i, _ in aceitos_id]))
+                    ))
+                }
+            atuais_por_chave: Dict[tuple, List[Dict]] = {}
+            if aceitos_novos:
+                chaves = {tuple(valores[campo] for campo in CHAVE_NATURAL) for _, valores in aceitos_novos}
+                colunas_chave = tuple_(*[self.tabela.c[campo] for campo in CHAVE_NATURAL])
+                for linha in map(_linha, conexao.execute(select(self.tabela).where(colunas_chave.in_(list(chaves))))):
+                    atuais_por_chave.setdefault(tuple(linha[campo] for campo in CHAVE_NATURAL), []).append(linha)
+
+            agora = datetime.utcnow()
+            pares: Dict[int, Tuple[Dict, Dict]] = {}
+            novas = []
+
+            def mesclar(indice, atual, valores):
+                if atual['id'] in pares:
+                    erros.append({'indice': indice, 'erro': 'Obrigação repetida no lote'})
+                    return
+                pares[atual['id']] = (atual, dict(atual, **valores, data_atualizacao=agora))
+
+            for indice, valores in aceitos_id:
+                atual = atuais_por_id.get(ids_por_indice[indice])
+                if atual is None:
+                    erros.append({'indice': indice, 'erro': 'Obrigação não encontrada'})
+                else:
+                    mesclar(indice, atual, valores)
+
+            chaves_novas = set()
+            for indice, valores in aceitos_novos:
+                chave = tuple(valores[campo] for campo in CHAVE_NATURAL)
+                encontradas = atuais_por_chave.get(chave, [])
+                if len(encontradas) > 1:
+                    erros.append({'indice': indice, 'erro': 'Mais de uma obrigação com este cliente, tipo e mês; informe o id'})
+                elif encontradas:
+                    mesclar(indice, encontradas[0], valores)
+                elif chave in chaves_novas:
+                    erros.append({'indice': indice, 'erro': 'Obrigação repetida no lote'})
+                else:
+                    chaves_novas.add(chave)
+                    novas.append(valores)
+
+            self._atualizar(conexao, list(pares.values()))
+            gravadas = self._inserir(conexao, novas)
+
+            resultado = {
+                'criadas': len(gravadas),
+                'atualizadas': len(pares),
+                'ids': [linha['id'] for linha in gravadas] + list(pares),
+                'erros': erros
+            }
+            return resultado, list(pares.values()) + [(None, linha) for linha in gravadas]
+
+        return self._executar(operacao)
+
+    def alterar_status(self, ids: List, status: str, data_pagamento: Optional[str] = None) -> Dict:
+        """Mudar o status de várias obrigações com um único UPDATE"""
+        def operacao(conexao):
+            erros, validos = [], {}
+            for indice, identificador in enumerate(ids):
+                try:
+                    validos.setdefault(_inteiro(identificador, 'id'), indice)
+                except ErroLinha as e:
+                    erros.append({'indice': indice, 'erro': str(e)})
+
+            pagamento = _data(data_pagamento, 'data_pagamento')
+            if pagamento is None and status == 'pago':
+                pagamento = date.today()
+
+            atuais = [
+                _linha(registro) for registro in conexao.execute(
+                    select(self.tabela).where(self.tabela.c.id.in_(list(validos)))
+                )
+            ] if validos else []
+            encontrados = {linha['id'] for linha in atuais}
+            erros.extend(
+                {'indice': indice, 'erro': 'Obrigação não encontrada'}
+                for identificador, indice in validos.items() if identificador not in encontrados
+            )
+
+            novos_valores = {'status': status, 'data_atualizacao': datetime.utcnow()}
+            if pagamento is not None:
+                novos_valores['data_pagamento'] = pagamento
+            if encontrados:
+                conexao.execute(
+                    update(self.tabela).where(self.tabela.c.id.in_(list(encontrados))).values(novos_valores)
+                )
+
+            resultado = {'atualizadas': len(encontrados), 'ids': sorted(encontrados), 'erros': erros}
+            return resultado, [(linha, dict(linha, **novos_valores)) for linha in atuais]
+
+        return self._executar(operacao)
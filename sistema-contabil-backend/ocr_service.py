@@ -0,0 +1,428 @@
+import atexit
+import functools
+import gzip
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import pytesseract
+from PIL import Image
+from src.services.cache_disco_service import CacheDisco
+from src.services.preprocessamento_service import chave_perfil, preprocessar
+
+try:
+    # Opcional: API do Tesseract no próprio processo, com o modelo carregado uma vez por worker
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Este módulo roda também dentro dos processos de OCR, por isso não importa Flask nem o banco.
+
+# --- CONFIGURAÇÃO TESSERACT (Mova para um arquivo de configuração se tiver) ---
+# Você precisa ter o Tesseract OCR instalado no seu sistema.
+# Se o caminho não estiver no PATH, descomente e ajuste a linha abaixo:
+# pytesseract.pytesseract.tesseract_cmd = r'/caminho/para/seu/tesseract.exe'
+# -----------------------------------------------------------------------------
+
+# Idioma(s) do Tesseract
+IDIOMA_OCR = os.getenv('OCR_IDIOMA', 'por')
+
+# Processos do pool de OCR por processo da aplicação (padrão: um por CPU; sob o gunicorn,
+# o gunicorn.conf.py divide as CPUs entre os workers, um processo de OCR por CPU no total)
+PROCESSOS_OCR = int(os.getenv('OCR_PROCESSOS', os.getenv('PDF_PROCESSOS_OCR', str(os.cpu_count() or 1))))
+
+# Tempo máximo de OCR de uma página (segundos), contado de quando ela começa a rodar no processo
+TEMPO_MAXIMO_OCR = int(os.getenv('OCR_TEMPO_MAXIMO', '120'))
+
+# Intervalo entre as verificações do tempo das páginas em andamento (segundos)
+INTERVALO_VERIFICACAO_OCR = 1.0
+
+# Cache de OCR em disco, compartilhado entre processos
+PASTA_CACHE_OCR = os.getenv('OCR_CACHE_DIR', os.path.join(os.getcwd(), 'uploads', 'cache_ocr'))
+TAMANHO_MAXIMO_CACHE = int(os.getenv('OCR_CACHE_TAMANHO_MB', '512')) * 1024 * 1024
+
+# Perfil de pré-processamento usado quando a imagem vai direto para o Tesseract
+PERFIL_ORIGINAL = 'original'
+
+_PADRAO_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+# API do Tesseract deste processo; só é criada nos processos do pool (não é thread-safe)
+_api = None
+
+# Fila para avisar o processo principal do início de cada tarefa (só nos processos do pool)
+_eventos = None
+
+
+def sha256_arquivo(caminho_arquivo: str) -> str:
+    """Hash do conteúdo; arquivos do armazenamento já têm o hash como nome"""
+    nome = os.path.basename(caminho_arquivo)
+    if _PADRAO_SHA256.match(nome):
+        return nome
+    hash_conteudo = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            hash_conteudo.update(bloco)
+    return hash_conteudo.hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def versao_tesseract() -> str:
+    if tesserocr is not None:
+        return tesserocr.tesseract_version().split()[1]
+    return str(pytesseract.get_tesseract_version())
+
+
+def iniciar_worker_ocr(eventos=None):
+    """Inicializador dos processos do pool: carrega o modelo do idioma uma única vez"""
+    global _api, _eventos
+    _eventos = eventos
+    # O paralelismo vem dos processos; threads OpenMP do Tesseract só disputariam as mesmas CPUs
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    if tesserocr is not None and _api is None:
+        _api = tesserocr.PyTessBaseAPI(lang=IDIOMA_OCR)
+
+
+def _palavras_tesserocr(imagem) -> List[Tuple[Tuple[int, int, int], str, float]]:
+    _api.SetImage(imagem)
+    _api.Recognize()
+    palavras = []
+    bloco = paragrafo = linha = 0
+    try:
+        for iterador in tesserocr.iterate_level(_api.GetIterator(), tesserocr.RIL.WORD):
+            if iterador.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                bloco += 1
+            if iterador.IsAtBeginningOf(tesserocr.RIL.PARA):
+                paragrafo += 1
+            if iterador.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                linha += 1
+            palavras.append((
+                (bloco, paragrafo, linha),
+                iterador.GetUTF8Text(tesserocr.RIL.WORD) or '',
+                iterador.Confidence(tesserocr.RIL.WORD)
+            ))
+    finally:
+        _api.Clear()
+    return palavras
+
+
+def _palavras_pytesseract(imagem, idioma: str) -> List[Tuple[Tuple[int, int, int], str, float]]:
+    # timeout mata o executável do tesseract se a página travar
+    dados = pytesseract.image_to_data(
+        imagem, lang=idioma, output_type=pytesseract.Output.DICT, timeout=TEMPO_MAXIMO_OCR
+    )
+    return [
+        ((dados['block_num'][indice], dados['par_num'][indice], dados['line_num'][indice]),
+         palavra, float(dados['conf'][indice]))
+        for indice, palavra in enumerate(dados['text'])
+    ]
+
+
+def ocr_imagem(imagem, idioma: str = IDIOMA_OCR) -> Dict:
+    """
+    OCR de uma imagem. Devolve o texto (uma linha por linha reconhecida) e as
+    palavras com a confiança do Tesseract (0-100).
+    """
+    if _api is not None and idioma == IDIOMA_OCR:
+        reconhecidas = _palavras_tesserocr(imagem)
+    else:
+        reconhecidas = _palavras_pytesseract(imagem, idioma)
+
+    linhas: Dict[Tuple[int, int, int], List[str]] = {}
+    palavras = []
+    for chave, palavra, confianca in reconhecidas:
+        palavra = palavra.strip()
+        if not palavra:
+            continue
+        linhas.setdefault(chave, []).append(palavra)
+        palavras.append({'texto': palavra, 'confianca': confianca})
+
+    # Parágrafos separados por linha em branco, como no image_to_string
+    partes = []
+    paragrafo_anterior = None
+    for (bloco, paragrafo, _), palavras_linha in linhas.items():
+        if paragrafo_anterior is not None and paragrafo_anterior != (bloco, paragrafo):
+            partes.append('')
+        partes.append(' '.join(palavras_linha))
+        paragrafo_anterior = (bloco, paragrafo)
+
+    confiancas = [p['confianca'] for p in palavras if p['confianca'] >= 0]
+    return {
+        'texto': '\n'.join(partes),
+        'palavras': palavras,
+        'confianca_media': round(sum(confiancas) / len(confiancas), 2) if confiancas else None
+    }
+
+
+class CacheOCR(CacheDisco):
+    """
+    Resultados de OCR em disco, por (sha256 do arquivo, página, idioma, perfil de
+    pré-processamento, versão do Tesseract). Entradas ficam em
+    <pasta>/ab/<sha256>/<chave>.json.gz; a data de modificação marca o último uso
+    e as menos usadas são apagadas quando o tamanho passa do limite.
+    """
+
+    def __init__(self, pasta: str = PASTA_CACHE_OCR, tamanho_maximo: int = TAMANHO_MAXIMO_CACHE):
+        super().__init__(pasta, tamanho_maximo)
+
+    def _e_entrada(self, nome: str) -> bool:
+        return nome.endswith('.json.gz')
+
+    def _caminho(self, sha256: str, pagina: int, idioma: str, perfil: str) -> str:
+        chave = hashlib.sha256(f'{pagina}|{idioma}|{perfil}|{versao_tesseract()}'.encode()).hexdigest()[:32]
+        return os.path.join(self._pasta_arquivo(sha256), f'{chave}.json.gz')
+
+    def obter(self, sha256: str, pagina: int, idioma: str = IDIOMA_OCR,
+              perfil: str = PERFIL_ORIGINAL) -> Optional[Dict]:
+        caminho = self._caminho(sha256, pagina, idioma, perfil)
+        try:
+            with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+                resultado = json.load(arquivo)
+            os.utime(caminho)
+            return resultado
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Entrada corrompida: descarta e refaz o OCR
+            self._remover(caminho)
+            return None
+
+    def guardar(self, sha256: str, pagina: int, resultado: Dict, idioma: str = IDIOMA_OCR,
+                perfil: str = PERFIL_ORIGINAL):
+        def escrever(temporario: str):
+            with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+                json.dump(resultado, arquivo, ensure_ascii=False)
+
+        try:
+            self._gravar(self._caminho(sha256, pagina, idioma, perfil), escrever)
+        except OSError as e:
+            # Falha no cache não pode derrubar o processamento
+            print(f"[{datetime.now()}] Erro ao gravar cache de OCR: {str(e)}")
+
+    def invalidar(self, sha256: Optional[str] = None) -> int:
+        """Apagar as entradas de um arquivo (todas as páginas e perfis), ou o cache inteiro"""
+        if sha256 is None:
+            removidas = sum(1 for _ in self._entradas())
+            shutil.rmtree(self.pasta, ignore_errors=True)
+            return removidas
+        if not _PADRAO_SHA256.match(sha256):
+            raise ValueError('sha256 inválido')
+        pasta = self._pasta_arquivo(sha256)
+        if not os.path.isdir(pasta):
+            return 0
+        removidas = sum(1 for nome in os.listdir(pasta) if nome.endswith('.json.gz'))
+        shutil.rmtree(pasta, ignore_errors=True)
+        return removidas
+
+
+cache_ocr = CacheOCR()
+
+
+def ocr_arquivo_imagem(caminho_arquivo: str, perfil: str, sha256: Optional[str] = None) -> Dict:
+    """Pré-processar e reconhecer uma imagem enviada (executado nos processos do pool)"""
+    with Image.open(caminho_arquivo) as imagem:
+        resultado = ocr_imagem(preprocessar(imagem, perfil))
+    cache_ocr.guardar(sha256 or sha256_arquivo(caminho_arquivo), 0, resultado, perfil=chave_perfil(perfil))
+    return resultado
+
+
+def _aquecer() -> int:
+    return os.getpid()
+
+
+def _executar_tarefa(tarefa_id: int, funcao: Callable, argumentos: tuple):
+    """Roda no processo do pool: avisa o início (o prazo da página conta daqui) e executa"""
+    if _eventos is not None:
+        _eventos.put((tarefa_id, time.time()))
+    return funcao(*argumentos)
+
+
+class PoolOCR:
+    """
+    Processos de OCR mantidos vivos entre os documentos, cada um com o modelo do
+    idioma já carregado. As páginas são distribuídas individualmente entre eles.
+    Com processos = 0 o OCR roda no próprio processo (desenvolvimento).
+
+    O pool é compartilhado pelas threads de ingestão. O prazo de cada página conta
+    de quando ela começa a rodar num processo, não do tempo que esperou na fila
+    atrás das páginas de outros documentos. Quando uma página estoura o prazo, o
+    pool é condenado: as chamadas novas vão para um pool novo e os processos do
+    antigo só são encerrados quando as chamadas que ainda o usam terminarem.
+    """
+
+    def __init__(self, processos: int = PROCESSOS_OCR, tempo_maximo: int = TEMPO_MAXIMO_OCR):
+        self.processos = processos
+        self.tempo_maximo = tempo_maximo
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._lock_aquecimento = threading.Lock()
+        self._aquecido: Optional[ProcessPoolExecutor] = None
+        self._filas: Dict[ProcessPoolExecutor, object] = {}
+        self._usuarios: Dict[ProcessPoolExecutor, int] = {}
+        self._condenados = set()
+        # Início (time.time() do processo do pool) das tarefas das chamadas em andamento
+        self._inicios: Dict[int, Optional[float]] = {}
+        self._ids = itertools.count()
+
+    def _entrar(self) -> ProcessPoolExecutor:
+        """Obter o pool atual (criando se preciso) e registrar mais uma chamada usando-o"""
+        with self._lock:
+            if self._executor is None:
+                contexto = multiprocessing.get_context('spawn')
+                fila = contexto.Queue()
+                # 'spawn': o processo principal tem threads (pool de ingestão), então fork não é seguro
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processos,
+                    mp_context=contexto,
+                    initializer=iniciar_worker_ocr,
+                    initargs=(fila,)
+                )
+                self._filas[self._executor] = fila
+            executor = self._executor
+            self._usuarios[executor] = self._usuarios.get(executor, 0) + 1
+            return executor
+
+    def _sair(self, executor: ProcessPoolExecutor):
+        """Liberar o pool; o último a sair de um pool condenado encerra os processos dele"""
+        with self._lock:
+            self._usuarios[executor] -= 1
+            if self._usuarios[executor] > 0 or executor not in self._condenados:
+                return
+            del self._usuarios[executor]
+            self._condenados.discard(executor)
+            fila = self._filas.pop(executor)
+        # Não há como interromper uma chamada do Tesseract em andamento: encerra os processos
+        for processo in list((getattr(executor, '_processes', None) or {}).values()):
+            processo.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        fila.close()
+
+    def _condenar(self, executor: ProcessPoolExecutor):
+        """Tirar o pool de uso; os processos são encerrados por _sair"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+            self._condenados.add(executor)
+
+    def _ler_eventos(self, executor: ProcessPoolExecutor):
+        """Registrar os inícios de tarefa avisados pelos processos do pool"""
+        fila = self._filas.get(executor)
+        if fila is None:
+            return
+        while True:
+            try:
+                tarefa_id, inicio = fila.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            with self._lock:
+                if tarefa_id in self._inicios:
+                    self._inicios[tarefa_id] = inicio
+
+    def iniciar(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Subir todos os processos e carregar o modelo antes do primeiro documento;
+        assim a inicialização não conta no tempo máximo das páginas.
+        """
+        if self.processos <= 0:
+            return None
+        executor = self._entrar()
+        try:
+            with self._lock_aquecimento:
+                if self._aquecido is not executor:
+                    for futuro in [executor.submit(_aquecer) for _ in range(self.processos)]:
+                        futuro.result()
+                    self._aquecido = executor
+            return executor
+        finally:
+            self._sair(executor)
+
+    def executar(self, funcao: Callable, argumentos: Sequence[tuple]) -> List:
+        """
+        Executar funcao(*args) para cada item nos processos do pool e devolver os
+        resultados na mesma ordem. Cada item tem até tempo_maximo segundos a partir
+        de quando começa a rodar; se estourar, o pool é condenado (o processo travado
+        é encerrado quando ninguém mais o usar) e TimeoutError é lançado.
+        """
+        if self.processos <= 0:
+            return [funcao(*args) for args in argumentos]
+
+        resultados: List = [None] * len(argumentos)
+        faltando = list(range(len(argumentos)))
+        while faltando:
+            self.iniciar()
+            faltando = self._executar_no_pool(funcao, argumentos, faltando, resultados)
+        return resultados
+
+    def _executar_no_pool(self, funcao: Callable, argumentos: Sequence[tuple],
+                          indices: List[int], resultados: List) -> List[int]:
+        """
+        Executar os itens indicados no pool atual. Devolve os índices que não chegaram
+        a começar porque outra chamada condenou o pool (para reenviar ao pool novo).
+        """
+        executor = self._entrar()
+        tarefas = {}
+        try:
+            for indice in indices:
+                tarefa_id = next(self._ids)
+                with self._lock:
+                    self._inicios[tarefa_id] = None
+                futuro = executor.submit(_executar_tarefa, tarefa_id, funcao, argumentos[indice])
+                tarefas[futuro] = (indice, tarefa_id)
+
+            pendentes = set(tarefas)
+            reenviar = []
+            while pendentes:
+                concluidos, pendentes = wait(pendentes, timeout=INTERVALO_VERIFICACAO_OCR,
+                                             return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    resultados[tarefas[futuro][0]] = futuro.result()
+                if not pendentes:
+                    break
+
+                self._ler_eventos(executor)
+                agora = time.time()
+                with self._lock:
+                    inicios = {futuro: self._inicios[tarefas[futuro][1]] for futuro in pendentes}
+                    condenado = executor in self._condenados
+
+                if any(inicio is not None and agora - inicio > self.tempo_maximo for inicio in inicios.values()):
+                    for futuro in pendentes:
+                        futuro.cancel()
+                    self._condenar(executor)
+                    raise TimeoutError(f'OCR excedeu {self.tempo_maximo}s por página')
+
+                if condenado:
+                    # O processo travado de outra chamada pode nunca liberar a fila deste pool:
+                    # o que ainda não começou vai para o pool novo; o que já roda termina aqui
+                    for futuro in [futuro for futuro in pendentes if inicios[futuro] is None]:
+                        futuro.cancel()
+                        pendentes.discard(futuro)
+                        reenviar.append(tarefas[futuro][0])
+            return reenviar
+        except BrokenProcessPool:
+            self._condenar(executor)
+            raise
+        finally:
+            with self._lock:
+                for _, tarefa_id in tarefas.values():
+                    self._inicios.pop(tarefa_id, None)
+            self._sair(executor)
+
+    def encerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+pool_ocr = PoolOCR()
+atexit.register(pool_ocr.encerrar)
@@ -0,0 +1,80 @@
+import os
+import threading
+from typing import List, Optional
+import pypdfium2 as pdfium
+from src.services.ocr_service import cache_ocr, ocr_imagem, pool_ocr, sha256_arquivo
+from src.services.preprocessamento_service import PERFIL_PAGINA_PDF, chave_perfil, preprocessar
+
+# Este módulo roda também dentro dos processos de OCR, por isso não importa Flask nem o banco.
+
+# Páginas com menos caracteres que isto na camada de texto são tratadas como digitalizadas
+MIN_CARACTERES_PAGINA = int(os.getenv('PDF_MIN_CARACTERES_PAGINA', '20'))
+
+# Resolução usada para rasterizar páginas sem texto antes do OCR
+DPI_OCR = int(os.getenv('PDF_DPI_OCR', '300'))
+
+# O PDFium não é thread-safe; no processo principal as chamadas são serializadas
+lock_pdfium = threading.Lock()
+
+
+def _perfil_pdf(dpi: int) -> str:
+    return f'pdf-{dpi}dpi-{chave_perfil(PERFIL_PAGINA_PDF)}'
+
+
+def ocr_pagina(caminho_arquivo: str, indice: int, dpi: int = DPI_OCR, sha256: Optional[str] = None) -> str:
+    """Rasterizar uma página do PDF e aplicar OCR (executado nos processos do pool)"""
+    with lock_pdfium:
+        pdf = pdfium.PdfDocument(caminho_arquivo)
+        try:
+            imagem = pdf[indice].render(scale=dpi / 72).to_pil()
+        finally:
+            pdf.close()
+    resultado = ocr_imagem(preprocessar(imagem, PERFIL_PAGINA_PDF))
+    cache_ocr.guardar(sha256 or sha256_arquivo(caminho_arquivo), indice, resultado, perfil=_perfil_pdf(dpi))
+    return resultado['texto']
+
+
+def ler_camada_texto(caminho_arquivo: str) -> List[Optional[str]]:
+    """Texto embutido de cada página; None para páginas sem camada de texto"""
+    with lock_pdfium:
+        pdf = pdfium.PdfDocument(caminho_arquivo)
+        try:
+            paginas = []
+            for indice in range(len(pdf)):
+                pagina = pdf[indice]
+                textpage = pagina.get_textpage()
+                texto = textpage.get_text_bounded()
+                textpage.close()
+                pagina.close()
+                paginas.append(texto if len(texto.strip()) >= MIN_CARACTERES_PAGINA else None)
+            return paginas
+        finally:
+            pdf.close()
+
+
+def extrair_texto_pdf(caminho_arquivo: str) -> str:
+    """
+    Texto do PDF inteiro. Páginas digitais são lidas direto da camada de texto;
+    apenas as páginas digitalizadas são rasterizadas e passam por OCR, em paralelo
+    no pool de OCR.
+    """
+    paginas = ler_camada_texto(caminho_arquivo)
+    sem_texto = [indice for indice, texto in enumerate(paginas) if texto is None]
+
+    if sem_texto:
+        # Páginas já reconhecidas antes (reprocessamento) vêm do cache de OCR
+        sha256 = sha256_arquivo(caminho_arquivo)
+        perfil = _perfil_pdf(DPI_OCR)
+        for indice in sem_texto:
+            em_cache = cache_ocr.obter(sha256, indice, perfil=perfil)
+            if em_cache is not None:
+                paginas[indice] = em_cache['texto']
+        sem_texto = [indice for indice in sem_texto if paginas[indice] is None]
+
+    if sem_texto:
+        # Uma tarefa por página: o pool distribui as páginas entre os processos aquecidos
+        textos = pool_ocr.executar(ocr_pagina, [(caminho_arquivo, indice, DPI_OCR, sha256) for indice in sem_texto])
+        for indice, texto in zip(sem_texto, textos):
+            paginas[indice] = texto
+
+    return '\n\n'.join(texto.strip() for texto in paginas)
@@ -0,0 +1,203 @@
+from typing import Dict, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+# Este módulo roda também dentro dos processos de OCR, por isso não importa Flask nem o banco.
+
+# Versão do pipeline; muda a chave do cache de OCR quando os passos mudam
+VERSAO_PREPROCESSAMENTO = 1
+
+# Lado maior de uma folha A4, em polegadas (limite de redução quando o DPI da imagem é desconhecido)
+LADO_MAIOR_A4 = 11.69
+
+# Perfis de pré-processamento: quais passos aplicar antes do Tesseract
+PERFIS = {
+    # Imagem entregue como está
+    'original': {},
+    # Fotos de celular (recibos, comprovantes): grandes, coloridas, tortas e com iluminação irregular
+    'foto': {
+        'rotacao_exif': True,
+        'dpi_alvo': 300,
+        'suavizar': True,
+        'binarizar': True,
+        'sensibilidade': 0.15,
+        'endireitar': True,
+        'recortar_margens': True
+    },
+    # Páginas digitalizadas em scanner: iluminação uniforme, às vezes um pouco tortas
+    'digitalizado': {
+        'dpi_alvo': 300,
+        'binarizar': True,
+        'sensibilidade': 0.10,
+        'endireitar': True,
+        'recortar_margens': True
+    },
+    # Páginas de PDF já rasterizadas no DPI do OCR
+    'pagina_pdf': {
+        'binarizar': True,
+        'sensibilidade': 0.10,
+        'endireitar': True,
+        'recortar_margens': True
+    }
+}
+
+# Perfil das imagens enviadas, pela categoria do documento
+PERFIL_POR_CATEGORIA = {
+    'comprovante_pagamento': 'foto',
+    'nota_fiscal': 'foto',
+    'extrato_bancario': 'digitalizado',
+    'folha_pagamento': 'digitalizado',
+    'declaracao': 'digitalizado',
+    'balancete': 'digitalizado',
+    'dre': 'digitalizado'
+}
+PERFIL_IMAGEM_PADRAO = 'foto'
+PERFIL_PAGINA_PDF = 'pagina_pdf'
+
+# Binarização adaptativa (Bradley): pixel é tinta se estiver `sensibilidade` abaixo da média da vizinhança
+JANELA_BINARIZACAO_POL = 1 / 8
+SENSIBILIDADE_PADRAO = 0.15
+# Diferença mínima (níveis de cinza) para a média: evita marcar ruído de fundos lisos como tinta
+CONTRASTE_MINIMO = 20
+
+# Busca do ângulo de inclinação: até ANGULO_MAXIMO graus para cada lado, em passos de PASSO_ANGULO
+ANGULO_MAXIMO = 5.0
+PASSO_ANGULO = 0.5
+LADO_ESTIMATIVA_ANGULO = 800
+
+# Folga deixada em volta do conteúdo ao recortar margens (pixels)
+FOLGA_MARGEM = 10
+
+
+def perfil_para(tipo_documento: str, categoria: Optional[str] = None) -> str:
+    """Nome do perfil de pré-processamento de um documento"""
+    if tipo_documento == 'PDF':
+        return PERFIL_PAGINA_PDF
+    return PERFIL_POR_CATEGORIA.get(categoria, PERFIL_IMAGEM_PADRAO)
+
+
+def chave_perfil(nome: str) -> str:
+    """Identificador do perfil usado na chave do cache de OCR"""
+    if not PERFIS.get(nome):
+        return nome
+    return f'{nome}-v{VERSAO_PREPROCESSAMENTO}'
+
+
+def reduzir(imagem: Image.Image, dpi_alvo: int) -> Image.Image:
+    """
+    Reduzir para o DPI alvo. Usa o DPI gravado pelo scanner quando é confiável;
+    fotos de celular (72 dpi ou sem informação) são limitadas ao tamanho de uma
+    folha A4 no DPI alvo.
+    """
+    escala = dpi_alvo * LADO_MAIOR_A4 / max(imagem.size)
+    dpi = imagem.info.get('dpi')
+    if dpi and dpi[0] >= 100:
+        escala = min(escala, dpi_alvo / float(dpi[0]))
+    if escala >= 1:
+        return imagem
+    tamanho = (max(1, round(imagem.width * escala)), max(1, round(imagem.height * escala)))
+    # reducing_gap reduz primeiro por média de blocos, bem mais rápido que o LANCZOS na imagem inteira
+    return imagem.resize(tamanho, Image.LANCZOS, reducing_gap=2.0)
+
+
+def binarizar(cinza: np.ndarray, dpi: int = 300, sensibilidade: float = SENSIBILIDADE_PADRAO) -> np.ndarray:
+    """
+    Binarização adaptativa de Bradley com somas acumuladas: cada pixel é comparado
+    com a média de uma janela em volta dele, o que tolera sombras e iluminação
+    irregular. Devolve um array booleano (True = tinta).
+    """
+    altura, largura = cinza.shape
+    raio = max(7, int(dpi * JANELA_BINARIZACAO_POL) // 2)
+    cinza = cinza.astype(np.int32)
+
+    # Soma da janela separada em duas passadas (horizontal e vertical); os valores cabem em int32
+    x0 = np.clip(np.arange(largura) - raio, 0, largura)
+    x1 = np.clip(np.arange(largura) + raio + 1, 0, largura)
+    acumulado = np.zeros((altura, largura + 1), dtype=np.int32)
+    np.cumsum(cinza, axis=1, dtype=np.int32, out=acumulado[:, 1:])
+    horizontal = acumulado[:, x1] - acumulado[:, x0]
+
+    y0 = np.clip(np.arange(altura) - raio, 0, altura)
+    y1 = np.clip(np.arange(altura) + raio + 1, 0, altura)
+    acumulado = np.zeros((altura + 1, largura), dtype=np.int32)
+    np.cumsum(horizontal, axis=0, dtype=np.int32, out=acumulado[1:])
+    soma = acumulado[y1] - acumulado[y0]
+
+    area = (y1 - y0)[:, None].astype(np.int32) * (x1 - x0)[None, :].astype(np.int32)
+    # cinza < média * (1 - s) e média - cinza > contraste mínimo, sem divisão
+    ponderado = cinza * area
+    return (ponderado * 100 < soma * int(100 * (1 - sensibilidade))) & (soma - ponderado > CONTRASTE_MINIMO * area)
+
+
+def estimar_inclinacao(tinta: np.ndarray) -> float:
+    """
+    Ângulo (graus) que deixa as linhas de texto na horizontal: o perfil de projeção
+    das linhas fica com picos mais marcados (maior variância) quando o texto está reto.
+    """
+    amostra = Image.fromarray(tinta.astype(np.uint8) * 255)
+    fator = LADO_ESTIMATIVA_ANGULO / max(amostra.size)
+    if fator < 1:
+        amostra = amostra.resize((max(1, round(amostra.width * fator)), max(1, round(amostra.height * fator))),
+                                 Image.BILINEAR)
+
+    melhor_angulo, melhor_variancia = 0.0, -1.0
+    for angulo in np.arange(-ANGULO_MAXIMO, ANGULO_MAXIMO + PASSO_ANGULO / 2, PASSO_ANGULO):
+        girada = np.asarray(amostra.rotate(float(angulo), resample=Image.NEAREST, fillcolor=0))
+        variancia = float(np.var(girada.sum(axis=1, dtype=np.int64)))
+        if variancia > melhor_variancia:
+            melhor_angulo, melhor_variancia = float(angulo), variancia
+    return melhor_angulo
+
+
+def limites_conteudo(tinta: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Caixa (esquerda, topo, direita, base) que contém toda a tinta, com folga"""
+    linhas = np.flatnonzero(tinta.any(axis=1))
+    colunas = np.flatnonzero(tinta.any(axis=0))
+    if linhas.size == 0 or colunas.size == 0:
+        return None
+    altura, largura = tinta.shape
+    return (
+        max(0, int(colunas[0]) - FOLGA_MARGEM),
+        max(0, int(linhas[0]) - FOLGA_MARGEM),
+        min(largura, int(colunas[-1]) + 1 + FOLGA_MARGEM),
+        min(altura, int(linhas[-1]) + 1 + FOLGA_MARGEM)
+    )
+
+
+def preprocessar(imagem: Image.Image, perfil: str) -> Image.Image:
+    """Aplicar os passos do perfil e devolver a imagem que vai para o Tesseract"""
+    passos: Dict = PERFIS[perfil]
+    if not passos:
+        return imagem
+
+    if passos.get('rotacao_exif'):
+        imagem = ImageOps.exif_transpose(imagem)
+    dpi = passos.get('dpi_alvo', 300)
+    if passos.get('dpi_alvo'):
+        imagem = reduzir(imagem, dpi)
+
+    cinza = imagem.convert('L')
+    if passos.get('suavizar'):
+        # Atenua o ruído do sensor (caixa 3x3, bem mais barata que um filtro de mediana)
+        cinza = cinza.filter(ImageFilter.BoxBlur(1))
+    if not passos.get('binarizar'):
+        return cinza
+
+    sensibilidade = passos.get('sensibilidade', SENSIBILIDADE_PADRAO)
+    tinta = binarizar(np.asarray(cinza), dpi, sensibilidade)
+    if passos.get('endireitar'):
+        angulo = estimar_inclinacao(tinta)
+        if angulo:
+            # Gira a imagem já binarizada: evita binarizar de novo a imagem inteira
+            girada = Image.fromarray(tinta.astype(np.uint8) * 255).rotate(
+                angulo, resample=Image.BILINEAR, expand=True, fillcolor=0
+            )
+            tinta = np.asarray(girada) > 127
+
+    if passos.get('recortar_margens'):
+        caixa = limites_conteudo(tinta)
+        if caixa is not None:
+            esquerda, topo, direita, base = caixa
+            tinta = tinta[topo:base, esquerda:direita]
+
+    return Image.fromarray(np.where(tinta, 0, 255).astype(np.uint8))
@@ -0,0 +1,63 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.models.cliente import Cliente
+from src.models.user import db
+
+
+def _valor_json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+def colunas_do_modelo(modelo) -> List:
+    """Todas as colunas mapeadas do modelo, na ordem da tabela (as mesmas de to_dict)"""
+    return [getattr(modelo, coluna.key) for coluna in modelo.__table__.columns]
+
+
+def consulta_com_cliente(modelo, colunas: Optional[List] = None):
+    """
+    Consulta que projeta apenas as colunas pedidas do modelo junto com clientes.nome
+    (como 'cliente_nome') em um único SELECT com JOIN, sem montar objetos ORM.
+    """
+    colunas = colunas or colunas_do_modelo(modelo)
+    return (
+        db.session.query(*colunas, Cliente.nome.label('cliente_nome'))
+        .select_from(modelo)
+        .outerjoin(Cliente, Cliente.id == modelo.cliente_id)
+    )
+
+
+def serializar_linha(linha) -> Dict:
+    """Converter uma linha projetada em dicionário pronto para JSON"""
+    return {chave: _valor_json(valor) for chave, valor in linha._mapping.items()}
+
+
+def codificar_cursor(data_valor: Optional[date], identificador: int) -> str:
+    """Cursor opaco (base64) com a chave da última linha entregue: (data, id); a data pode ser nula"""
+    bruto = json.dumps([data_valor.isoformat() if data_valor else None, identificador]).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Optional[date], int]:
+    """Inverso de codificar_cursor; levanta ValueError para cursores inválidos"""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data_texto, identificador = json.loads(bruto)
+        return (date.fromisoformat(data_texto) if data_texto is not None else None), int(identificador)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def gerar_ndjson(query, tamanho_lote: int = 500) -> Iterator[str]:
+    """
+    Gerar uma linha JSON por registro, lendo em lotes de um cursor do servidor
+    (yield_per), sem carregar o resultado inteiro em memória.
+    """
+    for linha in query.yield_per(tamanho_lote):
+        yield json.dumps(serializar_linha(linha), ensure_ascii=False) + '\n'
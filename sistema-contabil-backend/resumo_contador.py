@@ -0,0 +1,21 @@
+from datetime import datetime
+from src.models.user import db
+
+class ResumoContador(db.Model):
+    __tablename__ = 'resumo_contadores'
+
+    chave = db.Column(db.String(50), primary_key=True)  # obrigacoes_pendentes, mensalidades_atrasadas, etc.
+    valor = db.Column(db.Integer, nullable=False, default=0)
+    data_referencia = db.Column(db.Date, nullable=True)  # dia a que o contador se refere; vazio se não depende da data
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ResumoContador {self.chave}={self.valor}>'
+
+    def to_dict(self):
+        return {
+            'chave': self.chave,
+            'valor': self.valor,
+            'data_referencia': self.data_referencia.isoformat() if self.data_referencia else None,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
@@ -0,0 +1,242 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional
+from sqlalchemy import and_, func, select, update
+from src.models.cliente import Cliente
+from src.models.obrigacao import Obrigacao
+from src.models.documento import Documento
+from src.models.mensalidade import Mensalidade
+from src.models.notificacao import Notificacao
+from src.models.resumo_contador import ResumoContador
+from src.models.user import db
+from src.services.alteracoes_service import insert_com_conflito, observar
+from src.services.eventos_service import publicar
+from src.services.memo_service import memorizar
+
+# Contadores cujo valor muda com a virada do dia
+CHAVES_POR_DATA = (
+    'obrigacoes_vencidas',
+    'obrigacoes_vencendo_hoje',
+    'obrigacoes_proximos_7_dias',
+    'mensalidades_atrasadas'
+)
+
+
+def _consultas_contadores(hoje: date) -> Dict:
+    """Consultas COUNT usadas para (re)calcular cada contador do zero"""
+    return {
+        'clientes_ativos': select(func.count(Cliente.id)).where(Cliente.ativo == True),
+        'obrigacoes_pendentes': select(func.count(Obrigacao.id)).where(Obrigacao.status == 'pendente'),
+        'obrigacoes_vencidas': select(func.count(Obrigacao.id)).where(
+            and_(Obrigacao.status == 'pendente', Obrigacao.data_vencimento < hoje)
+        ),
+        'obrigacoes_vencendo_hoje': select(func.count(Obrigacao.id)).where(
+            and_(Obrigacao.status == 'pendente', Obrigacao.data_vencimento == hoje)
+        ),
+        'obrigacoes_proximos_7_dias': select(func.count(Obrigacao.id)).where(
+            and_(
+                Obrigacao.status == 'pendente',
+                Obrigacao.data_vencimento > hoje,
+                Obrigacao.data_vencimento <= hoje + timedelta(days=7)
+            )
+        ),
+        'documentos_pendentes': select(func.count(Documento.id)).where(Documento.status_processamento == 'pendente'),
+        'mensalidades_atrasadas': select(func.count(Mensalidade.id)).where(
+            and_(Mensalidade.status == 'pendente', Mensalidade.data_vencimento < hoje)
+        ),
+        'notificacoes_nao_lidas': select(func.count(Notificacao.id)).where(Notificacao.status == 'pendente')
+    }
+
+
+CHAVES = tuple(_consultas_contadores(date.today()).keys())
+
+
+# Contribuição de uma linha para os contadores. Recebe os valores da linha
+# (ou None) e devolve {chave: 1} para cada contador em que ela entra.
+
+def _contribuicao_cliente(valores: Optional[Dict], hoje: date) -> Dict:
+    if not valores or not valores['ativo']:
+        return {}
+    return {'clientes_ativos': 1}
+
+
+def _contribuicao_obrigacao(valores: Optional[Dict], hoje: date) -> Dict:
+    if not valores or valores['status'] != 'pendente':
+        return {}
+
+    contribuicao = {'obrigacoes_pendentes': 1}
+    data_vencimento = valores['data_vencimento']
+    if data_vencimento is None:
+        return contribuicao
+
+    if data_vencimento < hoje:
+        contribuicao['obrigacoes_vencidas'] = 1
+    elif data_vencimento == hoje:
+        contribuicao['obrigacoes_vencendo_hoje'] = 1
+    elif data_vencimento <= hoje + timedelta(days=7):
+        contribuicao['obrigacoes_proximos_7_dias'] = 1
+    return contribuicao
+
+
+def _contribuicao_documento(valores: Optional[Dict], hoje: date) -> Dict:
+    if not valores or valores['status_processamento'] != 'pendente':
+        return {}
+    return {'documentos_pendentes': 1}
+
+
+def _contribuicao_mensalidade(valores: Optional[Dict], hoje: date) -> Dict:
+    if not valores or valores['status'] != 'pendente':
+        return {}
+    if valores['data_vencimento'] is not None and valores['data_vencimento'] < hoje:
+        return {'mensalidades_atrasadas': 1}
+    return {}
+
+
+def _contribuicao_notificacao(valores: Optional[Dict], hoje: date) -> Dict:
+    if not valores or valores['status'] != 'pendente':
+        return {}
+    return {'notificacoes_nao_lidas': 1}
+
+
+def _aplicar_deltas(conexao, alteracoes, contribuicao):
+    """Somar aos contadores a diferença entre o estado novo e o antigo de cada linha"""
+    hoje = date.today()
+    deltas: Dict[str, int] = {}
+
+    for antes, depois in alteracoes:
+        for chave, valor in contribuicao(depois, hoje).items():
+            deltas[chave] = deltas.get(chave, 0) + valor
+        for chave, valor in contribuicao(antes, hoje).items():
+            deltas[chave] = deltas.get(chave, 0) - valor
+
+    deltas = {chave: delta for chave, delta in deltas.items() if delta != 0}
+    if not deltas:
+        return
+
+    tabela = ResumoContador.__table__
+    aplicados: Dict[str, int] = {}
+    # Mesma ordem de bloqueio do recalcular, para não haver deadlock entre os dois
+    for chave, delta in sorted(deltas.items()):
+        condicao = tabela.c.chave == chave
+        if chave in CHAVES_POR_DATA:
+            # Contadores de outro dia serão recalculados na virada; não aplicar delta sobre eles
+            condicao = and_(condicao, tabela.c.data_referencia == hoje)
+        resultado = conexao.execute(
+            update(tabela)
+            .where(condicao)
+            .values(valor=tabela.c.valor + delta, data_atualizacao=datetime.utcnow())
+        )
+        if resultado.rowcount:
+            aplicados[chave] = delta
+
+    # Avisar as conexões SSE do dashboard (entregue no commit), só do que foi aplicado
+    if aplicados:
+        publicar(conexao, {'tipo': 'contadores', 'deltas': aplicados, 'data_referencia': hoje.isoformat()})
+
+
+@observar(Cliente, ('ativo',))
+def _observar_clientes(conexao, alteracoes):
+    _aplicar_deltas(conexao, alteracoes, _contribuicao_cliente)
+
+
+@observar(Obrigacao, ('status', 'data_vencimento'))
+def _observar_obrigacoes(conexao, alteracoes):
+    _aplicar_deltas(conexao, alteracoes, _contribuicao_obrigacao)
+
+
+@observar(Documento, ('status_processamento',))
+def _observar_documentos(conexao, alteracoes):
+    _aplicar_deltas(conexao, alteracoes, _contribuicao_documento)
+
+
+@observar(Mensalidade, ('status', 'data_vencimento'))
+def _observar_mensalidades(conexao, alteracoes):
+    _aplicar_deltas(conexao, alteracoes, _contribuicao_mensalidade)
+
+
+@observar(Notificacao, ('status',))
+def _observar_notificacoes(conexao, alteracoes):
+    _aplicar_deltas(conexao, alteracoes, _contribuicao_notificacao)
+
+
+class ResumoService:
+    def obter_contadores(self) -> Dict[str, int]:
+        """
+        Ler todos os contadores do resumo com uma única consulta.
+        Na primeira leitura do dia os contadores que dependem da data são recalculados.
+        """
+        return memorizar('resumo_contadores', self._ler_contadores)
+
+    def _ler_contadores(self) -> Dict[str, int]:
+        hoje = date.today()
+        linhas = db.session.query(ResumoContador).all()
+
+        faltando = set(CHAVES) - {linha.chave for linha in linhas}
+        desatualizados = {
+            linha.chave for linha in linhas
+            if linha.chave in CHAVES_POR_DATA and linha.data_referencia != hoje
+        }
+
+        if faltando or desatualizados:
+            self.recalcular(faltando | desatualizados, hoje)
+            linhas = db.session.query(ResumoContador).all()
+
+        return {linha.chave: linha.valor for linha in linhas}
+
+    def recalcular(self, chaves: Optional[Iterable[str]] = None, hoje: Optional[date] = None) -> Dict[str, int]:
+        """
+        Recalcular contadores a partir das tabelas de origem.
+        Usado na virada do dia, na primeira carga e para corrigir escritas em massa
+        que não passam pelo flush da sessão.
+        """
+        hoje = hoje or date.today()
+        consultas = _consultas_contadores(hoje)
+        chaves = sorted(chave for chave in (chaves or CHAVES) if chave in consultas)
+        tabela = ResumoContador.__table__
+
+        try:
+            conexao = db.session.connection()
+            conexao.execute(
+                insert_com_conflito(conexao, tabela)
+                .values([{'chave': chave, 'valor': 0, 'data_atualizacao': datetime.utcnow()} for chave in chaves])
+                .on_conflict_do_nothing(index_elements=['chave'])
+            )
+
+            # Bloquear as linhas dos contadores antes de contar. Em READ COMMITTED a
+            # subconsulta de um UPDATE usa o snapshot do início do comando, e o delta
+            # de uma escrita confirmada enquanto o UPDATE esperava a linha se perderia.
+            # Com o bloqueio já obtido, cada COUNT abaixo enxerga toda escrita que
+            # aplicou delta antes; as seguintes esperam e somam sobre o valor novo.
+            conexao.execute(
+                select(tabela.c.chave)
+                .where(tabela.c.chave.in_(chaves))
+                .order_by(tabela.c.chave)
+                .with_for_update()
+            ).fetchall()
+
+            for chave in chaves:
+                data_referencia = hoje if chave in CHAVES_POR_DATA else None
+                conexao.execute(
+                    update(tabela)
+                    .where(tabela.c.chave == chave)
+                    .values(
+                        valor=consultas[chave].scalar_subquery(),
+                        data_referencia=data_referencia,
+                        data_atualizacao=datetime.utcnow()
+                    )
+                )
+
+            # Valores novos para as conexões SSE (recontagem noturna, virada do dia). Só as
+            # chaves recalculadas, cujas linhas estão bloqueadas: nenhuma escrita concorrente
+            # pode ter um delta entre esta leitura e o commit.
+            valores = dict(conexao.execute(
+                select(tabela.c.chave, tabela.c.valor).where(tabela.c.chave.in_(chaves))
+            ).all())
+            publicar(conexao, {'tipo': 'contadores', 'valores': valores, 'data_referencia': hoje.isoformat()})
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        linhas = db.session.query(ResumoContador).filter(ResumoContador.chave.in_(chaves)).all()
+        return {linha.chave: linha.valor for linha in linhas}
@@ -0,0 +1,27 @@
+from datetime import datetime
+from src.models.user import db
+
+class RollupDiario(db.Model):
+    __tablename__ = 'rollup_diario'
+
+    entidade = db.Column(db.String(20), primary_key=True)  # obrigacao, documento, mensalidade
+    dia = db.Column(db.Date, primary_key=True)  # vencimento (obrigação/mensalidade) ou data de upload (documento)
+    cliente_id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(50), primary_key=True)  # tipo da obrigação, categoria do documento ou mes_referencia da mensalidade
+    status = db.Column(db.String(20), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    valor = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RollupDiario {self.entidade} {self.dia} {self.chave}/{self.status}>'
+
+    def to_dict(self):
+        return {
+            'entidade': self.entidade,
+            'dia': self.dia.isoformat() if self.dia else None,
+            'cliente_id': self.cliente_id,
+            'chave': self.chave,
+            'status': self.status,
+            'quantidade': self.quantidade,
+            'valor': float(self.valor) if self.valor is not None else 0
+        }
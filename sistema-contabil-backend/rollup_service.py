@@ -0,0 +1,206 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import and_, cast, delete, func, insert, literal, select
+from src.models.obrigacao import Obrigacao
+from src.models.documento import Documento
+from src.models.mensalidade import Mensalidade
+from src.models.rollup_diario import RollupDiario
+from src.models.user import db
+from src.services.alteracoes_service import garantir_carga_inicial, insert_com_conflito, observar
+
+COLUNAS_CHAVE = ('entidade', 'dia', 'cliente_id', 'chave', 'status')
+
+
+def _decimal(valor) -> Decimal:
+    if valor is None:
+        return Decimal('0')
+    if isinstance(valor, Decimal):
+        return valor
+    return Decimal(str(valor))
+
+
+def _dia(valor) -> Optional[date]:
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+
+# Cada função converte os valores de uma linha de origem na chave do rollup e no valor somado
+
+def _linha_obrigacao(valores: Dict):
+    return (
+        ('obrigacao', _dia(valores['data_vencimento']), valores['cliente_id'] or 0, valores['tipo'] or '', valores['status'] or ''),
+        _decimal(valores['valor'])
+    )
+
+
+def _linha_documento(valores: Dict):
+    return (
+        ('documento', _dia(valores['data_upload']), valores['cliente_id'] or 0, valores['categoria'] or '', valores['status_processamento'] or ''),
+        Decimal('0')
+    )
+
+
+def _linha_mensalidade(valores: Dict):
+    return (
+        ('mensalidade', _dia(valores['data_vencimento']), valores['cliente_id'] or 0, valores['mes_referencia'] or '', valores['status'] or ''),
+        _decimal(valores['valor'])
+    )
+
+
+def _aplicar_deltas(conexao, alteracoes, linha):
+    """Acumular +1/-1 por chave do rollup e gravar com um único upsert"""
+    deltas: Dict[tuple, list] = {}
+
+    for antes, depois in alteracoes:
+        for valores, sinal in ((antes, -1), (depois, 1)):
+            if valores is None:
+                continue
+            chave, valor = linha(valores)
+            if chave[1] is None:
+                continue
+            delta = deltas.setdefault(chave, [0, Decimal('0')])
+            delta[0] += sinal
+            delta[1] += sinal * valor
+
+    linhas = [
+        dict(zip(COLUNAS_CHAVE, chave), quantidade=quantidade, valor=valor)
+        for chave, (quantidade, valor) in deltas.items()
+        if quantidade != 0 or valor != 0
+    ]
+    if not linhas:
+        return
+
+    tabela = RollupDiario.__table__
+    stmt = insert_com_conflito(conexao, tabela).values(linhas)
+    conexao.execute(stmt.on_conflict_do_update(
+        index_elements=list(COLUNAS_CHAVE),
+        set_={
+            'quantidade': tabela.c.quantidade + stmt.excluded.quantidade,
+            'valor': tabela.c.valor + stmt.excluded.valor
+        }
+    ))
+
+
+@observar(Obrigacao, ('data_vencimento', 'cliente_id', 'tipo', 'status', 'valor'))
+def _observar_obrigacoes(conexao, alteracoes):
+    _aplicar_deltas(conexao, alteracoes, _linha_obrigacao)
+
+
+@observar(Documento, ('data_upload', 'cliente_id', 'categoria', 'status_processamento'))
+def _observar_documentos(conexao, alteracoes):
+    _aplicar_deltas(conexao, alteracoes, _linha_documento)
+
+
+@observar(Mensalidade, ('data_vencimento', 'cliente_id', 'mes_referencia', 'status', 'valor'))
+def _observar_mensalidades(conexao, alteracoes):
+    _aplicar_deltas(conexao, alteracoes, _linha_mensalidade)
+
+
+def _consultas_origem(dialeto: str) -> Dict:
+    """SELECTs GROUP BY que produzem as linhas do rollup a partir das tabelas de origem"""
+    if dialeto == 'sqlite':
+        dia_upload = func.date(Documento.data_upload)
+    else:
+        dia_upload = cast(Documento.data_upload, db.Date)
+
+    return {
+        'obrigacao': (Obrigacao.data_vencimento, select(
+            literal('obrigacao'),
+            Obrigacao.data_vencimento,
+            func.coalesce(Obrigacao.cliente_id, 0),
+            func.coalesce(Obrigacao.tipo, ''),
+            func.coalesce(Obrigacao.status, ''),
+            func.count(Obrigacao.id),
+            func.coalesce(func.sum(Obrigacao.valor), 0)
+        ).group_by(Obrigacao.data_vencimento, Obrigacao.cliente_id, Obrigacao.tipo, Obrigacao.status)),
+        'documento': (dia_upload, select(
+            literal('documento'),
+            dia_upload,
+            func.coalesce(Documento.cliente_id, 0),
+            func.coalesce(Documento.categoria, ''),
+            func.coalesce(Documento.status_processamento, ''),
+            func.count(Documento.id),
+            literal(0)
+        ).group_by(dia_upload, Documento.cliente_id, Documento.categoria, Documento.status_processamento)),
+        'mensalidade': (Mensalidade.data_vencimento, select(
+            literal('mensalidade'),
+            Mensalidade.data_vencimento,
+            func.coalesce(Mensalidade.cliente_id, 0),
+            func.coalesce(Mensalidade.mes_referencia, ''),
+            func.coalesce(Mensalidade.status, ''),
+            func.count(Mensalidade.id),
+            func.coalesce(func.sum(Mensalidade.valor), 0)
+        ).group_by(Mensalidade.data_vencimento, Mensalidade.cliente_id, Mensalidade.mes_referencia, Mensalidade.status))
+    }
+
+
+class RollupService:
+    def reconstruir(self, inicio: Optional[date] = None, fim: Optional[date] = None) -> Dict[str, int]:
+        """
+        Reconstruir o rollup do período a partir das tabelas de origem.
+        Usado na carga inicial e para corrigir escritas em massa fora do ORM.
+        """
+        tabela = RollupDiario.__table__
+        resultado = {}
+
+        try:
+            conexao = db.session.connection()
+            for entidade, (coluna_dia, consulta) in _consultas_origem(conexao.dialect.name).items():
+                condicoes_rollup = [tabela.c.entidade == entidade]
+                if inicio:
+                    condicoes_rollup.append(tabela.c.dia >= inicio)
+                    consulta = consulta.where(coluna_dia >= inicio)
+                if fim:
+                    condicoes_rollup.append(tabela.c.dia <= fim)
+                    consulta = consulta.where(coluna_dia <= fim)
+
+                conexao.execute(delete(tabela).where(and_(*condicoes_rollup)))
+                inseridas = conexao.execute(
+                    insert(tabela).from_select(list(COLUNAS_CHAVE) + ['quantidade', 'valor'], consulta)
+                )
+                resultado[entidade] = inseridas.rowcount
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return resultado
+
+    def _garantir_carga_inicial(self):
+        """Popular o rollup com todo o histórico uma única vez por banco (ver garantir_carga_inicial)"""
+        garantir_carga_inicial('rollup_diario', self.reconstruir)
+
+    def totais(self, entidade: str, inicio: Optional[date] = None, fim: Optional[date] = None,
+               chave: Optional[str] = None, agrupar_por: Sequence[str] = ('status',)) -> List[Dict]:
+        """
+        Somar quantidade e valor do rollup agrupando pelas colunas pedidas.
+        Devolve uma lista de dicionários com as colunas de agrupamento, 'quantidade' e 'valor' (Decimal).
+        """
+        self._garantir_carga_inicial()
+
+        colunas = [getattr(RollupDiario, nome) for nome in agrupar_por]
+        consulta = db.session.query(
+            *colunas,
+            func.sum(RollupDiario.quantidade).label('quantidade'),
+            func.sum(RollupDiario.valor).label('valor')
+        ).filter(RollupDiario.entidade == entidade)
+
+        if inicio:
+            consulta = consulta.filter(RollupDiario.dia >= inicio)
+        if fim:
+            consulta = consulta.filter(RollupDiario.dia <= fim)
+        if chave is not None:
+            consulta = consulta.filter(RollupDiario.chave == chave)
+
+        linhas = consulta.group_by(*colunas).having(func.sum(RollupDiario.quantidade) != 0).all()
+        return [
+            dict(
+                {nome: getattr(linha, nome) for nome in agrupar_por},
+                quantidade=int(linha.quantidade or 0),
+                valor=_decimal(linha.valor)
+            )
+            for linha in linhas
+        ]
@@ -0,0 +1,269 @@
+import mmap
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+# Leitura de arquivos grandes de SPED (EFD ICMS/IPI e EFD-Contribuições) e de
+# extratos OFX sem carregá-los na memória: o arquivo é mapeado com mmap e lido
+# linha a linha / transação a transação por geradores. Não acessa o banco.
+
+# Campos de valor somados por registro do SPED: {registro: {nome: número do campo}}.
+# O número é o do leiaute (REG = 1), que é o índice na linha dividida por '|'.
+CAMPOS_VALOR_SPED = {
+    # Documentos (NF-e, NFS-e) e resumo por CST/CFOP
+    b'C100': {'vl_doc': 12, 'vl_icms': 22, 'vl_ipi': 25, 'vl_pis': 26, 'vl_cofins': 27},
+    b'C190': {'vl_opr': 5, 'vl_icms': 7, 'vl_icms_st': 9, 'vl_ipi': 11},
+    b'A100': {'vl_doc': 12, 'vl_pis': 16, 'vl_cofins': 18},
+    # Apuração do ICMS
+    b'E110': {'vl_tot_debitos': 2, 'vl_tot_creditos': 6, 'vl_icms_recolher': 13, 'vl_sld_credor_transportar': 14},
+    # Apuração do PIS (M200) e da COFINS (M600)
+    b'M200': {'vl_cont_nc_rec': 8, 'vl_cont_cum_rec': 12, 'vl_tot_cont_rec': 13},
+    b'M600': {'vl_cont_nc_rec': 8, 'vl_cont_cum_rec': 12, 'vl_tot_cont_rec': 13}
+}
+
+SPED_FISCAL = 'SPED_FISCAL'
+SPED_CONTRIBUICOES = 'SPED_CONTRIBUICOES'
+OFX = 'OFX'
+
+# O SPED é gravado em ISO-8859-1
+CODIFICACAO_SPED = 'latin-1'
+
+_TRANSACAO_OFX = re.compile(rb'<STMTTRN>(.*?)</STMTTRN>', re.S | re.I)
+_CAMPO_OFX = re.compile(rb'<(\w+)>([^<\r\n]*)')
+
+
+class CabecalhoSped(NamedTuple):
+    tipo: str
+    periodo_inicio: Optional[date]
+    periodo_fim: Optional[date]
+    nome: Optional[str]
+    cnpj: Optional[str]
+
+
+class ResumoSped(NamedTuple):
+    cabecalho: CabecalhoSped
+    linhas: int
+    quantidades: Dict[str, int]  # linhas por registro
+    totais: Dict[str, Dict[str, Decimal]]  # {registro: {campo: soma}}
+
+
+class TransacaoOFX(NamedTuple):
+    data: Optional[date]
+    valor: Decimal
+    tipo: str
+    fitid: Optional[str]
+    descricao: Optional[str]
+
+
+class CabecalhoOFX(NamedTuple):
+    banco: Optional[str]
+    conta: Optional[str]
+    periodo_inicio: Optional[date]
+    periodo_fim: Optional[date]
+    saldo: Optional[Decimal]
+
+
+@contextmanager
+def mapear(caminho_arquivo: str):
+    """Mapear o arquivo só para leitura; o sistema carrega as páginas sob demanda"""
+    with open(caminho_arquivo, 'rb') as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            if hasattr(mapa, 'madvise'):
+                # Leitura sequencial: o kernel lê adiante e libera as páginas já lidas
+                mapa.madvise(mmap.MADV_SEQUENTIAL)
+            yield mapa
+
+
+def _linhas(mapa) -> Iterator[bytes]:
+    if not mapa:
+        return iter(())
+    mapa.seek(0)
+    return iter(mapa.readline, b'')
+
+
+def _decimal(valor: bytes) -> Optional[Decimal]:
+    valor = valor.strip()
+    if not valor:
+        return None
+    try:
+        return Decimal(valor.replace(b',', b'.').decode('ascii'))
+    except (InvalidOperation, UnicodeDecodeError):
+        return None
+
+
+def _data_sped(valor: str) -> Optional[date]:
+    """Data no formato do SPED (DDMMAAAA)"""
+    try:
+        return date(int(valor[4:8]), int(valor[2:4]), int(valor[0:2])) if len(valor) == 8 else None
+    except ValueError:
+        return None
+
+
+def _data_ofx(valor: bytes) -> Optional[date]:
+    """Data do OFX (AAAAMMDD[HHMMSS[.XXX]][fuso])"""
+    try:
+        return date(int(valor[0:4]), int(valor[4:6]), int(valor[6:8])) if len(valor) >= 8 else None
+    except ValueError:
+        return None
+
+
+def registros_sped(mapa, registros: Optional[Set[bytes]] = None) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Percorrer os registros do SPED como (registro, campos), com campos[0] == registro.
+    Com `registros`, só as linhas desses registros são decodificadas.
+    """
+    for linha in _linhas(mapa):
+        registro = linha[1:5]
+        if registros is None or registro in registros:
+            campos = linha.rstrip(b'\r\n').decode(CODIFICACAO_SPED).split('|')[1:-1]
+            yield registro.decode(CODIFICACAO_SPED), campos
+
+
+def cabecalho_sped(mapa) -> CabecalhoSped:
+    """Registro 0000: tipo de escrituração, período e contribuinte"""
+    primeira = next(registros_sped(mapa), None)
+    if primeira is None or primeira[0] != '0000':
+        raise ValueError('Arquivo não reconhecido como SPED (registro 0000 ausente)')
+    campos = primeira[1]
+    # Na EFD ICMS/IPI o campo 4 é DT_INI; na EFD-Contribuições é IND_SIT_ESP e o período vem depois
+    if len(campos) > 6 and len(campos[3]) == 8:
+        return CabecalhoSped(SPED_FISCAL, _data_sped(campos[3]), _data_sped(campos[4]), campos[5] or None, campos[6] or None)
+    if len(campos) > 8:
+        return CabecalhoSped(SPED_CONTRIBUICOES, _data_sped(campos[5]), _data_sped(campos[6]),
+                             campos[7] or None, campos[8] or None)
+    raise ValueError('Registro 0000 do SPED incompleto')
+
+
+def resumir_sped(mapa) -> ResumoSped:
+    """
+    Uma passada pelo arquivo: quantidade de linhas por registro e soma dos campos
+    de valor dos registros de CAMPOS_VALOR_SPED. Só essas linhas são divididas.
+    """
+    cabecalho = cabecalho_sped(mapa)
+    quantidades: Counter = Counter()
+    totais: Dict[bytes, Dict[str, Decimal]] = {}
+    linhas = 0
+    for linha in _linhas(mapa):
+        linhas += 1
+        registro = linha[1:5]
+        quantidades[registro] += 1
+        campos_valor = CAMPOS_VALOR_SPED.get(registro)
+        if campos_valor is None:
+            continue
+        partes = linha.split(b'|')
+        somas = totais.setdefault(registro, {})
+        for nome, indice in campos_valor.items():
+            valor = _decimal(partes[indice]) if indice < len(partes) else None
+            if valor is not None:
+                somas[nome] = somas.get(nome, Decimal('0')) + valor
+
+    return ResumoSped(
+        cabecalho=cabecalho,
+        linhas=linhas,
+        quantidades={registro.decode(CODIFICACAO_SPED): quantidade for registro, quantidade in quantidades.items()},
+        totais={registro.decode(CODIFICACAO_SPED): somas for registro, somas in totais.items()}
+    )
+
+
+def _campo_ofx(mapa, nome: bytes) -> Optional[bytes]:
+    encontrado = re.search(rb'<' + nome + rb'>([^<\r\n]*)', mapa, re.I)
+    return encontrado.group(1).strip() if encontrado else None
+
+
+def cabecalho_ofx(mapa) -> CabecalhoOFX:
+    if not mapa or re.search(rb'<OFX>', mapa, re.I) is None:
+        raise ValueError('Arquivo não reconhecido como OFX')
+    texto = lambda valor: valor.decode('latin-1') if valor else None
+    inicio, fim = _campo_ofx(mapa, b'DTSTART'), _campo_ofx(mapa, b'DTEND')
+    saldo = _campo_ofx(mapa, b'BALAMT')
+    return CabecalhoOFX(
+        banco=texto(_campo_ofx(mapa, b'BANKID')),
+        conta=texto(_campo_ofx(mapa, b'ACCTID')),
+        periodo_inicio=_data_ofx(inicio) if inicio else None,
+        periodo_fim=_data_ofx(fim) if fim else None,
+        saldo=_decimal(saldo) if saldo else None
+    )
+
+
+def transacoes_ofx(mapa) -> Iterator[TransacaoOFX]:
+    """Transações (STMTTRN) do extrato, em OFX 1.x (SGML) ou 2.x (XML)"""
+    if not mapa:
+        return
+    for transacao in _TRANSACAO_OFX.finditer(mapa):
+        campos = {nome.upper(): valor.strip() for nome, valor in _CAMPO_OFX.findall(transacao.group(1))}
+        valor = _decimal(campos.get(b'TRNAMT', b''))
+        if valor is None:
+            continue
+        descricao = campos.get(b'MEMO') or campos.get(b'NAME')
+        yield TransacaoOFX(
+            data=_data_ofx(campos.get(b'DTPOSTED', b'')),
+            valor=valor,
+            tipo=campos.get(b'TRNTYPE', b'OTHER').decode('latin-1').upper(),
+            fitid=campos[b'FITID'].decode('latin-1') if campos.get(b'FITID') else None,
+            descricao=descricao.decode('latin-1')[:255] if descricao else None
+        )
+
+
+def tipo_importacao(caminho_arquivo: str) -> str:
+    """SPED_FISCAL, SPED_CONTRIBUICOES ou OFX, pelo conteúdo do arquivo"""
+    with mapear(caminho_arquivo) as mapa:
+        if mapa[:6] == b'|0000|':
+            return cabecalho_sped(mapa).tipo
+        if re.search(rb'<OFX>', mapa[:65536], re.I):
+            return OFX
+    raise ValueError('Arquivo não reconhecido como SPED ou OFX')
+
+
+def _formatar_reais(valor: Decimal) -> str:
+    return f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def _data_br(valor: Optional[date]) -> str:
+    return valor.strftime('%d/%m/%Y') if valor else '-'
+
+
+def formatar_resumo_sped(resumo: ResumoSped) -> str:
+    cabecalho = resumo.cabecalho
+    linhas = [
+        f'{cabecalho.tipo} {cabecalho.nome or ""} CNPJ {cabecalho.cnpj or "-"}',
+        f'Período: {_data_br(cabecalho.periodo_inicio)} a {_data_br(cabecalho.periodo_fim)}',
+        f'Linhas: {resumo.linhas}'
+    ]
+    for registro, somas in sorted(resumo.totais.items()):
+        linhas += [f'{registro} {nome.upper()}: R$ {_formatar_reais(valor)}' for nome, valor in somas.items()]
+    return '\n'.join(linhas)
+
+
+def formatar_resumo_ofx(cabecalho: CabecalhoOFX, quantidade: int, creditos: Decimal, debitos: Decimal) -> str:
+    return '\n'.join([
+        f'Extrato OFX banco {cabecalho.banco or "-"} conta {cabecalho.conta or "-"}',
+        f'Período: {_data_br(cabecalho.periodo_inicio)} a {_data_br(cabecalho.periodo_fim)}',
+        f'Transações: {quantidade}',
+        f'Créditos: R$ {_formatar_reais(creditos)}',
+        f'Débitos: R$ {_formatar_reais(debitos)}'
+    ])
+
+
+def texto_resumo(caminho_arquivo: str) -> str:
+    """Resumo legível do arquivo (texto do documento para busca e para a IA)"""
+    with mapear(caminho_arquivo) as mapa:
+        if mapa[:6] == b'|0000|':
+            return formatar_resumo_sped(resumir_sped(mapa))
+        cabecalho = cabecalho_ofx(mapa)
+        creditos = debitos = Decimal('0')
+        quantidade = 0
+        for transacao in transacoes_ofx(mapa):
+            quantidade += 1
+            if transacao.valor >= 0:
+                creditos += transacao.valor
+            else:
+                debitos += transacao.valor
+        return formatar_resumo_ofx(cabecalho, quantidade, creditos, debitos)
+
@@ -0,0 +1,249 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Optional, Tuple
+from sqlalchemy import and_, select
+from werkzeug.exceptions import ClientDisconnected
+from src.models.cliente import Cliente
+from src.models.upload_sessao import UploadSessao
+from src.models.user import db
+from src.services.armazenamento_service import TAMANHO_BLOCO, ArmazenamentoService
+
+# Limites configuráveis (bytes)
+TAMANHO_MAXIMO_UPLOAD = int(os.getenv('UPLOAD_TAMANHO_MAXIMO', str(500 * 1024 * 1024)))
+TAMANHO_MAXIMO_BLOCO = int(os.getenv('UPLOAD_TAMANHO_MAXIMO_BLOCO', str(16 * 1024 * 1024)))
+
+# Sessões abertas sem atividade por mais tempo que isto são descartadas
+VALIDADE_SESSAO = timedelta(hours=int(os.getenv('UPLOAD_VALIDADE_HORAS', '24')))
+
+# Estados de hash mantidos em memória por processo
+MAX_HASHES_EM_MEMORIA = 256
+
+
+class ErroUpload(ValueError):
+    """Erro do protocolo de upload, com o status HTTP correspondente"""
+
+    def __init__(self, mensagem: str, status: int = 400, recebido: Optional[int] = None):
+        super().__init__(mensagem)
+        self.status = status
+        self.recebido = recebido
+
+
+class _HashesParciais:
+    """
+    SHA-256 incremental de cada upload em andamento, guardado na memória do processo.
+    Se o próximo bloco chegar a outro processo (ou depois de um restart), o hash é
+    recalculado a partir do disco na finalização.
+    """
+
+    def __init__(self, max_itens: int = MAX_HASHES_EM_MEMORIA):
+        self.max_itens = max_itens
+        self._itens: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retirar(self, upload_id: str, offset: int):
+        """Estado do hash exatamente em `offset`, ou None se não estiver disponível"""
+        with self._lock:
+            item = self._itens.pop(upload_id, None)
+        if item is not None and item[0] == offset:
+            return item[1]
+        return None
+
+    def guardar(self, upload_id: str, offset: int, hash_parcial):
+        with self._lock:
+            self._itens[upload_id] = (offset, hash_parcial)
+            self._itens.move_to_end(upload_id)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def descartar(self, upload_id: str):
+        with self._lock:
+            self._itens.pop(upload_id, None)
+
+
+class UploadService:
+    """Uploads em blocos e retomáveis: iniciar / enviar bloco com offset / finalizar"""
+
+    def __init__(self, armazenamento: Optional[ArmazenamentoService] = None):
+        self.armazenamento = armazenamento or ArmazenamentoService()
+        self.hashes = _HashesParciais()
+
+    def caminho_parcial(self, upload_id: str) -> str:
+        return os.path.join(self.armazenamento.pasta_temporaria, f'{upload_id}.parcial')
+
+    def _obter_aberta(self, upload_id: str, travar: bool = False) -> UploadSessao:
+        consulta = select(UploadSessao).where(UploadSessao.id == upload_id)
+        if travar:
+            # Serializa blocos concorrentes do mesmo upload (PostgreSQL)
+            consulta = consulta.with_for_update()
+        sessao = db.session.execute(consulta).scalar_one_or_none()
+        if sessao is None:
+            raise ErroUpload('Upload não encontrado', 404)
+        if sessao.status != 'aberto':
+            raise ErroUpload(f'Upload já {sessao.status}', 409, sessao.recebido)
+        return sessao
+
+    def iniciar(self, cliente_id: int, nome_arquivo: str, tamanho_total: int,
+                categoria: Optional[str] = None, mes_referencia: Optional[str] = None) -> UploadSessao:
+        if tamanho_total <= 0:
+            raise ErroUpload('Tamanho do arquivo inválido')
+        if tamanho_total > TAMANHO_MAXIMO_UPLOAD:
+            raise ErroUpload(f'Arquivo maior que o limite de {TAMANHO_MAXIMO_UPLOAD} bytes', 413)
+        if db.session.get(Cliente, cliente_id) is None:
+            raise ErroUpload('Cliente não encontrado', 404)
+
+        sessao = UploadSessao(
+            id=uuid.uuid4().hex,
+            cliente_id=cliente_id,
+            nome_arquivo=nome_arquivo,
+            categoria=categoria,
+            mes_referencia=mes_referencia,
+            tamanho_total=tamanho_total,
+            recebido=0,
+            status='aberto'
+        )
+        try:
+            db.session.add(sessao)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # Arquivo parcial vazio: os blocos são gravados nele na posição do offset
+        open(self.caminho_parcial(sessao.id), 'wb').close()
+        self.hashes.guardar(sessao.id, 0, hashlib.sha256())
+        return sessao
+
+    def receber_bloco(self, upload_id: str, offset: int, stream: BinaryIO,
+                      tamanho_bloco: Optional[int] = None) -> UploadSessao:
+        """
+        Gravar um bloco a partir de `offset`, que precisa ser igual ao total já recebido.
+        O corpo é copiado do stream para o disco em partes, sem ser carregado inteiro
+        em memória. Se a conexão cair no meio, os bytes já gravados são mantidos e o
+        cliente retoma do novo offset.
+        """
+        try:
+            sessao = self._obter_aberta(upload_id, travar=True)
+            if offset != sessao.recebido:
+                raise ErroUpload('Offset diferente do total já recebido', 409, sessao.recebido)
+            if tamanho_bloco is not None and tamanho_bloco > TAMANHO_MAXIMO_BLOCO:
+                raise ErroUpload(f'Bloco maior que o limite de {TAMANHO_MAXIMO_BLOCO} bytes', 413, sessao.recebido)
+
+            limite = min(TAMANHO_MAXIMO_BLOCO, sessao.tamanho_total - offset)
+            hash_parcial = self.hashes.retirar(upload_id, offset)
+            gravados = 0
+            interrompido = False
+            with open(self.caminho_parcial(upload_id), 'r+b') as destino:
+                destino.seek(offset)
+                try:
+                    while True:
+                        parte = stream.read(TAMANHO_BLOCO)
+                        if not parte:
+                            break
+                        if gravados + len(parte) > limite:
+                            raise ErroUpload('Bloco ultrapassa o tamanho declarado do arquivo ou o limite por bloco',
+                                             413, sessao.recebido)
+                        destino.write(parte)
+                        if hash_parcial is not None:
+                            hash_parcial.update(parte)
+                        gravados += len(parte)
+                except ClientDisconnected:
+                    interrompido = True
+                destino.truncate(offset + gravados)
+
+            sessao.recebido = offset + gravados
+            sessao.data_atualizacao = datetime.utcnow()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self.hashes.descartar(upload_id)
+            raise
+
+        if hash_parcial is not None:
+            self.hashes.guardar(upload_id, sessao.recebido, hash_parcial)
+        if interrompido:
+            raise ErroUpload('Conexão interrompida; retome a partir do offset recebido', 400, sessao.recebido)
+        return sessao
+
+    def finalizar(self, upload_id: str) -> Tuple[UploadSessao, str, str, int]:
+        """
+        Conferir o tamanho, concluir o hash e publicar o arquivo no armazenamento.
+        Devolve (sessao, sha256, caminho, tamanho); a sessão fica finalizada no commit
+        que registrar o documento. O arquivo parcial só é apagado por concluir(), depois
+        desse commit: se ele falhar, a sessão volta a 'aberto' e pode ser finalizada de novo.
+        """
+        sessao = self._obter_aberta(upload_id, travar=True)
+        if sessao.recebido != sessao.tamanho_total:
+            raise ErroUpload(
+                f'Upload incompleto: {sessao.recebido} de {sessao.tamanho_total} bytes', 409, sessao.recebido
+            )
+
+        parcial = self.caminho_parcial(upload_id)
+        hash_parcial = self.hashes.retirar(upload_id, sessao.recebido)
+        if hash_parcial is None:
+            hash_parcial = hashlib.sha256()
+            with open(parcial, 'rb') as origem:
+                for parte in iter(lambda: origem.read(TAMANHO_BLOCO), b''):
+                    hash_parcial.update(parte)
+
+        sha256, caminho, tamanho = self.armazenamento.publicar(
+            parcial, hash_parcial.hexdigest(), sessao.recebido, manter_temporario=True
+        )
+        sessao.status = 'finalizado'
+        sessao.data_atualizacao = datetime.utcnow()
+        return sessao, sha256, caminho, tamanho
+
+    def concluir(self, upload_id: str):
+        """Apagar o arquivo parcial de um upload já finalizado (chamar após o commit)"""
+        if os.path.exists(self.caminho_parcial(upload_id)):
+            os.remove(self.caminho_parcial(upload_id))
+
+    def cancelar(self, upload_id: str):
+        try:
+            sessao = self._obter_aberta(upload_id, travar=True)
+            sessao.status = 'cancelado'
+            sessao.data_atualizacao = datetime.utcnow()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.hashes.descartar(upload_id)
+        if os.path.exists(self.caminho_parcial(upload_id)):
+            os.remove(self.caminho_parcial(upload_id))
+
+    def limpar_expiradas(self) -> int:
+        """
+        Cancelar sessões abertas sem atividade e apagar os arquivos parciais, inclusive
+        os de sessões finalizadas que ficaram para trás (queda entre o commit e concluir()).
+        """
+        limite = datetime.utcnow() - VALIDADE_SESSAO
+        try:
+            expiradas = db.session.execute(
+                select(UploadSessao).where(and_(
+                    UploadSessao.status == 'aberto',
+                    UploadSessao.data_atualizacao < limite
+                ))
+            ).scalars().all()
+            for sessao in expiradas:
+                sessao.status = 'cancelado'
+            finalizadas = db.session.execute(
+                select(UploadSessao.id).where(and_(
+                    UploadSessao.status == 'finalizado',
+                    UploadSessao.data_atualizacao < limite
+                ))
+            ).scalars().all()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for sessao in expiradas:
+            self.hashes.descartar(sessao.id)
+            if os.path.exists(self.caminho_parcial(sessao.id)):
+                os.remove(self.caminho_parcial(sessao.id))
+        for upload_id in finalizadas:
+            self.concluir(upload_id)
+        return len(expiradas)
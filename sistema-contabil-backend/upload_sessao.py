@@ -0,0 +1,35 @@
+from datetime import datetime
+from src.models.user import db
+
+class UploadSessao(db.Model):
+    __tablename__ = 'uploads_sessoes'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), nullable=False)
+    nome_arquivo = db.Column(db.String(255), nullable=False)
+    categoria = db.Column(db.String(50), nullable=True)
+    mes_referencia = db.Column(db.String(7), nullable=True)
+    tamanho_total = db.Column(db.BigInteger, nullable=False)
+    recebido = db.Column(db.BigInteger, nullable=False, default=0)  # bytes gravados (offset do próximo bloco)
+    status = db.Column(db.String(20), default='aberto')  # aberto, finalizado, cancelado
+    documento_id = db.Column(db.Integer, db.ForeignKey('documentos.id', ondelete='SET NULL'), nullable=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UploadSessao {self.id} {self.recebido}/{self.tamanho_total}>'
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'cliente_id': self.cliente_id,
+            'nome_arquivo': self.nome_arquivo,
+            'categoria': self.categoria,
+            'mes_referencia': self.mes_referencia,
+            'tamanho_total': self.tamanho_total,
+            'recebido': self.recebido,
+            'status': self.status,
+            'documento_id': self.documento_id,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
@@ -479,6 +479,15 @@ export function Documentos() {
             <Card key={documento.id} className="hover:shadow-md transition-shadow">
               <CardContent className="p-6">
                 <div className="flex items-start justify-between">
+                  {['PDF', 'IMAGEM'].includes(documento.tipo_documento) && (
+                    // Miniatura gerada pelo back-end na primeira vez e depois servida do cache
+                    <img
+                      src={`${API_BASE_URL}/${documento.id}/previa?largura=160`}
+                      alt={`Pré-visualização de ${documento.nome_arquivo}`}
+                      loading="lazy"
+                      className="w-20 h-28 object-cover object-top rounded border bg-gray-50 mr-4"
+                    />
+                  )}
                   <div className="flex-1">
                     <div className="flex items-center space-x-3 mb-3">
                       {getFileIcon(documento.tipo_documento)}